@@ -0,0 +1,43 @@
+"""Hooks into the botocore event system of every client Conduit uses."""
+import boto3
+
+
+def clients():
+    """Get every long lived boto3 client used by Conduit."""
+    from aws_conduit import helper
+    from aws_conduit.aws import cloudformation, iam, s3, service_catalog, ssm
+    from aws_conduit.conduit_portfolio import ConduitPortfolio
+    from aws_conduit.conduit_role import ConduitRole
+    found = []
+    for client in [s3.S3_CLIENT, service_catalog.SERVICE_CATALOG, iam.IAM, ssm.SSM, cloudformation.CFN,
+                   helper.IAM, helper.STS, ConduitPortfolio.service_catalog, ConduitRole.iam] + list(service_catalog.REGIONAL_CLIENTS.values()):
+        if not any(client is other for other in found):
+            found.append(client)
+    return found
+
+
+def register(event_name, handler, unique_id):
+    """
+    Register an event handler with every client, including clients created later.
+
+    Args:
+        event_name (str): The botocore event, e.g. before-call.
+        handler (function): The handler to call.
+        unique_id (str): Identifies the handler so that it can be unregistered.
+    """
+    unique_id = _event_id(event_name, unique_id)
+    for client in clients():
+        client.meta.events.register(event_name, handler, unique_id=unique_id)
+    boto3._get_default_session().events.register(event_name, handler, unique_id=unique_id)
+
+
+def unregister(event_name, unique_id):
+    unique_id = _event_id(event_name, unique_id)
+    for client in clients():
+        client.meta.events.unregister(event_name, unique_id=unique_id)
+    boto3._get_default_session().events.unregister(event_name, unique_id=unique_id)
+
+
+def _event_id(event_name, unique_id):
+    # botocore ignores a second handler registered under the same id, whatever its event.
+    return "{}:{}".format(unique_id, event_name)
@@ -3,33 +3,36 @@ import json
 
 import boto3
 from aws_conduit import helper
-
-IAM = boto3.client('iam')
-
-BASIC_POLICY = {
-    'Statement': [
-        {
-            'Principal': {
-                'AWS': helper.get_account_id()
-            },
-            'Effect': 'Allow',
-            'Action': ['sts:AssumeRole']
-        }, {
-            'Principal': {
-                'Service': 'servicecatalog.amazonaws.com'
-            },
-            'Effect': 'Allow',
-            'Action': ['sts:AssumeRole']
-        }
-    ]
-}
+from botocore.config import Config
+
+IAM = boto3.client('iam', config=Config(retries={'max_attempts': 10, 'mode': 'adaptive'}))
+
+
+def basic_policy():
+    return {
+        'Statement': [
+            {
+                'Principal': {
+                    'AWS': helper.get_account_id()
+                },
+                'Effect': 'Allow',
+                'Action': ['sts:AssumeRole']
+            }, {
+                'Principal': {
+                    'Service': 'servicecatalog.amazonaws.com'
+                },
+                'Effect': 'Allow',
+                'Action': ['sts:AssumeRole']
+            }
+        ]
+    }
 
 
 def create_role(name, description):
     response = IAM.create_role(
         Path='/conduit/',
         RoleName=name,
-        AssumeRolePolicyDocument=json.dumps(BASIC_POLICY),
+        AssumeRolePolicyDocument=json.dumps(basic_policy()),
         Description=description
     )
     return response['Role']
@@ -1,17 +1,67 @@
+import collections
+import functools
+import io
+import os
+import threading
+from concurrent import futures
+
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from aws_conduit import conduit_log
+
+MEGABYTE = 1024 * 1024
+MULTIPART_CHUNK_SIZE = int(os.environ.get('CONDUIT_MULTIPART_CHUNK_SIZE', 16 * MEGABYTE))
+MULTIPART_CONCURRENCY = int(os.environ.get('CONDUIT_MULTIPART_CONCURRENCY', 8))
+UPLOAD_WORKERS = int(os.environ.get('CONDUIT_UPLOAD_WORKERS', 4))
+DELETE_BATCH_SIZE = 1000
+DELETE_WINDOW = UPLOAD_WORKERS * 2
+NOT_FOUND_CODES = ('404', 'NoSuchBucket', 'NoSuchKey', 'NotFound')
+# botocore's default pool size, left for the calls which are not transfers.
+OTHER_CONNECTIONS = 10
+LOG = conduit_log.logger(__name__)
+ACCESS_DENIED_CODES = ('403', 'AccessDenied', 'Forbidden')
+
+# Transfers run inside concurrent builds and region releases, each with its own
+# upload pool, so the transfers of the whole process share these slots. That
+# keeps them within the connection pool, however many builds run at once.
+TRANSFER_SLOTS = threading.BoundedSemaphore(UPLOAD_WORKERS)
+S3_RESOURCE = boto3.resource('s3', config=Config(max_pool_connections=UPLOAD_WORKERS * MULTIPART_CONCURRENCY + OTHER_CONNECTIONS))
+S3_CLIENT = S3_RESOURCE.meta.client
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=MULTIPART_CHUNK_SIZE,
+    multipart_chunksize=MULTIPART_CHUNK_SIZE,
+    max_concurrency=MULTIPART_CONCURRENCY
+)
+
+
+def _transfer(function):
 
-S3_RESOURCE = boto3.resource('s3')
-S3_CLIENT = boto3.client('s3')
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with TRANSFER_SLOTS:
+            return function(*args, **kwargs)
+
+    return wrapper
 
 
 def create_bucket(name, region):
-    bucket = S3_RESOURCE.Bucket(name)
-    bucket.create(
-        ACL='private',
-        CreateBucketConfiguration={
-            'LocationConstraint': region
-        }
-    )
+    resource = S3_RESOURCE
+    if region and region != S3_CLIENT.meta.region_name:
+        # Buckets have to be created through an endpoint in their own region.
+        resource = boto3.resource('s3', region_name=region)
+    bucket = resource.Bucket(name)
+    if region == 'us-east-1':
+        bucket.create(ACL='private')
+    else:
+        bucket.create(
+            ACL='private',
+            CreateBucketConfiguration={
+                'LocationConstraint': region
+            }
+        )
     bucket.Versioning().enable()
 
 
@@ -22,42 +72,186 @@ def delete_bucket(name):
 
 
 def get_sub_folders(name, prefix):
-    sub_folders = []
-    bucket = S3_RESOURCE.Bucket(name=name)
-    for obj in bucket.objects.filter(Prefix=prefix):
-        parts = obj.key.split("/")
-        parts.pop(-1)
-        folder = '/'.join(str(part) for part in parts)
-        sub_folders.append(folder)
-    return sub_folders
-
-
-def delete_folder(name, prefix):
-    objects_to_delete = S3_RESOURCE.meta.client.list_objects(Bucket=name, Prefix=prefix)
-    delete_keys = {'Objects': []}
-    delete_keys['Objects'] = [{'Key': k} for k in [obj['Key'] for obj in objects_to_delete.get('Contents', [])]]
-    if delete_keys['Objects']:
-        print("Deleting keys: {}".format(delete_keys))
-        S3_RESOURCE.meta.client.delete_objects(Bucket=name, Delete=delete_keys)
-
-
-def get_file(name, prefix):
-    bucket = S3_RESOURCE.Bucket(name)
-    response = bucket.objects.filter(
-        Prefix=prefix
-    )
-    return response
+    """
+    List the immediate sub folders of a folder, each exactly once.
+
+    Args:
+        name (str): The name of the bucket.
+        prefix (str): The folder to list.
+
+    Return:
+        list: The sorted sub folder paths, without a trailing slash.
+    """
+    if not prefix.endswith('/'):
+        prefix = prefix + '/'
+    sub_folders = set()
+    paginator = S3_CLIENT.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=name, Prefix=prefix, Delimiter='/'):
+        for common_prefix in page.get('CommonPrefixes', []):
+            sub_folders.add(common_prefix['Prefix'].rstrip('/'))
+    return sorted(sub_folders)
+
+
+def delete_folder(name, prefix, versions=False):
+    """
+    Delete everything under a folder, in parallel batches of up to 1000 keys.
+
+    The folder is listed as batches are deleted, with at most DELETE_WINDOW
+    batches listed ahead of the deletes which have finished.
+
+    Args:
+        name (str): The name of the bucket.
+        prefix (str): The folder to delete.
+        versions (bool): Also delete every previous version and delete marker.
+
+    Return:
+        int: The number of objects deleted.
+
+    Raises:
+        ValueError: If any object could not be deleted, once every batch has been attempted.
+    """
+    if not prefix.endswith('/'):
+        prefix = prefix + '/'
+    results = dict(deleted=0, failed=[])
+    pending = collections.deque()
+    executor = futures.ThreadPoolExecutor(max_workers=UPLOAD_WORKERS)
+    try:
+        for batch in _batches(_list_folder(name, prefix, versions), DELETE_BATCH_SIZE):
+            if len(pending) >= DELETE_WINDOW:
+                _collect(pending.popleft(), results)
+            pending.append(executor.submit(_delete_batch, name, batch))
+        while pending:
+            _collect(pending.popleft(), results)
+    finally:
+        executor.shutdown(wait=True)
+    LOG.debug("Deleted %s objects from %s/%s", results['deleted'], name, prefix)
+    if results['failed']:
+        failed = results['failed']
+        raise ValueError("Failed to delete {} objects from {}/{}, including {}: {}".format(
+            len(failed), name, prefix, failed[0].get('Key'), failed[0].get('Message')))
+    return results['deleted']
+
+
+def _collect(future, results):
+    count, errors = future.result()
+    results['deleted'] += count
+    results['failed'].extend(errors)
+
+
+def _list_folder(name, prefix, versions=False):
+    if versions:
+        paginator = S3_CLIENT.get_paginator('list_object_versions')
+        for page in paginator.paginate(Bucket=name, Prefix=prefix):
+            for item in page.get('Versions', []) + page.get('DeleteMarkers', []):
+                yield {'Key': item['Key'], 'VersionId': item['VersionId']}
+    else:
+        paginator = S3_CLIENT.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=name, Prefix=prefix):
+            for item in page.get('Contents', []):
+                yield {'Key': item['Key']}
 
 
+def _batches(objects, size):
+    batch = []
+    for item in objects:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _delete_batch(name, batch):
+    response = S3_CLIENT.delete_objects(Bucket=name, Delete={'Objects': batch, 'Quiet': True})
+    errors = response.get('Errors', [])
+    return len(batch) - len(errors), errors
+
+
+def bucket_exists(name):
+    """
+    Test if a bucket exists with a HEAD request.
+
+    Raises:
+        PermissionError: If the bucket exists but cannot be accessed.
+    """
+    try:
+        S3_CLIENT.head_bucket(Bucket=name)
+        return True
+    except ClientError as error:
+        return _missing_or_raise(error, name)
+
+
+def object_exists(name, prefix):
+    """
+    Test if an object exists with a HEAD request.
+
+    Raises:
+        PermissionError: If the object cannot be accessed.
+    """
+    try:
+        S3_CLIENT.head_object(Bucket=name, Key=prefix)
+        return True
+    except ClientError as error:
+        return _missing_or_raise(error, "{}/{}".format(name, prefix))
+
+
+def _missing_or_raise(error, location):
+    code = error.response['Error']['Code']
+    if code in NOT_FOUND_CODES:
+        return False
+    if code in ACCESS_DENIED_CODES:
+        raise PermissionError("Access denied to s3://{}".format(location))
+    raise error
+
+
+@_transfer
 def download_file(name, prefix, download_location):
-    S3_CLIENT.download_file(name, prefix, download_location)
+    S3_CLIENT.download_file(name, prefix, download_location, Config=TRANSFER_CONFIG)
+
+
+@_transfer
+def download_content(name, prefix):
+    buffer = io.BytesIO()
+    S3_CLIENT.download_fileobj(name, prefix, buffer, Config=TRANSFER_CONFIG)
+    return buffer.getvalue()
+
+
+def list_objects(name, prefix):
+    if not prefix.endswith('/'):
+        prefix = prefix + '/'
+    objects = []
+    paginator = S3_CLIENT.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=name, Prefix=prefix):
+        objects.extend(page.get('Contents', []))
+    return objects
 
 
-def upload_file(name, prefix, file):
+@_transfer
+def upload_file(name, prefix, file, metadata=None, callback=None, checksum=False):
     obj = S3_RESOURCE.Object(name, prefix)
-    obj.upload_file(file)
+    extra_args = {}
+    if checksum:
+        extra_args['ChecksumAlgorithm'] = 'SHA256'
+    if metadata:
+        extra_args['Metadata'] = metadata
+    obj.upload_file(file, ExtraArgs=extra_args or None, Callback=callback, Config=TRANSFER_CONFIG)
+
+
+@_transfer
+def upload_content(name, prefix, content, metadata=None, callback=None):
+    obj = S3_RESOURCE.Object(name, prefix)
+    extra_args = {'ChecksumAlgorithm': 'SHA256'}
+    if metadata:
+        extra_args['Metadata'] = metadata
+    obj.upload_fileobj(io.BytesIO(content), ExtraArgs=extra_args, Callback=callback, Config=TRANSFER_CONFIG)
+
+
+def get_checksum(name, prefix):
+    response = S3_CLIENT.head_object(Bucket=name, Key=prefix, ChecksumMode='ENABLED')
+    return response.get('ChecksumSHA256')
 
 
-def list_all_buckets():
-    all_buckets = S3_CLIENT.list_buckets()
-    return all_buckets['Buckets']
+@_transfer
+def copy_file(name, source_prefix, destination_prefix, source_name=None):
+    S3_CLIENT.copy({'Bucket': source_name or name, 'Key': source_prefix}, name, destination_prefix, Config=TRANSFER_CONFIG)
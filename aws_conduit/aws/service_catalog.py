@@ -1,9 +1,31 @@
 import json
+import threading
 
 import boto3
+from aws_conduit import conduit_log
+from botocore.config import Config
 
-SERVICE_CATALOG = boto3.client('servicecatalog')
+CLIENT_CONFIG = Config(retries={'max_attempts': 10, 'mode': 'adaptive'})
+SERVICE_CATALOG = boto3.client('servicecatalog', config=CLIENT_CONFIG)
+REGIONAL_CLIENTS = {}
+REGIONAL_CLIENTS_LOCK = threading.Lock()
 ROW_FORMAT = "{:<30}" * 3
+LOG = conduit_log.logger(__name__)
+
+
+def client(region=None):
+    """
+    Get the Service Catalog client for a region.
+
+    Args:
+        region (str): (Optional) The region, defaulting to the region of the default session.
+    """
+    if region is None or region == SERVICE_CATALOG.meta.region_name:
+        return SERVICE_CATALOG
+    with REGIONAL_CLIENTS_LOCK:
+        if region not in REGIONAL_CLIENTS:
+            REGIONAL_CLIENTS[region] = boto3.client('servicecatalog', region_name=region, config=CLIENT_CONFIG)
+        return REGIONAL_CLIENTS[region]
 
 
 def associate(product_id, portfolio_id):
@@ -20,6 +42,74 @@ def disassociate(product_id, portfolio):
     )
 
 
+def list_portfolio_access(portfolio_id):
+    """Get the ids of the accounts which have access to a portfolio."""
+    accounts = []
+    params = dict(PortfolioId=portfolio_id, PageSize=20)
+    while True:
+        response = SERVICE_CATALOG.list_portfolio_access(**params)
+        accounts.extend(response['AccountIds'])
+        if 'NextPageToken' not in response:
+            return accounts
+        params['PageToken'] = response['NextPageToken']
+
+
+def describe_portfolio_shares(portfolio_id, share_type):
+    """Get the shares of a portfolio of one type, e.g. ORGANIZATIONAL_UNIT."""
+    shares = []
+    params = dict(PortfolioId=portfolio_id, Type=share_type, PageSize=100)
+    while True:
+        response = SERVICE_CATALOG.describe_portfolio_shares(**params)
+        shares.extend(response['PortfolioShareDetails'])
+        if 'NextPageToken' not in response:
+            return shares
+        params['PageToken'] = response['NextPageToken']
+
+
+def list_principals_for_portfolio(portfolio_id):
+    """Get the ARNs of the principals associated with a portfolio."""
+    principals = []
+    params = dict(PortfolioId=portfolio_id, PageSize=20)
+    while True:
+        response = SERVICE_CATALOG.list_principals_for_portfolio(**params)
+        principals.extend(principal['PrincipalARN'] for principal in response['Principals'])
+        if 'NextPageToken' not in response:
+            return principals
+        params['PageToken'] = response['NextPageToken']
+
+
+def create_portfolio_share(portfolio_id, account_id=None, organization_node=None, share_principals=False):
+    """
+    Share a portfolio with an account, or with an organization node given as a pair of its type and id.
+
+    Organization shares complete asynchronously.
+    """
+    params = dict(PortfolioId=portfolio_id)
+    if account_id is not None:
+        params['AccountId'] = account_id
+    else:
+        params['OrganizationNode'] = dict(Type=organization_node[0], Value=organization_node[1])
+        params['SharePrincipals'] = share_principals
+    SERVICE_CATALOG.create_portfolio_share(**params)
+
+
+def update_portfolio_share(portfolio_id, organization_node, share_principals):
+    SERVICE_CATALOG.update_portfolio_share(
+        PortfolioId=portfolio_id,
+        OrganizationNode=dict(Type=organization_node[0], Value=organization_node[1]),
+        SharePrincipals=share_principals
+    )
+
+
+def associate_principal(portfolio_id, principal_arn):
+    """Associate a principal with a portfolio; an ARN without an account id is associated as an IAM pattern."""
+    SERVICE_CATALOG.associate_principal_with_portfolio(
+        PortfolioId=portfolio_id,
+        PrincipalARN=principal_arn,
+        PrincipalType='IAM_PATTERN' if principal_arn.split(':')[4] == '' else 'IAM'
+    )
+
+
 def create_constraint(portfolio_id, product_id, params, name):
     SERVICE_CATALOG.create_constraint(
         PortfolioId=portfolio_id,
@@ -120,8 +210,15 @@ def get_all_launch_paths(product_id):
     return launch_paths['LaunchPathSummaries']
 
 
-def search(term):
-    response = SERVICE_CATALOG.search_products_as_admin(
+def describe_product(product_id):
+    response = SERVICE_CATALOG.describe_product_as_admin(
+        Id=product_id
+    )
+    return response['ProductViewDetail']['ProductViewSummary']
+
+
+def search(term, region=None):
+    response = client(region).search_products_as_admin(
         Filters={
             'FullTextSearch': [
                 term,
@@ -158,12 +255,12 @@ def list_all_versions(product_id):
     return response['ProvisioningArtifactDetails']
 
 
-def new_version(product_id, name, template_url):
-    print(template_url)
+def new_version(product_id, name, template_url, region=None):
+    LOG.debug("New version template: %s", template_url)
     description = 'Release Candidate build increment'
     if 'build' in name:
         description = 'Incremental build; Not production ready!'
-    SERVICE_CATALOG.create_provisioning_artifact(
+    client(region).create_provisioning_artifact(
         ProductId=product_id,
         Parameters={
             'Name': name,
@@ -214,9 +311,28 @@ def is_provisioned(name, token=None):
             }
         )
     for product in response['ProvisionedProducts']:
-        print(product)
+        LOG.debug("Provisioned product: %s", product)
         if product['Name'] == name:
             return True
     if 'NextPageToken' in response:
         return is_provisioned(name, token=response['NextPageToken'])
     return False
+
+
+def provisioned_artifacts():
+    """
+    Get the product versions which are currently provisioned in this account.
+
+    Return:
+        set: Tuples of product id and provisioning artifact id.
+    """
+    provisioned = set()
+    params = dict(AccessLevelFilter={'Key': 'Account', 'Value': 'self'})
+    while True:
+        response = SERVICE_CATALOG.scan_provisioned_products(**params)
+        for product in response['ProvisionedProducts']:
+            if 'ProductId' in product and 'ProvisioningArtifactId' in product:
+                provisioned.add((product['ProductId'], product['ProvisioningArtifactId']))
+        if 'NextPageToken' not in response:
+            return provisioned
+        params['PageToken'] = response['NextPageToken']
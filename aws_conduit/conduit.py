@@ -1,16 +1,20 @@
 """A conduit for CI Pipelines in AWS!"""
+import functools
+import itertools
 import json
 import os
-import subprocess
 
-import semver
 import yaml
 from aws_conduit import conduit_factory as factory
-from aws_conduit import conduit_s3, helper
-from aws_conduit.aws import iam, s3, service_catalog
+from aws_conduit import conduit_log, conduit_package, conduit_regions, conduit_retention, conduit_s3, conduit_scheduler
+from aws_conduit import conduit_sharing, conduit_steps, conduit_trace, conduit_transfer, conduit_watch, helper
+from aws_conduit.aws import iam, service_catalog
+from aws_conduit.conduit_portfolio import ConduitPortfolio
+from aws_conduit.conduit_sls import ServerlessState
 from aws_conduit.helper import inject_config
 
 CONFIG_PREFIX = 'conduit.yaml'
+LOG = conduit_log.logger(__name__)
 
 
 def configure():
@@ -20,24 +24,60 @@ def configure():
     Return:
         bucket: An object handle on the Conduit configuration bucket.
     """
-    start = factory.start()
-    bucket = start.create_s3()
-    start.create_iam_role()
+    bucket = factory.config_bucket()
+    factory.start().create_iam_role()
     return bucket
 
 
+@conduit_trace.in_phase('sync')
 @inject_config
 def sync(config=None):
     account_id = helper.get_account_id()
-    print("Ensuring Conduit is up to date...")
+    LOG.info("Ensuring Conduit is up to date...")
     if 'portfolios' in config:
+        progress = conduit_log.progress(LOG, "Associating conduit with portfolios", total=len(config['portfolios']))
         for portfolio in config['portfolios']:
             if portfolio.exists():
-                print("Associating conduit with {}".format(portfolio.name))
+                LOG.debug("Associating conduit with %s", portfolio.name)
                 portfolio.associate_conduit(account_id)
             else:
-                print("Portfolio no longer exists!")
+                LOG.warning("Portfolio %s no longer exists!", portfolio.name)
                 config['portfolios'].remove(portfolio)
+            progress.update()
+        progress.done()
+
+
+@conduit_trace.in_phase('share')
+@inject_config
+def share_portfolios(names, targets, principals=None, share_principals=False, config=None):
+    """
+    Share portfolios with other accounts and organizational units.
+
+    Only the shares and principal associations which are missing are made.
+
+    Args:
+        names (list): The names of the portfolios, or None to share every portfolio.
+        targets (list): Account ids, organizational unit ids (ou-...) and organization ids (o-...).
+        principals (list): (Optional) Further principal ARNs to associate with the portfolios.
+        share_principals (bool): (Optional) Share principals with organizational units and organizations.
+
+    Return:
+        int: The number of changes made.
+    """
+    if not targets:
+        raise ValueError("Accounts or organizational units to share with must be provided")
+    if isinstance(names, str):
+        names = [name.strip() for name in names.split(',')]
+    if isinstance(principals, str):
+        principals = [principal.strip() for principal in principals.split(',')]
+    if names:
+        portfolios = [helper.get_portfolio(config, name=name) for name in names]
+    else:
+        portfolios = [portfolio for portfolio in config.get('portfolios', []) if isinstance(portfolio, ConduitPortfolio)]
+    LOG.info("Sharing %s portfolios...", len(portfolios))
+    changes = conduit_sharing.share(portfolios, targets, helper.get_account_id(), principals, share_principals)
+    LOG.info("Sharing complete, %s changes made...", changes)
+    return changes
 
 
 @inject_config
@@ -59,10 +99,10 @@ def new_portfolio(name, description, tags=None, config=None):
         tags = []
     alias = helper.get_alias()
     if alias:
-        print("Creating a new portfolio...")
+        LOG.info("Creating a new portfolio...")
         portfolio = factory.portfolio(name, portfolio_description=description)
         portfolio.create(tags)
-        print("Create complete...")
+        LOG.info("Create complete...")
         if 'portfolios' not in config:
             config['portfolios'] = []
         config['portfolios'].append(portfolio)
@@ -85,14 +125,14 @@ def update_portfolio(portfolio_id, name=None, description=None, config=None):
     """
     if portfolio_id is None:
         raise ValueError("A portfolio ID must be provided")
-    print("Updating portfolio with id: {}".format(portfolio_id))
+    LOG.info("Updating portfolio with id: %s", portfolio_id)
     portfolio = helper.get_portfolio(config, portfolio_id=portfolio_id)
     if name is not None:
         portfolio.name = name
     if description is not None:
         portfolio.description = description
     portfolio.update()
-    print("Portfolio updated successfully...")
+    LOG.info("Portfolio updated successfully...")
 
 
 @inject_config
@@ -105,10 +145,10 @@ def delete_portfolio(portfolio_id, config=None):
     """
     if portfolio_id is None:
         raise ValueError("A portfolio id must be provided")
-    print("Deleting portfolio with id: {}".format(portfolio_id))
+    LOG.info("Deleting portfolio with id: %s", portfolio_id)
     portfolio = helper.get_portfolio(config, portfolio_id=portfolio_id)
     for product in portfolio.products:
-        print("Disassociating product with id: {}".format(product.product_id))
+        LOG.debug("Disassociating product with id: %s", product.product_id)
         product.disassociate(portfolio.portfolio_id)
     portfolio.delete()
     config['portfolios'].remove(portfolio)
@@ -138,15 +178,15 @@ def new_product(name, description, cfntype, portfolio_name, tags=None, config=No
         raise ValueError("name, description, cfntype and portfolio_name must have values")
     if tags is None:
         tags = []
-    print("Creating a new product...")
+    LOG.info("Creating a new product...")
     product = factory.product(name, portfolio_name, product_description=description)
     portfolio = factory.portfolio(portfolio_name)
     portfolio_id = portfolio.get_id()
     support = dict() if 'support' not in config else config['support']
     product.create(support, tags)
-    print("Product created...")
+    LOG.info("Product created...")
     product.add_to_portfolio(portfolio_id)
-    print("Product assigned to portfolio: {}".format(portfolio_id))
+    LOG.info("Product assigned to portfolio: %s", portfolio_id)
     portfolio = helper.get_portfolio(config, name=portfolio_name)
     portfolio.products.append(product)
     return product
@@ -166,7 +206,7 @@ def update_product(product_id, name, description, cfntype, tags=None, config=Non
     """
     if product_id is None:
         raise ValueError("A product ID must be provided")
-    print("Updating product with id: {}".format(product_id))
+    LOG.info("Updating product with id: %s", product_id)
     product = helper.get_product(config, product_id=product_id)
     if name is not None:
         product.name = name
@@ -180,7 +220,7 @@ def update_product(product_id, name, description, cfntype, tags=None, config=Non
     if 'support' in config:
         support = config['support']
     product.update(support)
-    print("Product updated successfully...")
+    LOG.info("Product updated successfully...")
 
 
 @inject_config
@@ -193,13 +233,13 @@ def delete_product(product_id, config=None):
     """
     if product_id is None:
         raise ValueError("A product ID must be provided")
-    print("Deleting product with id: {}".format(product_id))
+    LOG.info("Deleting product with id: %s", product_id)
     for portfolio in config['portfolios']:
         for product in portfolio.products:
             if product.product_id == product_id:
                 product.delete()
                 portfolio.products.remove(product)
-                print("Product deleted successfully...")
+                LOG.info("Product deleted successfully...")
                 break
 
 
@@ -214,22 +254,23 @@ def associate_product_with_portfolio(product_id, portfolio_id, config=None):
     if portfolio is None:
         raise ValueError("Provided portfolio does not exist in Conduit config!")
 
-    bucket = configure()
-    print("Associating product with portfolio...")
+    LOG.info("Associating product with portfolio...")
     service_catalog.associate(product_id, portfolio_id)
-    print("Association successful...")
-    print("Finding product by id...")
-    product = factory.product_by_id(product_id, bucket)
-    print("Reflecting changes in Conduit config...")
-    portfolio.products.append(product)
+    LOG.info("Association successful...")
+    LOG.debug("Finding product by id...")
+    product = factory.product_by_id(product_id, config=config)
+    LOG.debug("Reflecting changes in Conduit config...")
+    if product not in portfolio.products:
+        portfolio.products.append(product)
     product.portfolio = portfolio.name
 
 
+@conduit_trace.in_phase('terminate')
 @inject_config
 def terminate_provisioned_product(product_id, stack_name, config=None):
     if product_id is None:
         raise ValueError("A product id must be provided")
-    print("Terminating product...")
+    LOG.info("Terminating product...")
     product = helper.get_product(config, product_id=product_id)
     product.terminate(stack_name)
 
@@ -238,7 +279,7 @@ def terminate_provisioned_product(product_id, stack_name, config=None):
 def provision_product(product_id, name, config=None):
     if product_id is None:
         raise ValueError("A product id must be provided")
-    print("Provisioning product...")
+    LOG.info("Provisioning product...")
     product = helper.get_product(config, product_id=product_id)
     _provision(product, name)
 
@@ -259,7 +300,7 @@ def set_default_support_config(description=None, email=None, url=None, config=No
         email (str): Contact email for product support.
         url (str): Contact URL for product support.
     """
-    print("Reading current configuration...")
+    LOG.info("Reading current configuration...")
     support = dict()
     if description:
         support['description'] = description
@@ -268,118 +309,279 @@ def set_default_support_config(description=None, email=None, url=None, config=No
     if url:
         support['url'] = url
     config['support'] = support
-    print("Writing new support configuration...")
+    LOG.info("Writing new support configuration...")
+
 
+def build(action, product, force=False, regions=None):
+    """
+    Release the products in conduitspec.yaml.
+
+    Products are built concurrently, each starting once the products it
+    declares in dependsOn have been released. A build version is not released
+    for a product whose inputs are unchanged since its last release, unless forced.
 
-def build(action, product):
-    print("Releasing a new build version...")
+    Products are also released to any other regions listed for them, or given,
+    with a matrix of each product's release in each region reported at the end.
+
+    Args:
+        action (str): One of [build, major, minor, patch]
+        product (str): (Optional) Only release the named product.
+        force (bool): Release products even if their inputs are unchanged.
+        regions (list): (Optional) Other regions to release every product to.
+    """
+    LOG.info("Releasing a new build version...")
     spec = yaml.safe_load(open('conduitspec.yaml').read())
-    for product_spec in spec['inventory']:
-        if (product is not None and product_spec['product'] == product) or product is None:
-            # Perform Build Steps
-            if 'serviceCatalog' in product_spec and product_spec['serviceCatalog']:
-                if 'build' in product_spec:
-                    for step in product_spec['build']:
-                        subprocess.call(step, shell=True)
-                _service_catalog_build(action, product_spec)
-            else:
-                print(product_spec)
-                _s3_build(action, product_spec)
+    _build_inventory(action, spec, _inventory(spec, product), force, regions)
+
+
+def watch(product=None, force=False):
+    """
+    Release a build version of products in conduitspec.yaml whenever their files change.
+
+    Configuration, clients and catalog metadata stay warm between builds, and
+    only the products whose files changed are rebuilt. A failed first build is
+    reported, and watching starts regardless.
+
+    Args:
+        product (str): (Optional) Only watch the named product.
+        force (bool): Release the first build even if inputs are unchanged.
+    """
+    try:
+        build('build', product, force=force)
+    except Exception as e:
+        LOG.error("Build failed: %s", e)
+
+    def load():
+        return _inventory(yaml.safe_load(open('conduitspec.yaml').read()), product)
+
+    def rebuild(product_specs):
+        _build_inventory('build', yaml.safe_load(open('conduitspec.yaml').read()), product_specs, False)
+
+    try:
+        conduit_watch.watch(load, rebuild)
+    except KeyboardInterrupt:
+        LOG.info("Stopped watching.")
+
+
+def _inventory(spec, product):
+    return [product_spec for product_spec in spec['inventory']
+            if product is None or product_spec['product'] == product]
+
+
+def _build_inventory(action, spec, product_specs, force, regions=None):
+    specs_by_name = dict((conduit_scheduler.node_name(product_spec), product_spec) for product_spec in product_specs)
+    graph = conduit_scheduler.inventory_graph(product_specs)
+    bucket = factory.config_bucket()
+    bucket.get_manifest()
+    timeline = []
+    policies = dict((name, conduit_retention.policy_for(spec, product_spec['portfolio'], product_spec['product']))
+                    for name, product_spec in specs_by_name.items())
+    targets = dict((name, conduit_regions.regions_for(spec, product_spec, factory.REGION, regions))
+                   for name, product_spec in specs_by_name.items())
+    failures = []
+    try:
+        timeline = conduit_scheduler.run_graph(
+            graph, lambda name: _build_product(action, specs_by_name[name], force, policies[name], targets[name]))
+    finally:
+        conduit_s3.save_manifests()
+        conduit_steps.write_report(timeline)
+        failures = conduit_regions.report()
+    if failures:
+        raise ValueError("Releasing failed in: {}".format(", ".join("{} ({})".format(name, region) for name, region in failures)))
+
+
+@conduit_trace.in_phase('release')
+def _build_product(action, product_spec, force=False, policy=None, regions=None):
+    if 'serviceCatalog' in product_spec and product_spec['serviceCatalog']:
+        _service_catalog_build(action, product_spec, force=force, policy=policy, regions=regions)
+    else:
+        _s3_build(action, product_spec, force=force, policy=policy, regions=regions)
+
+
+def _unchanged(action, force, product_spec, last_fingerprint, fingerprint):
+    if action == 'build' and not force and last_fingerprint == fingerprint:
+        LOG.info("Inputs of %s are unchanged since its last release, skipping...", product_spec['product'])
+        return True
+    return False
+
+
+def _run_build(action, force, product_spec, last_fingerprint, env=None):
+    """
+    Run the build steps of a product, unless its inputs are unchanged since its last release.
+
+    When none of the files a product is released from are build outputs (see
+    conduit_watch.build_outputs), they are fingerprinted before the steps run,
+    so that an unchanged product does not pay for its build steps.
+
+    Return:
+        tuple: The fingerprint of the product's inputs and its Serverless state, or None if it is unchanged.
+    """
+    outputs_fingerprinted = bool(conduit_watch.build_outputs(product_spec))
+    if not outputs_fingerprinted:
+        fingerprint, sls_state = _fingerprint(product_spec)
+        if _unchanged(action, force, product_spec, last_fingerprint, fingerprint):
+            return None
+    if 'build' in product_spec:
+        conduit_steps.run_steps(product_spec['product'], product_spec['build'], env=env)
+    if outputs_fingerprinted:
+        fingerprint, sls_state = _fingerprint(product_spec)
+        if _unchanged(action, force, product_spec, last_fingerprint, fingerprint):
+            return None
+    return fingerprint, sls_state
+
+
+def _fingerprint(product_spec):
+    sls_state = None
+    if 'sls' in product_spec and product_spec['sls'] is True:
+        sls_state = ServerlessState()
+    return helper.product_fingerprint(product_spec, digests=sls_state.digests if sls_state else None), sls_state
 
 
 @inject_config
-def _service_catalog_build(action, product_spec, config=None):
-    result = helper.find_build_product(product_spec, config)
+def _service_catalog_build(action, product_spec, force=False, policy=None, regions=None, config=None):
+    with helper.CONFIG_LOCK:
+        result = helper.find_build_product(product_spec, config)
     if result['product'] is None:
         raise ValueError('Product was not found in config!')
     product = result['product']
-    print(product_spec)
+    LOG.debug("Releasing %s", product_spec)
+    built = _run_build(action, force, product_spec, getattr(product, 'fingerprint', None))
+    if built is None:
+        return
+    fingerprint = built[0]
     update_iam_role(product_spec)
-    product.add_resources(product_spec)
+    with helper.CONFIG_LOCK:
+        product.add_resources(product_spec)
     if 'roleName' in product_spec:
-        product.create_deployer_launch_constraint(helper.get_portfolio(config, name=product_spec['portfolio']), product_spec['roleName'])
+        product.create_deployer_launch_constraint(result['portfolio'], product_spec['roleName'])
     product.release(action, product_spec['artifact'], product.version)
+    with helper.CONFIG_LOCK:
+        product.fingerprint = fingerprint
+    conduit_regions.fan_out(conduit_scheduler.node_name(product_spec), product.version, regions,
+                            functools.partial(product.release_to_region, product_spec['artifact']))
     if action != 'build':
-        product.tidy_versions()
+        product.tidy_versions(policy)
 
 
 @inject_config
-def _s3_build(action, product_spec, config=None):
-    print(product_spec)
-    result = helper.find_s3_build_product(product_spec, config)
-    next_version = helper.next_version(action, result['product']['currentVersion'])
-    print("The next version is: {}".format(next_version))
-    result['product']['currentVersion'] = next_version
-    if 'nextVersion' in result['product']:
-        del result['product']['nextVersion']
-    if 'policy' in result['product']:
-        del result['product']['policy']
-    if 'deployProfile' in result['product']:
-        del result['product']['deployProfile']
-    start = factory.start()
-    bucket = start.create_s3()
-    sls_package = None
+def _s3_build(action, product_spec, force=False, policy=None, regions=None, config=None):
+    LOG.debug("Releasing %s", product_spec)
+    with helper.CONFIG_LOCK:
+        result = helper.find_s3_build_product(product_spec, config)
+        next_version = helper.next_version(action, result['product']['currentVersion'])
+    bucket = factory.config_bucket()
+    built = _run_build(action, force, product_spec, result['product'].get('fingerprint'), env=dict(os.environ, VERSION=next_version))
+    if built is None:
+        return
+    fingerprint, sls_state = built
+    LOG.info("The next version is: %s", next_version)
+    with helper.CONFIG_LOCK:
+        result['product']['currentVersion'] = next_version
+        if 'nextVersion' in result['product']:
+            del result['product']['nextVersion']
+        if 'policy' in result['product']:
+            del result['product']['policy']
+        if 'deployProfile' in result['product']:
+            del result['product']['deployProfile']
+
+    template = conduit_transfer.run_uploads(_resource_uploads(_release_resources(product_spec), product_spec, bucket, next_version, sls_state))[0]
+    with helper.CONFIG_LOCK:
+        result['product']['template'] = template
+        result['product']['fingerprint'] = fingerprint
+        result['product'].update(product_spec)
+    conduit_regions.fan_out(conduit_scheduler.node_name(product_spec), next_version, regions,
+                            functools.partial(_s3_release_to_region, product_spec, next_version, sls_state))
+    if action != 'build':
+        _tidy_versions(product_spec['portfolio'], product_spec['product'], next_version, bucket, policy)
 
-    if 'build' in product_spec:
-        for step in product_spec['build']:
-            subprocess.call(step, shell=True, env=dict(os.environ, VERSION=next_version))
 
-    if 'sls' in product_spec and product_spec['sls'] is True:
-        sls_state = json.load(open('.serverless/serverless-state.json'))
-        sls_package = sls_state['package']
-        sls_package['bucket'] = sls_state['service']['provider']['deploymentBucketObject']['name']
-        result['product']['template'] = helper.put_sls_resource(
-            product_spec['artifact'], bucket, product_spec['portfolio'], product_spec['product'], next_version, sls_package)
-    else:
-        result['product']['template'] = helper.put_resource(
-            product_spec['artifact'], product_spec['artifact'], bucket, product_spec['portfolio'], product_spec['product'], next_version)
-    if 'associatedResources' in product_spec:
-        _put_resources(product_spec['associatedResources'], product_spec, bucket, next_version, sls_package)
-    if 'nestedStacks' in product_spec:
-        _put_resources(product_spec['nestedStacks'], product_spec, bucket, next_version, sls_package)
-    result['product'].update(product_spec)
-
-
-def _tidy_versions(portfolio, product, version, bucket):
-    versions = s3.get_sub_folders(bucket.name, "{}/{}/{}".format(portfolio, product, 'core'))
-    for item in versions:
-        this_version = item.split("/")[-1]
-        if ('+build' in this_version and
-                semver.compare(this_version, version) == -1):
-            prefix = "{}/{}/{}/{}".format(portfolio, product, 'core', this_version)
-            print("Tidying version: {}".format(prefix))
-            s3.delete_folder(bucket.name, prefix)
-
-
-def _put_resources(resources, product_spec, bucket, next_version, sls_package):
+@conduit_trace.in_phase('tidy')
+def _tidy_versions(portfolio, product, version, bucket, policy=None):
+    if policy is None:
+        policy = conduit_retention.DEFAULT_POLICY
+    conduit_retention.run(conduit_retention.s3_tasks(bucket.name, portfolio, product, version, policy))
+
+
+@conduit_trace.in_phase('tidy')
+@conduit_s3.saves_manifests
+@inject_config
+def gc(config=None):
+    """
+    Remove the versions of every product in the catalog which its retention policy no longer keeps.
+
+    Retention policies are read from conduitspec.yaml when there is one in the
+    current directory; other products use the default policy, which removes
+    the builds below the current version.
+    """
+    spec = None
+    if os.path.exists('conduitspec.yaml'):
+        spec = yaml.safe_load(open('conduitspec.yaml').read())
+    bucket = factory.config_bucket()
+    provisioned = None
+    tasks = []
+    for portfolio in config['portfolios']:
+        if isinstance(portfolio, ConduitPortfolio):
+            for product in portfolio.products:
+                policy = conduit_retention.policy_for(spec, portfolio.name, product.name)
+                if policy['keepProvisioned'] and provisioned is None:
+                    provisioned = service_catalog.provisioned_artifacts()
+                tasks.extend(conduit_retention.product_tasks(product, policy, provisioned))
+        else:
+            for product in portfolio['products']:
+                policy = conduit_retention.policy_for(spec, portfolio['name'], product['name'])
+                tasks.extend(conduit_retention.s3_tasks(bucket.name, portfolio['name'], product['name'],
+                                                        product['currentVersion'], policy))
+    conduit_retention.run(tasks)
+
+
+def _release_resources(product_spec):
+    return [product_spec['artifact']] + product_spec.get('associatedResources', []) + product_spec.get('nestedStacks', [])
+
+
+def _s3_release_to_region(product_spec, next_version, sls_state, region):
+    bucket = factory.regional_bucket(region)
+    bucket.get_manifest()
+    conduit_transfer.run_uploads(_resource_uploads(_release_resources(product_spec), product_spec, bucket, next_version, sls_state))
+
+
+def _resource_uploads(resources, product_spec, bucket, next_version, sls_state):
+    uploads = []
     for resource in resources:
-        if 'sls' in product_spec and product_spec['sls'] is True:
-            helper.put_sls_resource(resource, bucket, product_spec['portfolio'], product_spec['product'], next_version, sls_package)
+        if sls_state is not None:
+            upload = functools.partial(helper.put_sls_resource, resource, bucket, product_spec['portfolio'],
+                                       product_spec['product'], next_version, sls_state.package,
+                                       digest=sls_state.digest(resource))
+            uploads.append(conduit_transfer.upload_task(resource, upload))
         else:
-            if isinstance(resource, str):
-                source_path = resource
-                destination_path = resource
-            else:
-                source_path = resource['source']
-                destination_path = resource['destination']
-            helper.put_resource(source_path, destination_path, bucket, product_spec['portfolio'], product_spec['product'], next_version)
+            source_path, destination_path = helper.resource_paths(resource)
+            upload = functools.partial(helper.put_resource, source_path, destination_path, bucket, product_spec['portfolio'],
+                                       product_spec['product'], next_version)
+            uploads.append(conduit_transfer.upload_task(source_path, upload))
+    return uploads
 
 
 @inject_config
-def package_portfolio(portfolio_name, environment, config=None):
-    package = helper.get_all_portfolio_artifacts(portfolio_name, config)
-    print(json.dumps(package))
-
-    start = factory.start()
-    bucket = start.create_s3()
+def package_portfolio(portfolio_name, environment, fat=False, config=None):
+    """
+    Package the artifacts of a portfolio.
 
-    file_name = '{}.json'.format(portfolio_name)
-    file_path = os.path.join(conduit_s3.LOCAL_STORE, file_name)
-    zip_name = '{}-{}.zip'.format(portfolio_name, environment)
-    zip_path = os.path.join(conduit_s3.LOCAL_STORE, zip_name)
-    open(file_path, "w+").write(json.dumps(package))
-    subprocess.call('cd {} && zip -r {} {}'.format(conduit_s3.LOCAL_STORE, zip_name, file_name), shell=True)
-    bucket.put_resource(zip_path, '{}/{}-{}.zip'.format(portfolio_name, portfolio_name, environment))
+    Args:
+        portfolio_name (str): The name of the portfolio to package.
+        environment (str): The environment to package.
+        fat (bool): Bundle every released artifact into the package, not just their urls.
+    """
+    package = helper.get_all_portfolio_artifacts(portfolio_name, config)
+    conduit_log.report('package', json.dumps(package), package)
+
+    bucket = factory.config_bucket()
+    entries = {'{}.json'.format(portfolio_name): json.dumps(package).encode('utf-8')}
+    if fat:
+        folders = helper.get_portfolio_release_folders(portfolio_name, config)
+        entries = itertools.chain(sorted(entries.items()), conduit_package.fat_package_entries(bucket, folders))
+        prefix = '{}/{}-{}-fat.zip'.format(portfolio_name, portfolio_name, environment)
+    else:
+        prefix = '{}/{}-{}.zip'.format(portfolio_name, portfolio_name, environment)
+    conduit_package.put_package(bucket, prefix, entries)
 
 
 @inject_config
@@ -391,18 +593,11 @@ def package_product(portfolio_name, product_name, environment, config=None):
             package.append(result)
         elif 'product' in result and result['product'] == product_name:
             package.append(result)
-    print(json.dumps(package))
-
-    start = factory.start()
-    bucket = start.create_s3()
+    conduit_log.report('package', json.dumps(package), package)
 
-    file_name = '{}-{}.json'.format(portfolio_name, product_name)
-    file_path = os.path.join(conduit_s3.LOCAL_STORE, file_name)
-    zip_name = '{}-{}-{}.zip'.format(portfolio_name, product_name, environment)
-    zip_path = os.path.join(conduit_s3.LOCAL_STORE, zip_name)
-    open(file_path, "w+").write(json.dumps(package))
-    subprocess.call('cd {} && zip -r {} {}'.format(conduit_s3.LOCAL_STORE, zip_name, file_name), shell=True)
-    bucket.put_resource(zip_path, '{}/{}-{}-{}.zip'.format(portfolio_name, portfolio_name, product_name, environment))
+    bucket = factory.config_bucket()
+    entries = {'{}-{}.json'.format(portfolio_name, product_name): json.dumps(package).encode('utf-8')}
+    conduit_package.put_package(bucket, '{}/{}-{}-{}.zip'.format(portfolio_name, portfolio_name, product_name, environment), entries)
 
 
 @inject_config
@@ -417,7 +612,7 @@ def provision_product_build(product_name, name, config=None):
                 product_spec = product
         if product_spec is None:
             raise ValueError("The requested product was not defined in conduitspec.yaml")
-        print("Provisioning product...")
+        LOG.info("Provisioning product...")
         product = helper.find_build_product(spec, config)
         update_iam_role(product_spec)
         _provision(product, name)
@@ -428,13 +623,14 @@ def provision_product_build(product_name, name, config=None):
         raise ValueError("No products defined in conduitspec.yaml")
 
 
+@conduit_trace.in_phase('provision')
 def _provision(product, name):
     version_id = product.get_version_id()
     launch_paths = service_catalog.get_all_launch_paths(product.product_id)
-    print("Getting launch path...")
+    LOG.debug("Getting launch path...")
     if launch_paths:
         launch_path = launch_paths[0]['Id']
-        print("Getting input parameters...")
+        LOG.debug("Getting input parameters...")
         provisioning_params = service_catalog.get_provisioning_parameters(product.product_id,
                                                                           version_id,
                                                                           launch_path)
@@ -453,16 +649,17 @@ def _provision(product, name):
                     Value=input_value
                 )
                 params.append(param)
-        print(params)
+        LOG.debug("Provisioning parameters: %s", params)
         product.provision(params, name)
 
 
+@conduit_trace.in_phase('terminate')
 @inject_config
 def terminate_product(provisioned_product_name, config=None):
     if provisioned_product_name is None:
         raise ValueError("A product name must be provided")
     spec = yaml.safe_load(open('conduitspec.yaml').read())
-    print("Terminating product...")
+    LOG.info("Terminating product...")
     product = None
     for port in config['portfolios']:
         if port.name == spec['portfolio']:
@@ -479,12 +676,12 @@ def update_iam_role(spec):
         try:
             iam.create_role(spec['roleName'], 'Deployer role for {}'.format(spec['name']))
         except:
-            print('Role probably already exists...')
+            LOG.info('Role probably already exists...')
         try:
             iam.add_policy(spec['roleName'], 'ServiceCatalogEndUserFullAccess')
         except:
-            print('Policy probably already added')
+            LOG.info('Policy probably already added')
         try:
             iam.add_policy(spec['roleName'], 'AdministratorAccess')
         except:
-            print('Policy probably already added!')
+            LOG.info('Policy probably already added!')
@@ -0,0 +1,324 @@
+"""The conduit command line."""
+import contextlib
+
+import cmdln
+from aws_conduit import conduit, conduit_daemon, conduit_log, conduit_plan, conduit_profile, conduit_trace, helper
+
+LOG = conduit_log.logger(__name__)
+
+
+class Conduit(cmdln.Cmdln):
+    name = "conduit"
+
+    def get_optparser(self):
+        parser = cmdln.Cmdln.get_optparser(self)
+        parser.add_option("-q", "--quiet", action="store_const", const="warning", dest="log_level",
+                          help="Only show warnings and errors.")
+        parser.add_option("-v", "--verbose", action="store_const", const="debug", dest="log_level",
+                          help="Show the detail of every item a command works through.")
+        parser.add_option("--json", action="store_true", default=False,
+                          help="Write progress messages as json lines.")
+        parser.add_option("--plan", action="store_true", default=False,
+                          help="Show the changes a command would make, and the AWS calls it needs, without making them.")
+        parser.add_option("--trace", metavar="PATH", default=None,
+                          help="Write a Chrome trace of every AWS call the command makes to PATH, and summarise them.")
+        parser.add_option("--profile", metavar="PATH", default=None,
+                          help="Profile the command, writing pstats to PATH and summarising the slowest functions.")
+        parser.add_option("--profile-top", metavar="N", type="int", default=conduit_profile.DEFAULT_TOP,
+                          help="The number of functions in the profile summary.")
+        parser.add_option("--profile-memory", action="store_true", default=False,
+                          help="Also trace memory allocations while profiling, reporting the peak.")
+        return parser
+
+    def _dispatch_cmd(self, handler, argv):
+        options = getattr(self, 'options', None)
+        plan = None
+        trace = None
+        profile = None
+        profile_settings = _profile_settings(options)
+        if options is not None:
+            conduit_log.configure(options.log_level, json_output=options.json)
+        try:
+            with contextlib.ExitStack() as stack:
+                if profile_settings is not None:
+                    profile = stack.enter_context(conduit_profile.Profile(argv[0], top=profile_settings['top'],
+                                                                          memory=profile_settings['memory']))
+                # The trace goes first, so that it still sees the write calls the plan answers with stubs.
+                if options is not None and options.trace:
+                    trace = stack.enter_context(conduit_trace.Trace(argv[0]))
+                if options is not None and options.plan:
+                    plan = stack.enter_context(conduit_plan.Plan())
+                result = cmdln.Cmdln._dispatch_cmd(self, handler, argv)
+            if plan is not None:
+                plan.report()
+            return result
+        finally:
+            if trace is not None:
+                trace.report()
+                trace.write(options.trace)
+            if profile is not None:
+                profile.report()
+                profile.write(profile_settings['path'])
+
+    def do_start(self, subcmd, opts):
+        """
+        ${cmd_name}: Set up the initial Conduit resources.
+
+        ${cmd_usage}
+        """
+        conduit.configure()
+
+    @cmdln.option("-e", "--email",
+                  help="Contact email for product support.")
+    @cmdln.option("-u", "--url",
+                  help="Contact URL for product support.")
+    @cmdln.option("-d", "--description",
+                  help="Support information about the product.")
+    def do_support(self, subcmd, opts):
+        """
+        ${cmd_name}: Set the default support configuration.
+
+        ${cmd_usage}
+        ${cmd_option_list}
+        """
+        conduit.set_default_support_config(
+            description=opts.description,
+            email=opts.email,
+            url=opts.url
+        )
+
+    @cmdln.option("-n", "--name",
+                  help="The name of the portfolio.")
+    @cmdln.option("-d", "--description",
+                  help="Information about the portfolio.")
+    @cmdln.option("-i", "--id",
+                  help="The portfolio id for use on an update.")
+    @cmdln.option("-a", "--accounts",
+                  help="Comma separated accounts, organizational units and organizations to share with.")
+    @cmdln.option("--principals",
+                  help="Comma separated principal ARNs to associate with shared portfolios.")
+    @cmdln.option("--share-principals", action="store_true", default=False,
+                  help="Share principals with organizational units and organizations.")
+    def do_portfolio(self, subcmd, opts, action):
+        """
+        ${cmd_name}: Portfolio management for the masses!
+
+        ${cmd_usage}
+        Actions:
+            create
+            update
+            delete
+            list
+            share
+
+        ${cmd_option_list}
+        """
+        actions = [
+            'create',
+            'update',
+            'delete',
+            'list',
+            'share'
+        ]
+        if action not in actions:
+            raise ValueError("Not a valid action: {}".format(action))
+        if action == 'create':
+            conduit.new_portfolio(opts.name, opts.description)
+        elif action == 'update':
+            conduit.update_portfolio(opts.id, opts.name, opts.description)
+        elif action == 'delete':
+            conduit.delete_portfolio(opts.id)
+        elif action == 'list':
+            conduit.list_portfolios()
+        elif action == 'share':
+            conduit.share_portfolios(opts.name, opts.accounts, opts.principals, opts.share_principals)
+        else:
+            LOG.error("%s: not a valid action for portfolio", action)
+
+    @cmdln.option("-n", "--name",
+                  help="The name of the portfolio.")
+    @cmdln.option("-d", "--description",
+                  help="Information about the product.")
+    @cmdln.option("-c", "--cfntype",
+                  help="yaml or json?")
+    @cmdln.option("-p", "--portfolio",
+                  help="The name of the portfolio.")
+    @cmdln.option("-i", "--id",
+                  help="The product id for use on an update.")
+    @cmdln.option("-s", "--stackname",
+                  help="The stack name when provisioning a prouct.")
+    def do_product(self, subcmd, opts, action):
+        """
+        ${cmd_name}: Product management for the masses!
+
+        ${cmd_usage}
+        Actions:
+            create
+            update
+            delete
+            list
+            associate
+            provision
+
+        ${cmd_option_list}
+        """
+        actions = [
+            'create',
+            'update',
+            'delete',
+            'list',
+            'associate',
+            'provision',
+            'terminate'
+        ]
+        if action not in actions:
+            raise ValueError("Not a valid action: {}".format(action))
+        if action == 'create':
+            conduit.new_product(opts.name, opts.description, opts.cfntype, opts.portfolio)
+        elif action == 'update':
+            conduit.update_product(opts.id, opts.name, opts.description, opts.cfntype)
+        elif action == 'delete':
+            conduit.delete_product(opts.id, None)
+        elif action == 'list':
+            conduit.list_products()
+        elif action == 'associate':
+            conduit.associate_product_with_portfolio(opts.id, opts.portfolio)
+        elif action == 'provision':
+            conduit.provision_product(opts.id, opts.name, opts.stackname)
+        elif action == 'terminate':
+            conduit.terminate_provisioned_product(opts.id, opts.stackname)
+        else:
+            LOG.error("%s: not a valid action for product", action)
+
+    @cmdln.option("-p", "--product",
+                  help="The name of the product to build.")
+    @cmdln.option("-f", "--force", action="store_true", default=False,
+                  help="Release products even if their inputs are unchanged.")
+    @cmdln.option("-w", "--watch", action="store_true", default=False,
+                  help="Keep running, releasing a build version whenever a product's files change.")
+    @cmdln.option("-r", "--regions",
+                  help="Comma separated regions to also release to, instead of those in the conduitspec.yaml.")
+    def do_build(self, subcmd, opts, *action):
+        """
+        ${cmd_name}: Release a build from a conduitspec.yaml
+
+        ${cmd_usage}
+        Actions:
+            major
+            minor
+            patch
+
+        ${cmd_option_list}
+        """
+        if opts.watch:
+            if action:
+                raise ValueError("Only build versions can be released in watch mode")
+            conduit.watch(opts.product, force=opts.force)
+        elif action and action[0] == 'major':
+            LOG.info("Releasing new major version...")
+            conduit.build('major', opts.product, force=opts.force, regions=opts.regions)
+        elif action and action[0] == 'minor':
+            LOG.info("Releasing new minor version...")
+            conduit.build('minor', opts.product, force=opts.force, regions=opts.regions)
+        elif action and action[0] == 'patch':
+            LOG.info("Release new patch version...")
+            conduit.build('patch', opts.product, force=opts.force, regions=opts.regions)
+        else:
+            LOG.info("Release new build version...")
+            conduit.build('build', opts.product, force=opts.force, regions=opts.regions)
+
+    @cmdln.option("-p", "--product",
+                  help="The name of the product to provision.")
+    @cmdln.option("-n", "--name",
+                  help="A name to assign to the provisioned product.")
+    def do_provision(self, subcmd, opts):
+        """
+        ${cmd_name}: Provision a product from a conduitspec.yaml
+
+        ${cmd_usage}
+        ${cmd_option_list}
+        """
+        conduit.provision_product_build(opts.product, opts.name)
+
+    @cmdln.option("-n", "--name",
+                  help="A name to assign to the provisioned product.")
+    def do_terminate(self, subcmd, opts):
+        """
+        ${cmd_name}: Terminate a product from a conduitspec.yaml
+
+        ${cmd_usage}
+        ${cmd_option_list}
+        """
+        conduit.terminate_product(opts.name)
+
+    def do_sync(seld, subcmd, opts):
+        """
+        ${cmd_name}: Ensure conduit is up to date.
+
+        ${cmd_usage}
+        ${cmd_option_list}
+        """
+        conduit.sync()
+
+    def do_gc(self, subcmd, opts):
+        """
+        ${cmd_name}: Remove product versions which their retention policies no longer keep.
+
+        ${cmd_usage}
+        ${cmd_option_list}
+        """
+        conduit.gc()
+
+    def do_daemon(self, subcmd, opts, action):
+        """
+        ${cmd_name}: Manage a background Conduit process which runs forwarded commands.
+
+        ${cmd_usage}
+        Actions:
+            start
+            stop
+            status
+
+        The daemon runs in the foreground; use a process supervisor or & to background it.
+
+        ${cmd_option_list}
+        """
+        if action == 'start':
+            conduit_daemon.serve(run_forwarded)
+        elif action == 'stop':
+            conduit_daemon.stop()
+        elif action == 'status':
+            conduit_daemon.status()
+        else:
+            raise ValueError("Not a valid action: {}".format(action))
+
+    @cmdln.option("-p", "--portfolio",
+                  help="The name of the portfolio to package.")
+    @cmdln.option("-e", "--environment",
+                  help="The environment to package.")
+    @cmdln.option("-f", "--fat", action="store_true", default=False,
+                  help="Bundle every released artifact into the package.")
+    def do_package(self, subcmd, opts):
+        conduit.package_portfolio(opts.portfolio, opts.environment, fat=opts.fat)
+
+    @cmdln.option("-p", "--portfolio",
+                  help="The name of the portfolio to package.")
+    @cmdln.option("-d", "--product",
+                  help="The name of the product to package.")
+    @cmdln.option("-e", "--environment",
+                  help="The environment to package.")
+    def do_package_product(self, subcmd, opts):
+        conduit.package_product(opts.portfolio, opts.product, opts.environment)
+
+
+def run_forwarded(argv):
+    """Run a command forwarded to the daemon, making sure its cached configuration is current."""
+    helper.refresh_config()
+    return Conduit().main(['conduit'] + argv)
+
+
+def _profile_settings(options):
+    # --profile wins over CONDUIT_PROFILE, which lets CI profile commands without changing them.
+    if options is not None and options.profile:
+        return dict(path=options.profile, top=options.profile_top, memory=options.profile_memory)
+    return conduit_profile.from_environment()
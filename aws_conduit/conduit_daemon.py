@@ -0,0 +1,311 @@
+"""
+A long lived Conduit process which runs the commands of the conduit CLI.
+
+The daemon keeps boto3 clients, connection pools, account identity, bucket
+checks, parsed configuration and catalog lookups warm between commands. The
+CLI forwards each command to it over a Unix socket, and runs the command
+itself when no daemon is listening. The socket lives in a directory only its
+user can use, and the CLI only talks to a daemon run by the same user. This module only uses the standard
+library, so forwarding a command does not pay for importing boto3.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import socket
+import socketserver
+import stat
+import struct
+import sys
+import tempfile
+import threading
+import traceback
+
+
+def runtime_dir():
+    """Get the per-user directory the daemon's socket is kept in: $XDG_RUNTIME_DIR, or conduit-<uid> in the temp directory."""
+    return os.environ.get('XDG_RUNTIME_DIR') or os.path.join(tempfile.gettempdir(), 'conduit-{}'.format(os.getuid()))
+
+
+SOCKET_PATH = os.environ.get('CONDUIT_SOCKET', os.path.join(runtime_dir(), 'conduit.sock'))
+DISABLE_ENV = 'CONDUIT_NO_DAEMON'
+SHARED_PREFIXES = ('AWS_', 'CONDUIT_')
+LOCAL_COMMANDS = ('daemon', 'help', 'provision')
+LOCAL_OPTIONS = ('-w', '--watch')
+CONNECT_TIMEOUT = 0.5
+
+
+def forward(args, path=None):
+    """
+    Run a command in the daemon, if one is running.
+
+    Commands are not forwarded when CONDUIT_NO_DAEMON is set, for daemon and
+    watch commands, for provisioning (which prompts for parameters), or when
+    the daemon was started with different AWS or Conduit environment
+    variables, since its clients would act as someone else. Nor are they
+    forwarded to a socket owned by another user. See command_request for what
+    is sent.
+
+    Args:
+        args (list): The command line arguments, without the program name.
+        path (str): (Optional) The socket the daemon listens on.
+
+    Return:
+        int: The exit status of the command, or None if it should run in this process.
+    """
+    if os.environ.get(DISABLE_ENV) or not args or _runs_locally(args):
+        return None
+    connection = _connect(path or SOCKET_PATH)
+    if connection is None:
+        return None
+    with connection, connection.makefile('rb') as rfile, connection.makefile('wb') as wfile:
+        _send(wfile, command_request(args))
+        for line in rfile:
+            message = json.loads(line.decode('utf-8'))
+            if 'stdout' in message:
+                sys.stdout.write(message['stdout'])
+                sys.stdout.flush()
+            elif 'stderr' in message:
+                sys.stderr.write(message['stderr'])
+                sys.stderr.flush()
+            elif 'refused' in message:
+                return None
+            elif 'exit' in message:
+                return message['exit']
+    print("The Conduit daemon stopped before the command finished.", file=sys.stderr)
+    return 1
+
+
+def command_request(args, environment=None):
+    """
+    Describe a command for the daemon to run.
+
+    AWS and Conduit variables, credentials among them, are only sent as a
+    fingerprint: the daemon refuses commands whose fingerprint differs from
+    its own, and runs the rest with its own values. The other variables are
+    sent, as build steps may need them.
+
+    Args:
+        args (list): The command line arguments, without the program name.
+        environment (dict): (Optional) The environment of the command. Defaults to os.environ.
+
+    Return:
+        dict: The args, cwd, environment and environment key of the command.
+    """
+    environment = os.environ if environment is None else environment
+    return dict(args=args, cwd=os.getcwd(), key=environment_key(environment),
+                environment=dict((key, value) for key, value in environment.items() if not key.startswith(SHARED_PREFIXES)))
+
+
+def serve(run, path=None):
+    """
+    Run commands forwarded by the CLI until stopped.
+
+    Commands run one at a time, in the working directory and environment of
+    the CLI that forwarded them, with their output streamed back to it. The
+    socket's directory is created for this user only, if it does not exist,
+    and must not be usable by anyone else.
+
+    Args:
+        run (function): Runs a command, given its arguments, and returns its exit status.
+        path (str): (Optional) The socket to listen on.
+    """
+    path = path or SOCKET_PATH
+    _private_directory(os.path.dirname(os.path.abspath(path)))
+    if _connect(path) is not None:
+        raise ValueError("A Conduit daemon is already listening on {}".format(path))
+    if os.path.exists(path):
+        os.remove(path)
+    umask = os.umask(0o177)
+    try:
+        server = DaemonServer(path, CommandHandler, run, environment_key(os.environ))
+    finally:
+        os.umask(umask)
+    print("Conduit daemon listening on {}".format(path))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.remove(path)
+    print("Conduit daemon stopped.")
+
+
+def stop(path=None):
+    """Stop the daemon, once any command it is running has finished."""
+    connection = _connect(path or SOCKET_PATH)
+    if connection is None:
+        print("No Conduit daemon is running.")
+        return False
+    with connection, connection.makefile('rb') as rfile, connection.makefile('wb') as wfile:
+        _send(wfile, dict(stop=True))
+        rfile.readline()
+    print("Conduit daemon stopped.")
+    return True
+
+
+def status(path=None):
+    path = path or SOCKET_PATH
+    connection = _connect(path)
+    if connection is None:
+        print("No Conduit daemon is running.")
+        return False
+    connection.close()
+    print("Conduit daemon listening on {}".format(path))
+    return True
+
+
+def environment_key(environment):
+    """Fingerprint the environment variables which the daemon's clients and settings depend on."""
+    shared = sorted((key, value) for key, value in environment.items() if key.startswith(SHARED_PREFIXES))
+    return hashlib.sha256(json.dumps(shared).encode('utf-8')).hexdigest()
+
+
+class DaemonServer(socketserver.UnixStreamServer):
+    """Serves one forwarded command at a time."""
+
+    def __init__(self, path, handler, run, environment):
+        socketserver.UnixStreamServer.__init__(self, path, handler)
+        self.run = run
+        self.environment = environment
+
+
+class CommandHandler(socketserver.StreamRequestHandler):
+    """Runs a forwarded command, streaming its output back as json lines."""
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        request = json.loads(line.decode('utf-8'))
+        output = _Output(self.wfile)
+        if request.get('stop'):
+            output.send(dict(exit=0))
+            threading.Thread(target=self.server.shutdown).start()
+            return
+        if request.get('key') != self.server.environment:
+            output.send(dict(refused='environment'))
+            return
+        output.send(dict(exit=run_command(self.server.run, request, output)))
+
+
+def run_command(run, request, output):
+    """
+    Run a command in the working directory and environment of a request.
+
+    The daemon's own AWS and Conduit variables are kept, as the request does
+    not carry them.
+
+    Args:
+        run (function): Runs a command, given its arguments.
+        request (dict): The args, cwd and environment of the command; see command_request.
+        output (_Output): Where to send the command's output.
+
+    Return:
+        int: The exit status of the command.
+    """
+    cwd = os.getcwd()
+    environment = dict(os.environ)
+    try:
+        os.chdir(request['cwd'])
+        os.environ.clear()
+        os.environ.update(request['environment'])
+        os.environ.update((key, value) for key, value in environment.items() if key.startswith(SHARED_PREFIXES))
+        with contextlib.redirect_stdout(output.stream('stdout')), contextlib.redirect_stderr(output.stream('stderr')):
+            try:
+                return run(request['args']) or 0
+            except SystemExit as e:
+                return e.code if isinstance(e.code, int) else int(e.code is not None)
+            except Exception:
+                traceback.print_exc()
+                return 1
+    finally:
+        os.environ.clear()
+        os.environ.update(environment)
+        os.chdir(cwd)
+
+
+class _Output(object):
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+        self.connected = True
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        with self._lock:
+            if not self.connected:
+                return
+            try:
+                _send(self.wfile, message)
+            except OSError:
+                # The CLI has gone away; let the command finish regardless.
+                self.connected = False
+
+    def stream(self, name):
+        return _Stream(self, name)
+
+
+class _Stream(object):
+
+    def __init__(self, output, name):
+        self.output = output
+        self.name = name
+
+    def write(self, text):
+        if text:
+            self.output.send({self.name: text})
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def _runs_locally(args):
+    return any(arg in LOCAL_COMMANDS or arg in LOCAL_OPTIONS for arg in args)
+
+
+def _private_directory(path):
+    if not os.path.isdir(path):
+        os.makedirs(path, mode=0o700)
+    status = os.lstat(path)
+    if not stat.S_ISDIR(status.st_mode) or status.st_uid != os.getuid() or status.st_mode & 0o077:
+        raise ValueError("The Conduit daemon's socket directory must only be usable by its owner: {}".format(path))
+
+
+def _connect(path):
+    try:
+        status = os.stat(path)
+    except OSError:
+        return None
+    if not stat.S_ISSOCK(status.st_mode) or status.st_uid != os.getuid():
+        print("Not using {}, as it is not a socket of this user.".format(path), file=sys.stderr)
+        return None
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.settimeout(CONNECT_TIMEOUT)
+    try:
+        connection.connect(path)
+    except OSError:
+        connection.close()
+        return None
+    if _peer_uid(connection) not in (None, os.getuid()):
+        connection.close()
+        print("Not using {}, as it is served by another user.".format(path), file=sys.stderr)
+        return None
+    connection.settimeout(None)
+    return connection
+
+
+def _peer_uid(connection):
+    # SO_PEERCRED is Linux only; elsewhere the owner of the socket file is relied on.
+    if not hasattr(socket, 'SO_PEERCRED'):
+        return None
+    credentials = connection.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+    return struct.unpack('3i', credentials)[1]
+
+
+def _send(wfile, message):
+    wfile.write((json.dumps(message) + '\n').encode('utf-8'))
+    wfile.flush()
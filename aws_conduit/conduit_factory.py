@@ -1,18 +1,26 @@
+import threading
+
 import boto3
 
-from aws_conduit import helper
+from aws_conduit import conduit_log, helper
+from aws_conduit.aws import service_catalog
 from aws_conduit.conduit_portfolio import ConduitPortfolio
 from aws_conduit.conduit_product import ConduitProduct
 from aws_conduit.conduit_role import ConduitRole
-from aws_conduit.conduit_s3 import ConduitS3
+from aws_conduit.conduit_s3 import REPLICA_SOURCES, ConduitS3
 from aws_conduit.conduit_start import ConduitStart
 
 SESSION = boto3.session.Session()
 REGION = SESSION.region_name
 
+PRODUCTS = {}
+BUCKETS = {}
+BUCKETS_LOCK = threading.RLock()
+LOG = conduit_log.logger(__name__)
+
 
 def start():
-    account_id = helper.ACCOUNT_ID
+    account_id = helper.get_account_id()
     return ConduitStart(account_id)
 
 
@@ -49,24 +57,86 @@ def portfolio(portfolio_name, portfolio_description=None):
     )
 
 
-def product_by_id(product_id, token=None):
-    client = boto3.client('servicecatalog')
-    if token is not None:
-        response = client.search_products_as_admin(
-            PageToken=token
-        )
-    else:
-        response = client.search_products_as_admin()
-    if response['ProductViewDetails']:
-        for found_product in response['ProductViewDetails']:
-            if found_product['ProductViewSummary']['ProductId'] == product_id:
-                print("Creating instance of Conduit handle...")
-                summary = found_product['ProductViewSummary']
-                conduit_product = product(summary['Name'], None, summary['ShortDescription'])
-                conduit_product.product_id = product_id
-                return conduit_product
-    if 'NextPageToken' in response:
-        return product_by_id(product_id, token=response['NextPageToken'])
+def product_by_id(product_id, config=None):
+    """
+    Resolves a handle for an existing Service Catalog Product by its id.
+
+    Handles are looked up in the process cache, then the Conduit config, and
+    only then described directly from Service Catalog.
+
+    Args:
+        product_id (str): The id of the Product.
+        config (dict): (Optional) The Conduit configuration to search first.
+
+    Return:
+        ConduitProduct: An instance of the Product.
+    """
+    if product_id in PRODUCTS:
+        return PRODUCTS[product_id]
+    conduit_product = None
+    if config is not None and 'portfolios' in config:
+        try:
+            conduit_product = helper.get_product(config, product_id=product_id)
+        except ValueError:
+            conduit_product = None
+    if conduit_product is None:
+        LOG.debug("Creating instance of Conduit handle...")
+        summary = service_catalog.describe_product(product_id)
+        conduit_product = product(summary['Name'], None, summary.get('ShortDescription'))
+        conduit_product.product_id = product_id
+    PRODUCTS[product_id] = conduit_product
+    return conduit_product
+
+
+def config_bucket():
+    """
+    Get the handle on the Conduit configuration bucket, creating it if needed.
+
+    The handle is resolved once and reused for the rest of the process, unless
+    it is deleted through ConduitS3.delete. Whether the bucket exists is only
+    checked once per process, so a bucket deleted elsewhere is not noticed.
+    Concurrent callers wait for the first to finish resolving it.
+
+    Return:
+        ConduitS3 (obj): The Conduit configuration bucket.
+    """
+    with BUCKETS_LOCK:
+        bucket = BUCKETS.get('config')
+        if bucket is None or not bucket.exists():
+            bucket = start().create_s3()
+            BUCKETS['config'] = bucket
+            helper.CONFIGURATION.clear()
+        return bucket
+
+
+def regional_bucket(region):
+    """
+    Get the handle on the Conduit bucket which releases to another region use, creating it if needed.
+
+    Content already released to the configuration bucket is copied into it
+    server side rather than uploaded again. Releases to a region run
+    concurrently, so the bucket is checked for, created and cached under a
+    lock, and only created once.
+
+    Args:
+        region (str): The region of the bucket.
+
+    Return:
+        ConduitS3 (obj): The configuration bucket for the default region, otherwise the regional bucket.
+    """
+    with BUCKETS_LOCK:
+        home = config_bucket()
+        if region == REGION:
+            return home
+        bucket = BUCKETS.get(region)
+        if bucket is None or not bucket.exists():
+            bucket = ConduitS3("{}-{}".format(home.name, region), region)
+            if not bucket.exists():
+                LOG.info("Creating S3: %s", bucket.name)
+                bucket.create()
+            BUCKETS[region] = bucket
+        REPLICA_SOURCES[bucket.name] = home.name
+        return bucket
 
 
 def product(product_name, portfolio_name, product_description=None):
@@ -85,7 +155,7 @@ def product(product_name, portfolio_name, product_description=None):
         ConduitProduct: An unpersisted instance of a Product.
     """
     product_owner = helper.get_alias()
-    s3_bucket = start().create_s3()
+    s3_bucket = config_bucket()
     cfntype = "yaml"
     return ConduitProduct(
         name=product_name,
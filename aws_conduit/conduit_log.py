@@ -0,0 +1,140 @@
+"""
+Leveled output for Conduit commands.
+
+Conduit modules log through loggers named after them, below the aws_conduit
+logger. Messages are written to standard output, as plain text or as json
+lines, and the level decides how much is shown: per item detail is logged
+at debug, the progress of a command at info. The reports a build ends with,
+and packages, are logged at info on the aws_conduit.report logger, so they
+are hidden by --quiet and carry their data as json; listings and the plan,
+trace and profile reports are printed.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+ROOT = 'aws_conduit'
+REPORT = ROOT + '.report'
+LEVEL_ENV = 'CONDUIT_LOG_LEVEL'
+PROGRESS_INTERVAL = float(os.environ.get('CONDUIT_PROGRESS_INTERVAL', 2.0))
+LEVELS = dict(debug=logging.DEBUG, info=logging.INFO, warning=logging.WARNING, error=logging.ERROR)
+
+
+def logger(name):
+    """Get the logger for a Conduit module."""
+    return logging.getLogger(name)
+
+
+def configure(level=None, json_output=False):
+    """
+    Set how much Conduit logs, and how.
+
+    Args:
+        level (str): (Optional) One of debug, info, warning or error. Defaults to CONDUIT_LOG_LEVEL, or info.
+        json_output (bool): (Optional) Write each message as a json line.
+    """
+    level = (level or os.environ.get(LEVEL_ENV) or 'info').lower()
+    if level not in LEVELS:
+        raise ValueError("Not a valid log level: {}".format(level))
+    logging.getLogger(ROOT).setLevel(LEVELS[level])
+    HANDLER.setFormatter(JsonFormatter() if json_output else logging.Formatter('%(message)s'))
+
+
+def report(name, text, data):
+    """
+    Log a command result, such as a build's timeline.
+
+    As plain text the result is shown as it is; as json lines, its data is
+    included under result, with the name of the report.
+
+    Args:
+        name (str): What the result is, e.g. "timeline".
+        text (str): The result as shown to people, which may span several lines.
+        data: The result as json serialisable data.
+    """
+    logging.getLogger(REPORT).info(text, extra=dict(report=name, result=data))
+
+
+def progress(log, description, total=None, interval=None):
+    """
+    Count progress through a loop, logging the count at most once per interval.
+
+    Args:
+        log (Logger): The logger to report to.
+        description (str): What is being counted, e.g. "Associating portfolios".
+        total (int): (Optional) The number of items expected.
+        interval (float): (Optional) Seconds between reports. Defaults to CONDUIT_PROGRESS_INTERVAL.
+    """
+    return Progress(log, description, total, PROGRESS_INTERVAL if interval is None else interval)
+
+
+class Progress(object):
+    """A rate limited progress counter; see progress."""
+
+    def __init__(self, log, description, total, interval):
+        self.log = log
+        self.description = description
+        self.total = total
+        self.interval = interval
+        self.count = 0
+        self.started = time.time()
+        self._last_report = self.started
+        self._lock = threading.Lock()
+
+    def update(self, count=1):
+        with self._lock:
+            self.count += count
+            now = time.time()
+            if now - self._last_report < self.interval:
+                return
+            self._last_report = now
+        self._report()
+
+    def done(self):
+        self._report(finished=True)
+
+    def _report(self, finished=False):
+        elapsed = time.time() - self.started
+        if self.total is None:
+            message = "{}: {} in {:.1f}s".format(self.description, self.count, elapsed)
+        else:
+            message = "{}: {}/{} in {:.1f}s".format(self.description, self.count, self.total, elapsed)
+        self.log.info(message, extra=dict(progress=dict(description=self.description, count=self.count,
+                                                        total=self.total, elapsed=elapsed, finished=finished)))
+
+
+class StdoutHandler(logging.Handler):
+    """Writes to whatever sys.stdout is when a message is logged, so that redirected output is followed."""
+
+    def emit(self, record):
+        try:
+            stream = sys.stdout
+            stream.write(self.format(record) + '\n')
+            stream.flush()
+        except Exception:
+            self.handleError(record)
+
+
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record):
+        message = dict(time=record.created, level=record.levelname.lower(), logger=record.name,
+                       thread=record.threadName, message=record.getMessage())
+        if getattr(record, 'progress', None) is not None:
+            message['progress'] = record.progress
+        if getattr(record, 'report', None) is not None:
+            message['report'] = record.report
+            message['result'] = record.result
+        if record.exc_info:
+            message['exception'] = self.formatException(record.exc_info)
+        return json.dumps(message, default=str)
+
+
+HANDLER = StdoutHandler()
+HANDLER.setFormatter(logging.Formatter('%(message)s'))
+logging.getLogger(ROOT).addHandler(HANDLER)
+logging.getLogger(ROOT).setLevel(LEVELS.get(os.environ.get(LEVEL_ENV, '').lower(), logging.INFO))
+logging.getLogger(ROOT).propagate = False
@@ -0,0 +1,176 @@
+"""Building and publishing Conduit packages."""
+import base64
+import collections
+import functools
+import hashlib
+import io
+import json
+import os
+import tempfile
+import zipfile
+from concurrent import futures
+
+from aws_conduit import conduit_log, conduit_plan, conduit_s3, conduit_trace
+from aws_conduit.aws import s3
+from aws_conduit.conduit_storage import backend as storage
+from botocore.exceptions import ClientError
+
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+ZIP_FILE_MODE = 0o644 << 16
+COMPRESSED_EXTENSIONS = ('.zip', '.jar', '.gz', '.tgz')
+COMPRESSED_MAGIC = (b'PK\x03\x04', b'\x1f\x8b')
+LOG = conduit_log.logger(__name__)
+
+
+def build_zip(entries):
+    """
+    Build a zip archive in memory; see write_zip.
+
+    Args:
+        entries (dict): A mapping of file name in the archive to its content as bytes, or an iterable of such pairs.
+
+    Return:
+        bytes: The zip archive.
+    """
+    buffer = io.BytesIO()
+    write_zip(entries, buffer)
+    return buffer.getvalue()
+
+
+def write_zip(entries, file):
+    """
+    Write a zip archive to a file.
+
+    The archive is deterministic: a mapping of entries is written in name
+    order, and every entry has a fixed timestamp and file mode, so the same
+    entries always give the same bytes. Pairs are written in the order they
+    are produced, so that a generator only holds one entry at a time.
+    Content which is already compressed, such as zips and jars, is stored
+    rather than deflated again.
+
+    Args:
+        entries (dict): A mapping of file name in the archive to its content as bytes, or an iterable of such pairs.
+        file (obj): A binary file object to write to.
+    """
+    if isinstance(entries, dict):
+        entries = sorted(entries.items())
+    with zipfile.ZipFile(file, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in entries:
+            info = zipfile.ZipInfo(name, date_time=ZIP_DATE_TIME)
+            info.compress_type = _compress_type(name, content)
+            info.external_attr = ZIP_FILE_MODE
+            archive.writestr(info, content)
+
+
+def _compress_type(name, content):
+    # Fat package blobs are named by digest, so compressed content is also recognised by its magic number.
+    if name.lower().endswith(COMPRESSED_EXTENSIONS) or content.startswith(COMPRESSED_MAGIC):
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def put_package(bucket, prefix, entries):
+    """
+    Zip some entries and upload them to a bucket, verifying the upload.
+
+    The archive is written to a temporary file rather than held in memory,
+    as a fat package can be hundreds of MB. Packages are always uploaded as
+    built, never copied from identical content elsewhere in the bucket, so
+    that the checksum S3 records is checked against the bytes which were
+    built. Under --plan the upload is only recorded, so there is nothing to
+    check.
+
+    Args:
+        bucket (obj): A Conduit handle on an S3 Bucket.
+        prefix (str): The key to upload the package to.
+        entries (dict): A mapping of file name in the archive to its content as bytes, or an iterable of such pairs.
+
+    Return:
+        str: The sha256 digest of the package.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'package.zip')
+        with open(path, 'wb') as f:
+            write_zip(entries, f)
+        digest = conduit_s3.file_digest(path)
+        size = os.path.getsize(path)
+        storage().upload_file(bucket.name, prefix, path, metadata=dict(sha256=digest), checksum=True)
+    if conduit_plan.active() is None:
+        _verify_upload(bucket, prefix, digest)
+    LOG.info("Packaged %s (%s bytes, sha256 %s)", prefix, size, digest)
+    return digest
+
+
+def _verify_upload(bucket, prefix, digest):
+    try:
+        checksum = storage().get_checksum(bucket.name, prefix)
+    except (ClientError, OSError) as e:
+        raise ValueError("Could not verify package {}: {}".format(prefix, e))
+    expected = base64.b64encode(bytes.fromhex(digest)).decode('utf-8')
+    if checksum is not None and '-' not in checksum and checksum != expected:
+        raise ValueError("Checksum mismatch for package {}: {} != {}".format(prefix, checksum, expected))
+
+
+def fat_package_entries(bucket, folders, max_workers=None):
+    """
+    Fetch every released artifact of some products as package entries.
+
+    Each distinct piece of content is stored once under blobs/<sha256>, in
+    ETag order, followed by an index.json mapping each product's artifact
+    paths to their blobs. Artifacts are downloaded concurrently, but at most
+    max_workers downloads run ahead of the entry being written.
+
+    Args:
+        bucket (obj): A Conduit handle on an S3 Bucket.
+        folders (dict): A mapping of product name to the folder holding its release.
+        max_workers (int): (Optional) The number of concurrent downloads.
+
+    Return:
+        generator: Pairs of file name in the archive and its content as bytes.
+    """
+    if max_workers is None:
+        max_workers = s3.UPLOAD_WORKERS
+    artifacts, keys_by_etag = _released_artifacts(bucket, folders)
+    LOG.info("Fetching %s artifacts (%s distinct) from %s...", len(artifacts), len(keys_by_etag), bucket.name)
+    download = conduit_trace.inherit(functools.partial(storage().download_content, bucket.name))
+    digests = {}
+    written = set()
+    pending = collections.deque()
+    executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for etag in sorted(keys_by_etag):
+            pending.append((etag, executor.submit(download, keys_by_etag[etag])))
+            if len(pending) > max_workers:
+                for entry in _blob_entry(pending.popleft(), digests, written):
+                    yield entry
+        while pending:
+            for entry in _blob_entry(pending.popleft(), digests, written):
+                yield entry
+    finally:
+        for _, future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+    index = {}
+    for artifact in artifacts:
+        index.setdefault(artifact['product'], {})[artifact['path']] = digests[artifact['etag']]
+    yield 'index.json', json.dumps(index, sort_keys=True, indent=2).encode('utf-8')
+
+
+def _released_artifacts(bucket, folders):
+    artifacts = []
+    keys_by_etag = {}
+    for product_name in sorted(folders):
+        folder = folders[product_name]
+        for item in storage().list_objects(bucket.name, folder):
+            artifacts.append(dict(product=product_name, path=item['Key'][len(folder) + 1:], etag=item['ETag']))
+            keys_by_etag.setdefault(item['ETag'], item['Key'])
+    return artifacts, keys_by_etag
+
+
+def _blob_entry(download, digests, written):
+    etag, future = download
+    content = future.result()
+    digests[etag] = hashlib.sha256(content).hexdigest()
+    if digests[etag] not in written:
+        written.add(digests[etag])
+        yield 'blobs/{}'.format(digests[etag]), content
@@ -0,0 +1,123 @@
+"""Dry run planning of Conduit commands."""
+import threading
+import time
+
+from aws_conduit.aws import events
+from botocore.awsrequest import AWSResponse
+
+READ_PREFIXES = ('Describe', 'Get', 'Head', 'List', 'Scan', 'Search')
+UNIQUE_ID = 'conduit-plan'
+ROW_FORMAT = "{:<20}{:>10}{:>10}{:>16}"
+DETAIL_PARAMS = ('Key', 'Name', 'DisplayName', 'ProductId', 'PortfolioId', 'ProvisioningArtifactId',
+                 'RoleName', 'PolicyArn', 'PrincipalARN', 'ProvisionedProductName')
+
+STUB_RESPONSES = {
+    'AssumeRole': {'Credentials': {'AccessKeyId': 'dry-run', 'SecretAccessKey': 'dry-run', 'SessionToken': 'dry-run'}},
+    'CreateMultipartUpload': {'UploadId': 'dry-run'},
+    'CreatePortfolio': {'PortfolioDetail': {'Id': 'port-dry-run'}},
+    'CreateProduct': {'ProductViewDetail': {'ProductViewSummary': {'ProductId': 'prod-dry-run'}}},
+    'CreateRole': {'Role': {'RoleId': 'dry-run', 'Arn': 'arn:aws:iam::000000000000:role/conduit/dry-run'}},
+    'DeleteObjects': {'Deleted': []},
+    'UploadPart': {'ETag': '"dry-run"'},
+}
+
+PLANS = []
+
+
+def active():
+    """Get the plan being recorded, if any."""
+    if PLANS:
+        return PLANS[-1]
+    return None
+
+
+class Plan(object):
+    """
+    Records the AWS calls made by a Conduit command without making changes.
+
+    Read calls (Describe, Get, Head, List, Scan and Search) go through to AWS,
+    so the plan reflects the current state of the account. Every other call
+    is recorded and answered with a stub response, and build steps are
+    recorded rather than run.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.steps = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        events.register('before-parameter-build', self.before_parameter_build, UNIQUE_ID)
+        events.register('before-call', self.before_call, UNIQUE_ID)
+        events.register('after-call', self.after_call, UNIQUE_ID)
+        PLANS.append(self)
+        return self
+
+    def __exit__(self, *args):
+        PLANS.remove(self)
+        events.unregister('before-parameter-build', UNIQUE_ID)
+        events.unregister('before-call', UNIQUE_ID)
+        events.unregister('after-call', UNIQUE_ID)
+
+    def before_parameter_build(self, params, context=None, **kwargs):
+        if context is not None:
+            context['conduit_plan_detail'] = _detail(params)
+
+    def before_call(self, model, context=None, **kwargs):
+        operation = model.name
+        read = operation.startswith(READ_PREFIXES)
+        detail = ''
+        if context is not None:
+            detail = context.get('conduit_plan_detail', '')
+        call = dict(service=model.service_model.service_name, operation=operation, read=read,
+                    detail=detail, started=time.time(), duration=0.0)
+        with self._lock:
+            self.calls.append(call)
+        if context is not None:
+            context['conduit_plan_call'] = call
+        if read:
+            return None
+        return AWSResponse(None, 200, {}, None), dict(STUB_RESPONSES.get(operation, {}))
+
+    def after_call(self, context=None, **kwargs):
+        if context is not None and 'conduit_plan_call' in context:
+            call = context['conduit_plan_call']
+            call['duration'] = time.time() - call['started']
+
+    def record_step(self, name, command):
+        with self._lock:
+            self.steps.append(dict(product=name, command=command))
+
+    def report(self):
+        """Print the changes this plan would make and the API calls it needs."""
+        print("Build steps:")
+        for step in self.steps:
+            print("  [{}] $ {}".format(step['product'], step['command']))
+        print("Changes:")
+        for call in self.calls:
+            if not call['read']:
+                print("  {} {} {}".format(call['service'], call['operation'], call['detail']))
+        print(ROW_FORMAT.format("Service", "Reads", "Writes", "Read time (s)"))
+        print("----------" * 6)
+        for service, counts in sorted(self.counts().items()):
+            print(ROW_FORMAT.format(service, counts['reads'], counts['writes'], "{:.2f}".format(counts['read_time'])))
+
+    def counts(self):
+        counts = {}
+        for call in self.calls:
+            service = counts.setdefault(call['service'], dict(reads=0, writes=0, read_time=0.0))
+            if call['read']:
+                service['reads'] += 1
+                service['read_time'] += call['duration']
+            else:
+                service['writes'] += 1
+        return counts
+
+
+def _detail(params):
+    if not isinstance(params, dict):
+        return ''
+    details = ["{}={}".format(key, params[key]) for key in DETAIL_PARAMS if key in params]
+    if 'Delete' in params and 'Objects' in params['Delete']:
+        details.append("Objects={}".format(len(params['Delete']['Objects'])))
+    return ' '.join(details)
@@ -3,6 +3,9 @@ import boto3
 import yaml
 
 import attr
+from aws_conduit import conduit_log
+
+LOG = conduit_log.logger(__name__)
 
 
 @attr.s
@@ -38,7 +41,7 @@ class ConduitPortfolio(yaml.YAMLObject):
         Delete this Service Catalog portfolio.
         """
         portfolio_id = self.get_id()
-        print(portfolio_id)
+        LOG.debug("Deleting portfolio %s", portfolio_id)
         self.service_catalog.delete_portfolio(
             Id=portfolio_id
         )
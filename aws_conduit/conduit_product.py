@@ -1,10 +1,14 @@
+import functools
+
 import attr
 import boto3
 import semver
 import yaml
 from aws_conduit import conduit_factory as factory
-from aws_conduit import helper
-from aws_conduit.aws import s3, service_catalog
+from aws_conduit import conduit_log, conduit_regions, conduit_retention, conduit_trace, conduit_transfer, helper
+from aws_conduit.aws import service_catalog
+
+LOG = conduit_log.logger(__name__)
 
 
 @attr.s
@@ -24,6 +28,7 @@ class ConduitProduct(yaml.YAMLObject):
     provisioned = attr.ib(default=[])
     role = attr.ib(default=None)
     resources = attr.ib(default=[])
+    fingerprint = attr.ib(default=None)
 
     def _add_initial_template(self):
         template = dict(
@@ -59,7 +64,7 @@ class ConduitProduct(yaml.YAMLObject):
         self.product_id = create_response['ProductViewDetail']['ProductViewSummary']['ProductId']
 
     def create_role(self, name):
-        print(self.role)
+        LOG.debug("Product role: %s", self.role)
         if self.role is not None:
             if self.role.name != name:
                 self.role = factory.role(name)
@@ -76,7 +81,8 @@ class ConduitProduct(yaml.YAMLObject):
     def set_product_id(self):
         if self.product_id is None:
             summary = self.get_summary()
-            self.product_id = summary['ProductId']
+            with helper.CONFIG_LOCK:
+                self.product_id = summary['ProductId']
 
     def get_summary(self):
         response = service_catalog.search(self.name)
@@ -131,27 +137,45 @@ class ConduitProduct(yaml.YAMLObject):
         return service_catalog.list_portfolios_for_product(self.product_id)
 
     def release(self, release_type, local_template, current_version):
-        product_version = current_version
-        if release_type == 'build':
-            product_version = semver.bump_build(current_version)
-        if release_type == 'major':
-            product_version = semver.bump_major(current_version)
-        if release_type == 'minor':
-            product_version = semver.bump_minor(current_version)
-        if release_type == 'patch':
-            product_version = semver.bump_patch(current_version)
+        product_version = helper.next_version(release_type, current_version)
 
         self.release_new_build(local_template, product_version)
 
     def release_new_build(self, local_template, product_version):
-        helper.put_resource(local_template, local_template, self.bucket, self.portfolio, self.name, product_version, environment=None)
-        for resource in self.resources:
-            helper.put_resource(resource, resource, self.bucket, self.portfolio, self.name, product_version, environment=None)
+        self.bucket.get_manifest()
+        conduit_transfer.run_uploads(self._uploads(local_template, product_version, self.bucket))
         template_url = "{}/{}/{}/{}/{}".format(self.bucket.get_url(), self.portfolio, self.name, product_version, local_template)
-        print("Creating new version to template: {}".format(template_url))
+        LOG.debug("Creating new version to template: %s", template_url)
         service_catalog.new_version(self.product_id, product_version, template_url)
-        self.version = product_version
-        print("Released new product version: {}".format(product_version))
+        with helper.CONFIG_LOCK:
+            self.version = product_version
+        LOG.info("Released new product version: %s", product_version)
+
+    def release_to_region(self, local_template, region):
+        """
+        Release the current version of this product to another region.
+
+        Artifacts go to the regional Conduit bucket, with templates pointing at
+        it, and the version is created for the product of the same name there.
+
+        Args:
+            local_template (str): The path of the product template.
+            region (str): The region to release to.
+        """
+        bucket = factory.regional_bucket(region)
+        bucket.get_manifest()
+        conduit_transfer.run_uploads(self._uploads(local_template, self.version, bucket))
+        template_url = "{}/{}/{}/{}/{}".format(bucket.get_url(), self.portfolio, self.name, self.version, local_template)
+        service_catalog.new_version(conduit_regions.product_id(self.name, region), self.version, template_url, region=region)
+
+    def _uploads(self, local_template, product_version, bucket):
+        uploads = []
+        for resource in [local_template] + self.resources:
+            source_path, destination_path = helper.resource_paths(resource)
+            upload = functools.partial(helper.put_resource, source_path, destination_path, bucket,
+                                       self.portfolio, self.name, product_version, environment=None)
+            uploads.append(conduit_transfer.upload_task(source_path, upload))
+        return uploads
 
     def add_resources(self, product_spec):
         self.resources = []
@@ -162,21 +186,13 @@ class ConduitProduct(yaml.YAMLObject):
             for resource in product_spec['nestedStacks']:
                 self.resources.append(resource)
 
-    def tidy_versions(self):
-        versions = self.get_all_versions()
-        version = self.version
-        for item in versions:
-            if ('build' in item['Name'] and
-                    semver.compare(item['Name'], version) == -1):
-                self.delete_version(item['Name'], item['Id'])
-        print("Current product version is: {}".format(version))
-        return version
-
-    def delete_version(self, version_name, version_id):
-        print("Deleting version: {}".format(version_name))
-        service_catalog.delete_version(self.product_id, version_id)
-        prefix = "{}/{}/{}".format(self.portfolio, self.name, version_name)
-        s3.delete_folder(self.bucket.name, prefix)
+    @conduit_trace.in_phase('tidy')
+    def tidy_versions(self, policy=None):
+        if policy is None:
+            policy = conduit_retention.DEFAULT_POLICY
+        conduit_retention.run(conduit_retention.product_tasks(self, policy))
+        LOG.info("Current product version is: %s", self.version)
+        return self.version
 
     def get_all_versions(self):
         return service_catalog.list_all_versions(self.product_id)
@@ -185,10 +201,10 @@ class ConduitProduct(yaml.YAMLObject):
         versions = self.get_all_versions()
         version = self.version
         for item in versions:
-            if semver.compare(item['Name'], version) == -1:
+            if semver.VersionInfo.parse(item['Name']).compare(version) == -1:
                 version = item['Name']
                 break
-        print("Current product version is: {}".format(version))
+        LOG.info("Current product version is: %s", version)
         return version
 
     def get_version_id(self):
@@ -201,27 +217,27 @@ class ConduitProduct(yaml.YAMLObject):
         servicecatalog = self._get_assumed_conduit_servicecatalog()
         is_provisioned = service_catalog.is_provisioned(name)
         if is_provisioned:
-            print("Updating now...")
+            LOG.info("Updating now...")
             service_catalog.update_provisioned(servicecatalog, self, name, params)
-            print("Update success!")
+            LOG.info("Update success!")
         else:
-            print("Provisioning now...")
+            LOG.info("Provisioning now...")
             service_catalog.provision(servicecatalog, self, name, params)
-            print("Provision success!")
+            LOG.info("Provision success!")
 
     def terminate(self, name):
         servicecatalog = self._get_assumed_conduit_servicecatalog()
         is_provisioned = service_catalog.is_provisioned(name)
         if is_provisioned:
-            print("Terminating now...")
+            LOG.info("Terminating now...")
             service_catalog.terminate_provisioned(servicecatalog, name)
         else:
-            print("Artifact is not provisioned.")
+            LOG.info("Artifact is not provisioned.")
 
     def _get_assumed_conduit_servicecatalog(self):
         sts = boto3.client('sts')
         account_id = sts.get_caller_identity().get('Account')
-        print("Assumiing consuit IAM role...")
+        LOG.debug("Assuming conduit IAM role...")
         creds = sts.assume_role(
             RoleArn='arn:aws:iam::{}:role/conduit/conduit-provisioner-role'.format(account_id),
             RoleSessionName='conduit-{}'.format(hash('conduit'))
@@ -235,12 +251,12 @@ class ConduitProduct(yaml.YAMLObject):
         return servicecatalog
 
     def create_deployer_launch_constraint(self, portfolio, role_name):
-        print("Creating Launch configuration...")
+        LOG.info("Creating Launch configuration...")
         response = service_catalog.list_product_constraints(portfolio.portfolio_id, self.product_id)
         exists = False
         for item in response:
             if item['Type'] == 'LAUNCH':
-                print("Launch configuration exists, nothing to do.")
+                LOG.info("Launch configuration exists, nothing to do.")
                 exists = True
                 break
         if not exists:
@@ -0,0 +1,98 @@
+"""Profiling the Python time and memory of Conduit commands."""
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import tracemalloc
+
+PROFILE_ENV = 'CONDUIT_PROFILE'
+TOP_ENV = 'CONDUIT_PROFILE_TOP'
+MEMORY_ENV = 'CONDUIT_PROFILE_MEMORY'
+DEFAULT_TOP = 25
+
+
+def from_environment(environment=None):
+    """
+    Get the profile settings requested by environment variables, so that CI can profile on demand.
+
+    Return:
+        dict: The path, top and memory settings, or None if no profile was requested.
+    """
+    environment = os.environ if environment is None else environment
+    if not environment.get(PROFILE_ENV):
+        return None
+    return dict(path=environment[PROFILE_ENV], top=int(environment.get(TOP_ENV) or DEFAULT_TOP),
+                memory=bool(environment.get(MEMORY_ENV)))
+
+
+class Profile(object):
+    """
+    Profiles a Conduit command with cProfile, optionally tracing its memory.
+
+    Threads started while the profile is active, such as build and upload
+    workers, are profiled too and their statistics merged with the command's.
+
+    Args:
+        command (str): (Optional) The command being profiled.
+        top (int): (Optional) The number of functions to summarise.
+        memory (bool): (Optional) Trace memory allocations with tracemalloc.
+    """
+
+    def __init__(self, command='conduit', top=DEFAULT_TOP, memory=False):
+        self.command = command
+        self.top = top
+        self.memory = memory
+        self.peak = None
+        self.allocations = []
+        self.profiler = cProfile.Profile()
+        self.thread_profilers = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        if self.memory:
+            tracemalloc.start()
+        threading.setprofile(self._profile_thread)
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, *args):
+        self.profiler.disable()
+        threading.setprofile(None)
+        if self.memory:
+            self.peak = tracemalloc.get_traced_memory()[1]
+            self.allocations = tracemalloc.take_snapshot().statistics('lineno')[:self.top]
+            tracemalloc.stop()
+
+    def _profile_thread(self, frame, event, arg):
+        # Called on the first event of each new thread, to hand it over to a profiler of its own.
+        sys.setprofile(None)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Only one profiler can be active at a time on some Pythons.
+            return
+        with self._lock:
+            self.thread_profilers.append(profiler)
+
+    def stats(self):
+        """Get the statistics of the command and the threads it started."""
+        stats = pstats.Stats(self.profiler, stream=sys.stdout)
+        with self._lock:
+            for profiler in self.thread_profilers:
+                stats.add(profiler)
+        return stats
+
+    def report(self):
+        print("Profile of {}, top {} functions by cumulative time:".format(self.command, self.top))
+        self.stats().strip_dirs().sort_stats('cumulative').print_stats(self.top)
+        if self.peak is not None:
+            print("Peak traced memory: {:.1f} MiB".format(self.peak / (1024.0 * 1024.0)))
+            print("Largest allocations still held at the end:")
+            for statistic in self.allocations:
+                print("  {}".format(statistic))
+
+    def write(self, path):
+        self.stats().dump_stats(path)
+        print("Profile written to {}, read it with: python -m pstats {}".format(path, path))
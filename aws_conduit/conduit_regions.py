@@ -0,0 +1,139 @@
+"""Releasing products to several regions at once."""
+import os
+import threading
+import time
+from concurrent import futures
+
+from aws_conduit import conduit_log, conduit_trace
+from aws_conduit.aws import service_catalog
+
+REGION_WORKERS = int(os.environ.get('CONDUIT_REGION_WORKERS', 4))
+ROW_FORMAT = "{:<40}"
+CELL_FORMAT = "{:<22}"
+LOG = conduit_log.logger(__name__)
+
+RESULTS = []
+RESULTS_LOCK = threading.Lock()
+PRODUCT_IDS = {}
+
+
+def regions_for(spec, product_spec, home_region, regions=None):
+    """
+    Work out which other regions a product is released to.
+
+    Regions given on the command line win over a product's regions, which
+    win over the regions of the conduitspec.yaml.
+
+    Args:
+        spec (dict): The conduitspec.yaml.
+        product_spec (dict): The product's inventory entry.
+        home_region (str): The region of the Conduit configuration, which is always released to.
+        regions (list): (Optional) The regions given on the command line.
+
+    Return:
+        list: The regions to release to, besides the home region.
+    """
+    if not regions:
+        regions = product_spec.get('regions') or spec.get('regions') or []
+    if isinstance(regions, str):
+        regions = [region.strip() for region in regions.split(',')]
+    found = []
+    for region in regions:
+        if region and region != home_region and region not in found:
+            found.append(region)
+    return found
+
+
+def product_id(name, region):
+    """
+    Find the id of a Service Catalog product in a region by its name.
+
+    Products have a different id in each region; ids are looked up once per process.
+    """
+    key = (region, name)
+    if key not in PRODUCT_IDS:
+        response = service_catalog.search(name, region=region)
+        matches = [detail['ProductViewSummary']['ProductId'] for detail in response['ProductViewDetails']
+                   if detail['ProductViewSummary']['Name'] == name]
+        if not matches:
+            raise ValueError("Product {} does not exist in {}".format(name, region))
+        PRODUCT_IDS[key] = matches[0]
+    return PRODUCT_IDS[key]
+
+
+def fan_out(name, version, regions, release, max_workers=None):
+    """
+    Release a version of a product to several regions concurrently.
+
+    A failure in one region does not stop the others; every result is
+    recorded for the release matrix.
+
+    Args:
+        name (str): The product, as portfolio/product.
+        version (str): The version being released.
+        regions (list): The regions to release to.
+        release (function): Releases to a region, given its name.
+        max_workers (int): (Optional) The number of regions to release to at once.
+
+    Return:
+        dict: The result of each region.
+    """
+    if not regions:
+        return {}
+    executor = futures.ThreadPoolExecutor(max_workers=max(1, min(max_workers or REGION_WORKERS, len(regions))))
+    try:
+        submitted = dict((region, executor.submit(conduit_trace.inherit(_timed), release, region)) for region in regions)
+    finally:
+        executor.shutdown(wait=True)
+    results = {}
+    for region, future in submitted.items():
+        results[region] = future.result()
+        if results[region]['error'] is not None:
+            LOG.error("Releasing %s %s to %s failed: %s", name, version, region, results[region]['error'])
+        else:
+            LOG.info("Released %s %s to %s in %.1fs", name, version, region, results[region]['duration'])
+    with RESULTS_LOCK:
+        RESULTS.append(dict(name=name, version=version, regions=results))
+    return results
+
+
+def report():
+    """
+    Report the release matrix of every product and region released to, then start recording a new one.
+
+    Return:
+        list: The product and region of every failed release.
+    """
+    with RESULTS_LOCK:
+        results = list(RESULTS)
+        del RESULTS[:]
+    if not results:
+        return []
+    regions = sorted(set(region for result in results for region in result['regions']))
+    lines = [(ROW_FORMAT + CELL_FORMAT * len(regions)).format("Product", *regions), "----------" * (4 + 2 * len(regions))]
+    failures = []
+    for result in sorted(results, key=lambda item: item['name']):
+        cells = []
+        for region in regions:
+            outcome = result['regions'].get(region)
+            if outcome is None:
+                cells.append("-")
+            elif outcome['error'] is not None:
+                cells.append("failed")
+                failures.append((result['name'], region))
+            else:
+                cells.append("{} ({:.1f}s)".format(result['version'], outcome['duration']))
+        lines.append((ROW_FORMAT + CELL_FORMAT * len(regions)).format(result['name'], *cells))
+    conduit_log.report('regions', '\n'.join(lines), sorted(results, key=lambda item: item['name']))
+    return failures
+
+
+def _timed(release, region):
+    started = time.time()
+    try:
+        with conduit_trace.phase('release:{}'.format(region)):
+            release(region)
+        error = None
+    except Exception as e:
+        error = str(e) or type(e).__name__
+    return dict(duration=time.time() - started, error=error)
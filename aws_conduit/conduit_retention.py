@@ -0,0 +1,212 @@
+"""Retention policies for released product versions."""
+import functools
+import os
+import re
+from concurrent import futures
+
+import semver
+from aws_conduit import conduit_log, conduit_s3, conduit_trace
+from aws_conduit.aws import service_catalog
+from aws_conduit.conduit_storage import backend as storage
+
+GC_WORKERS = int(os.environ.get('CONDUIT_GC_WORKERS', 8))
+LOG = conduit_log.logger(__name__)
+
+DEFAULT_POLICY = dict(
+    keepBuilds=0,
+    keepPatches=None,
+    keepProvisioned=False
+)
+
+
+def policy_for(spec, portfolio, product):
+    """
+    Work out the retention policy of a product.
+
+    A product's retention in the inventory overrides the retention of its
+    portfolio, which overrides the default retention of the conduitspec.
+
+    Args:
+        spec (dict): The conduitspec, or None to use the default policy.
+        portfolio (str): The name of the portfolio.
+        product (str): The name of the product.
+
+    Return:
+        dict: The keepBuilds, keepPatches and keepProvisioned settings.
+    """
+    policy = dict(DEFAULT_POLICY)
+    if spec is None:
+        return policy
+    retention = spec.get('retention', {})
+    overrides = [retention.get('default', {}), retention.get(portfolio, {})]
+    for product_spec in spec.get('inventory', []):
+        if product_spec['portfolio'] == portfolio and product_spec['product'] == product:
+            overrides.append(product_spec.get('retention', {}))
+    for override in overrides:
+        unknown = set(override) - set(DEFAULT_POLICY)
+        if unknown:
+            raise ValueError("Unknown retention settings for {}/{}: {}".format(portfolio, product, ', '.join(sorted(unknown))))
+        policy.update(override)
+    return policy
+
+
+def parse_version(name):
+    """Parse a version name, or get None if it is not a semantic version."""
+    try:
+        return semver.VersionInfo.parse(name)
+    except (TypeError, ValueError):
+        return None
+
+
+def version_key(name):
+    version = semver.VersionInfo.parse(name)
+    build = 0
+    if version.build:
+        digits = re.findall(r'\d+', version.build)
+        build = int(digits[-1]) if digits else 0
+    return version.major, version.minor, version.patch, build
+
+
+def is_build(name):
+    return semver.VersionInfo.parse(name).build is not None
+
+
+def expired(versions, current, policy, provisioned=()):
+    """
+    Find the versions of a product which its retention policy no longer keeps.
+
+    The current version, and any build at or above it, is always kept. Of the
+    builds below it, the newest keepBuilds are kept. Of the releases, the newest
+    keepPatches of each major.minor line are kept, or every release when
+    keepPatches is not set. Versions whose names are not semantic versions
+    are always kept, as is everything when the current version is not one.
+
+    Args:
+        versions (list): The names of every version of the product.
+        current (str): The current version of the product.
+        policy (dict): The retention policy of the product.
+        provisioned (set): (Optional) The names of versions which are provisioned.
+
+    Return:
+        list: The versions to remove, oldest first.
+    """
+    if parse_version(current) is None:
+        LOG.warning("Not removing any versions, as the current version is not a semantic version: %s", current)
+        return []
+    unparsed = sorted(name for name in versions if parse_version(name) is None)
+    if unparsed:
+        LOG.debug("Keeping versions which are not semantic versions: %s", ', '.join(unparsed))
+    builds = 0
+    patches = {}
+    remove = []
+    for name in sorted((name for name in versions if parse_version(name) is not None), key=version_key, reverse=True):
+        if policy['keepProvisioned'] and name in provisioned:
+            continue
+        if is_build(name):
+            if name == current or semver.VersionInfo.parse(name).compare(current) >= 0:
+                continue
+            if builds < policy['keepBuilds']:
+                builds += 1
+                continue
+        else:
+            line = version_key(name)[:2]
+            patches[line] = patches.get(line, 0) + 1
+            if name == current or policy['keepPatches'] is None or patches[line] <= policy['keepPatches']:
+                continue
+        remove.append(name)
+    return list(reversed(remove))
+
+
+def product_tasks(product, policy, provisioned=None):
+    """
+    Plan the removal of the expired versions of a Service Catalog product.
+
+    Args:
+        product (ConduitProduct): The product to tidy.
+        policy (dict): The retention policy of the product.
+        provisioned (set): (Optional) The provisioned product and artifact ids, looked up if needed.
+
+    Return:
+        list: Tasks which remove each expired artifact and its S3 folder.
+    """
+    product.set_product_id()
+    ids = dict((item['Name'], item['Id']) for item in product.get_all_versions())
+    if policy['keepProvisioned'] and provisioned is None:
+        provisioned = service_catalog.provisioned_artifacts()
+    in_use = set(name for name, version_id in ids.items() if (product.product_id, version_id) in (provisioned or ()))
+    tasks = []
+    for name in expired(list(ids), product.version, policy, in_use):
+        prefix = "{}/{}/{}".format(product.portfolio, product.name, name)
+        tasks.append(("{} artifact".format(prefix), functools.partial(service_catalog.delete_version, product.product_id, ids[name])))
+        tasks.append((prefix, functools.partial(conduit_s3.delete_folder, product.bucket.name, prefix, versions=True)))
+    return tasks
+
+
+def s3_tasks(bucket_name, portfolio, product, current, policy):
+    """
+    Plan the removal of the expired versions of a product released to S3.
+
+    Args:
+        bucket_name (str): The bucket the product is released to.
+        portfolio (str): The name of the portfolio.
+        product (str): The name of the product.
+        current (str): The current version of the product.
+        policy (dict): The retention policy of the product.
+
+    Return:
+        list: Tasks which remove each expired version folder.
+    """
+    folder = "{}/{}/{}".format(portfolio, product, 'core')
+    versions = [item.split('/')[-1] for item in storage().get_sub_folders(bucket_name, folder)]
+    tasks = []
+    for name in expired(versions, current, policy):
+        prefix = "{}/{}".format(folder, name)
+        tasks.append((prefix, functools.partial(conduit_s3.delete_folder, bucket_name, prefix, versions=True)))
+    return tasks
+
+
+def run(tasks, max_workers=None):
+    """
+    Remove expired versions as one concurrent job.
+
+    Every task is attempted; the first failure is raised once they have all finished.
+
+    Args:
+        tasks (list): Pairs of a description and the function which removes it.
+        max_workers (int): (Optional) The number of removals to run at once.
+
+    Return:
+        int: The number of removals made.
+    """
+    if not tasks:
+        LOG.info("No expired versions to remove.")
+        return 0
+    if max_workers is None:
+        max_workers = GC_WORKERS
+    progress = conduit_log.progress(LOG, "Removing expired versions", total=len(tasks))
+    executor = futures.ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks))))
+    try:
+        submitted = [(description, executor.submit(conduit_trace.inherit(_counted(task, progress)))) for description, task in tasks]
+    finally:
+        executor.shutdown(wait=True)
+    progress.done()
+    failures = []
+    for description, future in submitted:
+        if future.exception() is not None:
+            LOG.error("Failed to remove %s: %s", description, future.exception())
+            failures.append(future.exception())
+        else:
+            LOG.debug("Removed %s", description)
+    if failures:
+        raise failures[0]
+    return len(tasks)
+
+
+def _counted(task, progress):
+    def wrapper():
+        try:
+            return task()
+        finally:
+            progress.update()
+
+    return wrapper
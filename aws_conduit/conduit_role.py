@@ -1,8 +1,11 @@
 import attr
 import boto3
 import yaml
+from aws_conduit import conduit_log
 from aws_conduit.aws import iam
 
+LOG = conduit_log.logger(__name__)
+
 
 @attr.s
 class ConduitRole(yaml.YAMLObject):
@@ -18,13 +21,13 @@ class ConduitRole(yaml.YAMLObject):
     def create(self):
         self._find_role()
         if self.role_arn is None:
-            print('Creating role: {}'.format(self.name))
+            LOG.info('Creating role: %s', self.name)
             role = iam.create_role(self.name, 'Conduit deploy role.')
             self.role_id = role['RoleId']
             self.role_arn = role['Arn']
 
     def update_policy(self, policy):
-        print('Updating policy for IAM role: {}'.format(self.name))
+        LOG.info('Updating policy for IAM role: %s', self.name)
         iam.put_role_policy(self.name, 'deployer-policy', policy)
 
     def _find_role(self):
@@ -32,7 +35,7 @@ class ConduitRole(yaml.YAMLObject):
             response = iam.list_roles('/conduit/')
             for role in response:
                 if role['RoleName'] == self.name:
-                    print('Syncing role...')
+                    LOG.info('Syncing role...')
                     self.role_id = role['RoleId']
                     self.role_arn = role['Arn']
                     break
@@ -1,16 +1,135 @@
 """Helper methods for working with S3"""
+import base64
+import functools
+import hashlib
+import mmap
 import os
 import tempfile
+import threading
 
 import yaml
 
 import attr
-from aws_conduit.aws import s3
+from aws_conduit import conduit_log
+from aws_conduit.conduit_storage import backend as storage
+from botocore.exceptions import ClientError
 
 LOCAL_STORE = tempfile.gettempdir()
 if not os.path.exists(LOCAL_STORE):
     os.makedirs(LOCAL_STORE)
 
+MANIFEST_PREFIX = 'conduit-manifest.yaml'
+LARGE_FILE_SIZE = 8 * 1024 * 1024
+MANIFESTS = {}
+MANIFEST_LOCK = threading.Lock()
+EXISTING_BUCKETS = {}
+EXISTING_BUCKETS_LOCK = threading.Lock()
+CONFIG_CHECKSUMS = {}
+REPLICA_SOURCES = {}
+LOG = conduit_log.logger(__name__)
+
+
+def content_checksum(content):
+    """Get the base64 sha256 checksum that S3 records for some uploaded content."""
+    return base64.b64encode(hashlib.sha256(content).digest()).decode('utf-8')
+
+
+def file_digest(path):
+    """
+    Get the sha256 digest of a file, memory mapping it if it is large.
+
+    Args:
+        path(str): The path of the file to hash.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= LARGE_FILE_SIZE:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                digest.update(mapped)
+        elif size:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def load_manifest(name):
+    """
+    Get the manifest of content already uploaded to a bucket, loading it once per process.
+
+    The manifest maps the sha256 digest of each artifact to the key it was uploaded to.
+
+    Args:
+        name(str): The name of the bucket.
+    """
+    with MANIFEST_LOCK:
+        if name not in MANIFESTS:
+            try:
+                artifacts = ConduitS3(name, None).get_config(MANIFEST_PREFIX)
+            except (ClientError, OSError):
+                artifacts = None
+            MANIFESTS[name] = dict(artifacts=artifacts or {}, dirty=False)
+        return MANIFESTS[name]
+
+
+def save_manifest(name):
+    """
+    Persist the manifest of a bucket if it has changed.
+
+    Args:
+        name(str): The name of the bucket.
+    """
+    with MANIFEST_LOCK:
+        manifest = MANIFESTS.get(name)
+        if manifest is None or not manifest['dirty']:
+            return
+        artifacts = dict(manifest['artifacts'])
+        manifest['dirty'] = False
+    ConduitS3(name, None).put_config(artifacts, MANIFEST_PREFIX)
+
+
+def save_manifests():
+    """Persist the manifest of every bucket this process has changed."""
+    with MANIFEST_LOCK:
+        names = sorted(MANIFESTS)
+    for name in names:
+        save_manifest(name)
+
+
+def saves_manifests(function):
+    """Decorate a command which uploads or deletes artifacts, so that the manifests it changed are saved even if it fails."""
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        try:
+            return function(*args, **kwargs)
+        finally:
+            save_manifests()
+
+    return wrapper
+
+
+def delete_folder(name, prefix, versions=False):
+    """
+    Delete a folder from a bucket, and forget the content the manifest recorded in it.
+
+    Args:
+        name(str): The name of the bucket.
+        prefix(str): The folder to delete.
+        versions(bool): (Optional) Also delete the old versions of its objects.
+
+    Return:
+        int: The number of objects deleted.
+    """
+    deleted = storage().delete_folder(name, prefix, versions=versions)
+    folder = prefix.rstrip('/') + '/'
+    manifest = load_manifest(name)
+    with MANIFEST_LOCK:
+        for digest, key in list(manifest['artifacts'].items()):
+            if key.startswith(folder):
+                del manifest['artifacts'][digest]
+                manifest['dirty'] = True
+    return deleted
+
 
 @attr.s
 class ConduitS3(yaml.YAMLObject):
@@ -21,9 +140,11 @@ class ConduitS3(yaml.YAMLObject):
     region = attr.ib()
 
     def exists(self):
-        """Test if an S3 bucket exists."""
-        all_buckets = s3.list_all_buckets()
-        return bool(self.name in [bucket['Name'] for bucket in all_buckets])
+        """Test if an S3 bucket exists, remembering the answer for this process."""
+        with EXISTING_BUCKETS_LOCK:
+            if self.name not in EXISTING_BUCKETS:
+                EXISTING_BUCKETS[self.name] = storage().bucket_exists(self.name)
+            return EXISTING_BUCKETS[self.name]
 
     def create(self):
         """
@@ -33,11 +154,17 @@ class ConduitS3(yaml.YAMLObject):
             name(str): The name of the S3 bucket to create.
             region(str): The region to create the S3 bucket in.
         """
-        s3.create_bucket(self.name, self.region)
+        storage().create_bucket(self.name, self.region)
+        with EXISTING_BUCKETS_LOCK:
+            EXISTING_BUCKETS[self.name] = True
 
     def delete(self):
         """Delete an S3 bucket and all of its contents."""
-        s3.delete_bucket(self.name)
+        storage().delete_bucket(self.name)
+        with EXISTING_BUCKETS_LOCK:
+            EXISTING_BUCKETS[self.name] = False
+        with MANIFEST_LOCK:
+            MANIFESTS.pop(self.name, None)
 
     def file_exists(self, prefix):
         """
@@ -47,7 +174,7 @@ class ConduitS3(yaml.YAMLObject):
             prefix(str): The prefix of the file to test for.
             bucket_name(str): The name of the bucket to check in.
         """
-        return bool(s3.get_file(self.name, prefix))
+        return storage().object_exists(self.name, prefix)
 
     def get_config(self, prefix):
         """
@@ -56,10 +183,9 @@ class ConduitS3(yaml.YAMLObject):
         Args:
             prefix(str): The prefix of the yaml config.
         """
-        file_name = prefix.split('/')[-1]
-        s3.download_file(self.name, prefix, os.path.join(LOCAL_STORE, file_name))
-        config = yaml.safe_load(open(os.path.join(LOCAL_STORE, file_name)).read())
-        return config
+        content = storage().download_content(self.name, prefix)
+        CONFIG_CHECKSUMS[(self.name, prefix)] = content_checksum(content)
+        return yaml.safe_load(content.decode('utf-8'))
 
     def put_config(self, content, prefix):
         """
@@ -70,24 +196,100 @@ class ConduitS3(yaml.YAMLObject):
             prefix(str): The prefix to save the configuration to.
         """
         if isinstance(content, dict):
-            file_name = prefix.split('/')[-1]
-            print("Uploading {} to {}...".format(file_name, self.name))
-            open(os.path.join(LOCAL_STORE, file_name), "w+").write(yaml.dump(content, default_flow_style=False))
+            LOG.debug("Uploading %s to %s...", prefix.split('/')[-1], self.name)
+            data = yaml.dump(content, default_flow_style=False).encode('utf-8')
+            storage().upload_content(self.name, prefix, data)
+            CONFIG_CHECKSUMS[(self.name, prefix)] = content_checksum(data)
         else:
-            print("Uploading {} to {}...".format(content, self.name))
-            file_name = content
-        s3.upload_file(self.name, prefix, os.path.join(LOCAL_STORE, file_name))
+            LOG.debug("Uploading %s to %s...", content, self.name)
+            storage().upload_file(self.name, prefix, os.path.join(LOCAL_STORE, content))
 
-    def put_resource(self, path, prefix):
+    def config_changed(self, prefix):
         """
-        Put some yaml content into an S3 bucket.
+        Test whether yaml config has changed since this process last read or wrote it.
 
         Args:
-            path(dict): An object representnig some yaml configuration.
-            prefix(str): The prefix to save the configuration to.
+            prefix(str): The prefix of the yaml config.
+        """
+        try:
+            return storage().get_checksum(self.name, prefix) != CONFIG_CHECKSUMS.get((self.name, prefix))
+        except (ClientError, OSError):
+            return True
+
+    def put_resource(self, path, prefix, callback=None, digest=None):
+        """
+        Put a file into an S3 bucket, unless identical content is already there.
+
+        Content that is already in the bucket under another key is copied
+        server side rather than uploaded again.
+
+        Args:
+            path(str): The path of the file to upload.
+            prefix(str): The prefix to save the file to.
+            callback(function): (Optional) Called with the number of bytes transferred.
+            digest(str): (Optional) The sha256 hex digest of the file, if already known.
         """
-        print("Uploading {} to {}...".format(path, self.name))
-        s3.upload_file(self.name, prefix, path)
+        if digest is None:
+            digest = file_digest(path)
+        upload = functools.partial(storage().upload_file, self.name, prefix, path, metadata=dict(sha256=digest), callback=callback)
+        self._put_artifact(digest, prefix, path, upload)
+
+    def put_content(self, content, prefix, callback=None):
+        """
+        Put some rendered content into an S3 bucket, unless it is already there.
+
+        Args:
+            content(bytes): The content to upload.
+            prefix(str): The prefix to save the content to.
+            callback(function): (Optional) Called with the number of bytes transferred.
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        upload = functools.partial(storage().upload_content, self.name, prefix, content, metadata=dict(sha256=digest), callback=callback)
+        self._put_artifact(digest, prefix, prefix, upload)
+
+    def _put_artifact(self, digest, prefix, description, upload):
+        manifest = self.get_manifest()
+        existing = manifest['artifacts'].get(digest)
+        if existing == prefix:
+            if storage().object_exists(self.name, prefix):
+                LOG.debug("Unchanged %s, already in %s...", description, self.name)
+                return
+            existing = None
+        if existing is not None and self._copy_artifact(self.name, existing, prefix, description):
+            self._record_artifact(digest, prefix)
+            return
+        # A regional bucket copies content its source bucket already has server side.
+        source = REPLICA_SOURCES.get(self.name)
+        source_prefix = MANIFESTS.get(source, dict(artifacts={}))['artifacts'].get(digest)
+        if source_prefix is not None and self._copy_artifact(source, source_prefix, prefix, description):
+            self._record_artifact(digest, prefix)
+            return
+        LOG.debug("Uploading %s to %s...", description, self.name)
+        upload()
+        self._record_artifact(digest, prefix)
+
+    def _copy_artifact(self, source, source_prefix, prefix, description):
+        try:
+            storage().copy_file(self.name, source_prefix, prefix, source_name=source)
+        except (ClientError, OSError):
+            LOG.warning("Previous copy of %s is gone...", description)
+            return False
+        LOG.debug("Unchanged %s, copied from %s/%s...", description, source, source_prefix)
+        return True
+
+    def get_manifest(self):
+        """Get the manifest of content already uploaded to this bucket."""
+        return load_manifest(self.name)
+
+    def save_manifest(self):
+        """Persist the manifest of uploaded content if it has changed."""
+        save_manifest(self.name)
+
+    def _record_artifact(self, digest, prefix):
+        manifest = self.get_manifest()
+        with MANIFEST_LOCK:
+            manifest['artifacts'][digest] = prefix
+            manifest['dirty'] = True
 
     def get_url(self):
         """Get the https url for this S3 bucket."""
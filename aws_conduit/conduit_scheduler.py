@@ -0,0 +1,131 @@
+"""Concurrent scheduling of builds over the conduitspec inventory."""
+import os
+import time
+from concurrent import futures
+
+from aws_conduit import conduit_log, conduit_trace
+
+BUILD_WORKERS = int(os.environ.get('CONDUIT_BUILD_WORKERS', 4))
+TIMELINE_FORMAT = "{:<50}{:>10}{:>12}  {}"
+
+
+def node_name(product_spec):
+    return "{}/{}".format(product_spec['portfolio'], product_spec['product'])
+
+
+def inventory_graph(product_specs):
+    """
+    Work out which products each product in the inventory depends on.
+
+    Products declare dependencies with dependsOn, naming either a product, or
+    a portfolio/product where the product name alone is ambiguous. Dependencies
+    which are not part of this build are assumed to be released already.
+
+    Args:
+        product_specs (list): The inventory entries to build.
+
+    Return:
+        dict: A mapping of portfolio/product to the set of portfolio/products it depends on.
+    """
+    names = [node_name(product_spec) for product_spec in product_specs]
+    if len(set(names)) != len(names):
+        raise ValueError("Products must be uniquely identified by portfolio and product in conduitspec.yaml")
+    by_product = {}
+    for name in names:
+        by_product.setdefault(name.split('/', 1)[1], []).append(name)
+    graph = {}
+    for name, product_spec in zip(names, product_specs):
+        graph[name] = set()
+        for dependency in product_spec.get('dependsOn', []):
+            if dependency in names:
+                graph[name].add(dependency)
+            elif len(by_product.get(dependency, [])) == 1:
+                graph[name].add(by_product[dependency][0])
+            elif dependency in by_product:
+                raise ValueError("{} depends on {}, which is ambiguous; use portfolio/product".format(name, dependency))
+        graph[name].discard(name)
+    _check_acyclic(graph)
+    return graph
+
+
+def _check_acyclic(graph):
+    remaining = dict((name, set(dependencies)) for name, dependencies in graph.items())
+    while remaining:
+        ready = [name for name, dependencies in remaining.items() if not dependencies]
+        if not ready:
+            raise ValueError("Circular dependsOn between: {}".format(', '.join(sorted(remaining))))
+        for name in ready:
+            del remaining[name]
+        for dependencies in remaining.values():
+            dependencies.difference_update(ready)
+
+
+def run_graph(graph, work, max_workers=None):
+    """
+    Run some work for every node of a dependency graph on a worker pool.
+
+    A node starts as soon as everything it depends on has finished. After a
+    failure no new nodes are started; running nodes are allowed to finish and
+    the first failure is raised.
+
+    Args:
+        graph (dict): A mapping of node to the set of nodes it depends on.
+        work (function): Called with each node.
+        max_workers (int): (Optional) The number of nodes to run at once.
+
+    Return:
+        list: The timeline of each node that ran, as dicts of name, start, end and status.
+    """
+    if max_workers is None:
+        max_workers = BUILD_WORKERS
+    remaining = dict((name, set(dependencies)) for name, dependencies in graph.items())
+    started = time.time()
+    timeline = []
+    running = {}
+    failures = []
+    executor = futures.ThreadPoolExecutor(max_workers=max(1, max_workers))
+    try:
+        while remaining or running:
+            if not failures:
+                _start_ready(executor, work, remaining, running, timeline, started)
+            if not running:
+                break
+            done, _ = futures.wait(list(running), return_when=futures.FIRST_COMPLETED)
+            for future in done:
+                _finish(future, running.pop(future), remaining, failures, started)
+    finally:
+        executor.shutdown(wait=True)
+    report_timeline(timeline, remaining)
+    if failures:
+        raise failures[0]
+    return timeline
+
+
+def _start_ready(executor, work, remaining, running, timeline, started):
+    for name in sorted(name for name, dependencies in remaining.items() if not dependencies):
+        del remaining[name]
+        entry = dict(name=name, start=time.time() - started, end=None, status='running')
+        timeline.append(entry)
+        running[executor.submit(conduit_trace.inherit(work), name)] = entry
+
+
+def _finish(future, entry, remaining, failures, started):
+    entry['end'] = time.time() - started
+    if future.exception() is not None:
+        entry['status'] = 'failed'
+        failures.append(future.exception())
+        return
+    entry['status'] = 'done'
+    for dependencies in remaining.values():
+        dependencies.discard(entry['name'])
+
+
+def report_timeline(timeline, skipped=None):
+    lines = [TIMELINE_FORMAT.format("Product", "Start (s)", "Duration (s)", "Status"), "----------" * 9]
+    entries = sorted(timeline, key=lambda item: item['start'])
+    for entry in entries:
+        lines.append(TIMELINE_FORMAT.format(entry['name'], "{:.1f}".format(entry['start']),
+                                            "{:.1f}".format(entry['end'] - entry['start']), entry['status']))
+    for name in sorted(skipped or []):
+        lines.append(TIMELINE_FORMAT.format(name, "-", "-", "skipped"))
+    conduit_log.report('timeline', '\n'.join(lines), dict(products=entries, skipped=sorted(skipped or [])))
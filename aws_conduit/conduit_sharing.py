@@ -0,0 +1,197 @@
+"""Sharing portfolios with other accounts in bulk."""
+import functools
+import os
+import re
+from concurrent import futures
+
+from aws_conduit import conduit_log, conduit_trace
+from aws_conduit.aws import service_catalog
+
+SHARE_WORKERS = int(os.environ.get('CONDUIT_SHARE_WORKERS', 4))
+CONDUIT_ROLE = 'role/conduit/conduit-provisioner-role'
+ACCOUNT_PATTERN = re.compile(r'^\d{12}$')
+NODE_TYPES = (
+    ('ou-', 'ORGANIZATIONAL_UNIT'),
+    ('o-', 'ORGANIZATION')
+)
+LOG = conduit_log.logger(__name__)
+
+
+def parse_targets(targets):
+    """
+    Split what portfolios are shared with into accounts and organization nodes.
+
+    Args:
+        targets (list): Account ids, organizational unit ids (ou-...) and organization ids (o-...), or a comma separated string of them.
+
+    Return:
+        tuple: The account ids, and the organization nodes as pairs of their type and id.
+    """
+    if isinstance(targets, str):
+        targets = targets.split(',')
+    accounts = []
+    nodes = []
+    for target in [target.strip() for target in targets if target.strip()]:
+        node_type = next((node_type for prefix, node_type in NODE_TYPES if target.startswith(prefix)), None)
+        if node_type is not None:
+            if (node_type, target) not in nodes:
+                nodes.append((node_type, target))
+        elif ACCOUNT_PATTERN.match(target):
+            if target not in accounts:
+                accounts.append(target)
+        else:
+            raise ValueError("Not an account, organizational unit or organization id: {}".format(target))
+    return accounts, nodes
+
+
+def principal_arns(account_id, principals=None, share_principals=False):
+    """
+    Work out the principals to associate with each portfolio.
+
+    The conduit provisioner role of this account is always associated. When
+    principals are shared with organization nodes, the conduit provisioner
+    role is also associated by name, so that it can provision in every
+    account shared with.
+
+    Args:
+        account_id (str): The id of this account.
+        principals (list): (Optional) Further principal ARNs to associate.
+        share_principals (bool): (Optional) Whether principals are shared.
+
+    Return:
+        list: The principal ARNs.
+    """
+    arns = ['arn:aws:iam::{}:{}'.format(account_id, CONDUIT_ROLE)]
+    if share_principals:
+        arns.append('arn:aws:iam:::{}'.format(CONDUIT_ROLE))
+    for principal in principals or []:
+        if principal not in arns:
+            arns.append(principal)
+    return arns
+
+
+def plan(portfolios, accounts, nodes, principals, share_principals=False, max_workers=None):
+    """
+    Work out which shares and principal associations are missing.
+
+    The accounts with access, organization shares and principals of each
+    portfolio are listed once, with the portfolios listed concurrently.
+    Accounts which already have access, including through an organization
+    node, are not shared with again.
+
+    Args:
+        portfolios (list): The portfolios to share.
+        accounts (list): The account ids to share with.
+        nodes (list): The organization nodes to share with, as pairs of their type and id.
+        principals (list): The principal ARNs to associate.
+        share_principals (bool): (Optional) Whether to share principals with organization nodes.
+        max_workers (int): (Optional) The number of portfolios to list at once.
+
+    Return:
+        list: Pairs of a description and the function which makes the change.
+    """
+    listings = _run([(portfolio.name, functools.partial(_existing, portfolio, accounts, nodes)) for portfolio in portfolios],
+                    "Listing portfolio shares", max_workers)
+    changes = []
+    for portfolio, existing in zip(portfolios, listings):
+        changes.extend(_missing(portfolio, existing, accounts, nodes, principals, share_principals))
+    return changes
+
+
+def share(portfolios, targets, account_id, principals=None, share_principals=False, max_workers=None):
+    """
+    Share portfolios with accounts and organization nodes, and associate principals with them.
+
+    Only the missing shares and associations are made, concurrently. Calls
+    share the Service Catalog client, whose adaptive retries slow every
+    worker down once Service Catalog starts throttling. Every change is
+    attempted; the first failure is raised once they have all finished, and
+    running again only makes the changes which are still missing.
+
+    Args:
+        portfolios (list): The portfolios to share.
+        targets (list): Account ids, organizational unit ids and organization ids; see parse_targets.
+        account_id (str): The id of this account.
+        principals (list): (Optional) Further principal ARNs to associate.
+        share_principals (bool): (Optional) Whether to share principals with organization nodes.
+        max_workers (int): (Optional) The number of calls to make at once.
+
+    Return:
+        int: The number of changes made.
+    """
+    accounts, nodes = parse_targets(targets)
+    arns = principal_arns(account_id, principals, share_principals)
+    changes = plan(portfolios, accounts, nodes, arns, share_principals, max_workers)
+    if not changes:
+        LOG.info("Every share and principal association is already in place.")
+        return 0
+    _run(changes, "Sharing portfolios", max_workers)
+    return len(changes)
+
+
+def _existing(portfolio, accounts, nodes):
+    portfolio_id = portfolio.get_id()
+    existing = dict(accounts=set(), nodes={})
+    if accounts:
+        existing['accounts'] = set(service_catalog.list_portfolio_access(portfolio_id))
+    for node_type in sorted(set(node_type for node_type, _ in nodes)):
+        for portfolio_share in service_catalog.describe_portfolio_shares(portfolio_id, node_type):
+            existing['nodes'][(node_type, portfolio_share['PrincipalId'])] = portfolio_share.get('SharePrincipals', False)
+    existing['principals'] = set(service_catalog.list_principals_for_portfolio(portfolio_id))
+    return existing
+
+
+def _missing(portfolio, existing, accounts, nodes, principals, share_principals):
+    portfolio_id = portfolio.get_id()
+    changes = []
+    for account in accounts:
+        if account not in existing['accounts']:
+            changes.append(("share {} with {}".format(portfolio.name, account),
+                            functools.partial(service_catalog.create_portfolio_share, portfolio_id, account_id=account)))
+    for node in nodes:
+        if node not in existing['nodes']:
+            changes.append(("share {} with {}".format(portfolio.name, node[1]),
+                            functools.partial(service_catalog.create_portfolio_share, portfolio_id,
+                                              organization_node=node, share_principals=share_principals)))
+        elif share_principals and not existing['nodes'][node]:
+            changes.append(("share the principals of {} with {}".format(portfolio.name, node[1]),
+                            functools.partial(service_catalog.update_portfolio_share, portfolio_id, node, True)))
+    for principal in principals:
+        if principal not in existing['principals']:
+            changes.append(("associate {} with {}".format(principal, portfolio.name),
+                            functools.partial(service_catalog.associate_principal, portfolio_id, principal)))
+    return changes
+
+
+def _run(tasks, description, max_workers=None):
+    if not tasks:
+        return []
+    if max_workers is None:
+        max_workers = SHARE_WORKERS
+    progress = conduit_log.progress(LOG, description, total=len(tasks))
+    executor = futures.ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks))))
+    try:
+        submitted = [(name, executor.submit(conduit_trace.inherit(_counted(task, progress)))) for name, task in tasks]
+    finally:
+        executor.shutdown(wait=True)
+    progress.done()
+    failures = []
+    for name, future in submitted:
+        if future.exception() is not None:
+            LOG.error("%s: %s failed: %s", description, name, future.exception())
+            failures.append(future.exception())
+        else:
+            LOG.debug("%s: %s", description, name)
+    if failures:
+        raise failures[0]
+    return [future.result() for _, future in submitted]
+
+
+def _counted(task, progress):
+    def wrapper():
+        try:
+            return task()
+        finally:
+            progress.update()
+
+    return wrapper
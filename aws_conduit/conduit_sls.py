@@ -0,0 +1,63 @@
+"""Reading the artifacts of a Serverless Framework package."""
+import base64
+import binascii
+import json
+import os
+
+STATE_PATH = '.serverless/serverless-state.json'
+
+
+class ServerlessState(object):
+    """
+    The package metadata that `sls package` leaves in serverless-state.json.
+
+    The compiled template records the sha256 of every function zip, so zips
+    need not be read again to fingerprint them or to find out whether they are
+    already in the bucket. A recorded hash is only used while the zip is no
+    newer than the state it was recorded in.
+
+    Args:
+        path (str): (Optional) The path of serverless-state.json.
+    """
+
+    def __init__(self, path=STATE_PATH):
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        self.package = state['package']
+        self.package['bucket'] = state['service']['provider']['deploymentBucketObject']['name']
+        self.digests = _fresh(os.path.dirname(path), _code_digests(state), os.path.getmtime(path))
+
+    def digest(self, path):
+        """Get the sha256 hex digest of a packaged zip, if the state records it."""
+        return self.digests.get(os.path.normpath(path))
+
+
+def _code_digests(state):
+    resources = state['service']['provider'].get('compiledCloudFormationTemplate', {}).get('Resources', {})
+    code_keys = {}
+    for name, resource in resources.items():
+        code = resource.get('Properties', {}).get('Code', {})
+        if resource.get('Type') == 'AWS::Lambda::Function' and isinstance(code.get('S3Key'), str):
+            code_keys[name] = code['S3Key'].split('/')[-1]
+    digests = {}
+    for resource in resources.values():
+        properties = resource.get('Properties', {})
+        function = properties.get('FunctionName', {})
+        if resource.get('Type') != 'AWS::Lambda::Version' or not isinstance(function, dict):
+            continue
+        zip_name = code_keys.get(function.get('Ref'))
+        if zip_name is not None and 'CodeSha256' in properties:
+            try:
+                digests[zip_name] = binascii.hexlify(base64.b64decode(properties['CodeSha256'])).decode('utf-8')
+            except (binascii.Error, TypeError):
+                continue
+    return digests
+
+
+def _fresh(directory, digests, recorded):
+    fresh = {}
+    for zip_name, digest in digests.items():
+        path = os.path.normpath(os.path.join(directory, zip_name))
+        if os.path.isfile(path) and os.path.getmtime(path) <= recorded:
+            fresh[path] = digest
+    return fresh
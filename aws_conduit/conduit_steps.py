@@ -0,0 +1,123 @@
+"""Running and timing conduitspec build steps."""
+import json
+import os
+import subprocess
+import threading
+import time
+from concurrent import futures
+
+from aws_conduit import conduit_log, conduit_plan
+
+MAX_PARALLEL_STEPS = os.cpu_count() or 1
+REPORT_PATH = os.environ.get('CONDUIT_BUILD_REPORT')
+
+STEP_SLOTS = threading.BoundedSemaphore(MAX_PARALLEL_STEPS)
+STEP_RECORDS = []
+RECORDS_LOCK = threading.Lock()
+LOG = conduit_log.logger(__name__)
+
+
+def step_command(step):
+    if isinstance(step, str):
+        return step
+    return step['run']
+
+
+def is_parallel(step):
+    return isinstance(step, dict) and step.get('parallel') is True
+
+
+def step_groups(steps):
+    """
+    Group build steps into the batches that run together.
+
+    Consecutive steps marked parallel: true share a batch; every other step
+    runs in a batch of its own.
+    """
+    groups = []
+    for step in steps:
+        if is_parallel(step) and groups and is_parallel(groups[-1][0]):
+            groups[-1].append(step)
+        else:
+            groups.append([step])
+    return groups
+
+
+def run_steps(name, steps, env=None):
+    """
+    Run the build steps of a product, stopping at the first step that fails.
+
+    At most one step per CPU runs at once across the whole build.
+
+    Args:
+        name (str): The product the steps belong to, used to prefix their output.
+        steps (list): Commands, or dicts with a run command and an optional parallel flag.
+        env (dict): (Optional) The environment to run the steps in.
+
+    Raises:
+        CalledProcessError: If a step exits with a non-zero status.
+
+    Return:
+        list: A record of each step's command, exit status and timing.
+    """
+    records = []
+    for group in step_groups(steps):
+        if len(group) == 1:
+            results = [run_step(name, group[0], env)]
+        else:
+            executor = futures.ThreadPoolExecutor(max_workers=min(len(group), MAX_PARALLEL_STEPS))
+            try:
+                results = list(executor.map(lambda step: run_step(name, step, env), group))
+            finally:
+                executor.shutdown(wait=True)
+        records.extend(results)
+        failed = [record for record in results if record['returncode'] != 0]
+        if failed:
+            raise subprocess.CalledProcessError(failed[0]['returncode'], failed[0]['command'])
+    return records
+
+
+def run_step(name, step, env=None):
+    command = step_command(step)
+    plan = conduit_plan.active()
+    if plan is not None:
+        plan.record_step(name, command)
+        return dict(product=name, command=command, parallel=is_parallel(step),
+                    returncode=0, started=time.time(), duration=0.0)
+    with STEP_SLOTS:
+        started = time.time()
+        LOG.info("[%s] $ %s", name, command)
+        process = subprocess.Popen(command, shell=True, env=env, stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT, universal_newlines=True)
+        for line in process.stdout:
+            LOG.info("[%s] %s", name, line.rstrip('\n'))
+        returncode = process.wait()
+        duration = time.time() - started
+    LOG.info("[%s] exited %s after %.1fs", name, returncode, duration)
+    record = dict(product=name, command=command, parallel=is_parallel(step),
+                  returncode=returncode, started=started, duration=duration)
+    with RECORDS_LOCK:
+        STEP_RECORDS.append(record)
+    return record
+
+
+def write_report(timeline, path=None):
+    """
+    Write the timing of a build as JSON, then start recording a new one.
+
+    A report is only written when a path is given or CONDUIT_BUILD_REPORT is set.
+
+    Args:
+        timeline (list): The product timeline from the scheduler.
+        path (str): (Optional) Where to write the report. Defaults to CONDUIT_BUILD_REPORT.
+    """
+    if path is None:
+        path = REPORT_PATH
+    with RECORDS_LOCK:
+        report = dict(products=timeline, steps=sorted(STEP_RECORDS, key=lambda record: record['started']))
+        del STEP_RECORDS[:]
+    if not path:
+        return
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    LOG.info("Build report written to %s", path)
@@ -0,0 +1,190 @@
+"""Storage backends for Conduit artifacts and configuration."""
+import base64
+import hashlib
+import os
+import shutil
+import threading
+
+from aws_conduit import conduit_log
+from aws_conduit.aws import s3
+
+LOCAL_STORAGE_ENV = 'CONDUIT_LOCAL_STORAGE'
+VERSIONS_DIRECTORY = '.versions'
+LOG = conduit_log.logger(__name__)
+
+BACKENDS = {}
+
+
+def backend():
+    """
+    Get the storage backend for this process.
+
+    Artifacts are stored in S3, unless CONDUIT_LOCAL_STORAGE names a directory
+    to store them in instead.
+    """
+    if 'storage' not in BACKENDS:
+        root = os.environ.get(LOCAL_STORAGE_ENV)
+        if root:
+            BACKENDS['storage'] = LocalStorage(root)
+        else:
+            BACKENDS['storage'] = S3Storage()
+    return BACKENDS['storage']
+
+
+class S3Storage(object):
+    """Stores buckets in S3."""
+
+    def create_bucket(self, name, region):
+        s3.create_bucket(name, region)
+
+    def delete_bucket(self, name):
+        s3.delete_bucket(name)
+
+    def bucket_exists(self, name):
+        return s3.bucket_exists(name)
+
+    def object_exists(self, name, prefix):
+        return s3.object_exists(name, prefix)
+
+    def get_sub_folders(self, name, prefix):
+        return s3.get_sub_folders(name, prefix)
+
+    def list_objects(self, name, prefix):
+        return s3.list_objects(name, prefix)
+
+    def delete_folder(self, name, prefix, versions=False):
+        return s3.delete_folder(name, prefix, versions=versions)
+
+    def download_file(self, name, prefix, download_location):
+        s3.download_file(name, prefix, download_location)
+
+    def download_content(self, name, prefix):
+        return s3.download_content(name, prefix)
+
+    def upload_file(self, name, prefix, file, metadata=None, callback=None, checksum=False):
+        s3.upload_file(name, prefix, file, metadata=metadata, callback=callback, checksum=checksum)
+
+    def upload_content(self, name, prefix, content, metadata=None, callback=None):
+        s3.upload_content(name, prefix, content, metadata=metadata, callback=callback)
+
+    def get_checksum(self, name, prefix):
+        return s3.get_checksum(name, prefix)
+
+    def copy_file(self, name, source_prefix, destination_prefix, source_name=None):
+        s3.copy_file(name, source_prefix, destination_prefix, source_name=source_name)
+
+
+class LocalStorage(object):
+    """
+    Stores buckets as directories on the local filesystem.
+
+    Keys keep their S3 layout below a directory per bucket.  Buckets are
+    versioned like the S3 buckets Conduit creates: overwritten and deleted
+    objects are kept under a .versions directory beside the buckets, until a
+    folder is deleted along with its versions.
+
+    Args:
+        root (str): The directory to keep buckets in.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self._lock = threading.Lock()
+
+    def create_bucket(self, name, region):
+        os.makedirs(self._path(name), exist_ok=True)
+
+    def delete_bucket(self, name):
+        shutil.rmtree(self._path(name), ignore_errors=True)
+        shutil.rmtree(self._versions_path(name), ignore_errors=True)
+
+    def bucket_exists(self, name):
+        return os.path.isdir(self._path(name))
+
+    def object_exists(self, name, prefix):
+        return os.path.isfile(self._path(name, prefix))
+
+    def get_sub_folders(self, name, prefix):
+        folder = self._path(name, prefix)
+        if not os.path.isdir(folder):
+            return []
+        prefix = prefix.rstrip('/')
+        return sorted('{}/{}'.format(prefix, entry) for entry in os.listdir(folder)
+                      if os.path.isdir(os.path.join(folder, entry)))
+
+    def list_objects(self, name, prefix):
+        objects = []
+        for key in self._keys(name, prefix):
+            path = self._path(name, key)
+            with open(path, 'rb') as f:
+                etag = '"{}"'.format(hashlib.md5(f.read()).hexdigest())  # nosec
+            objects.append(dict(Key=key, Size=os.path.getsize(path), ETag=etag))
+        return objects
+
+    def delete_folder(self, name, prefix, versions=False):
+        deleted = 0
+        for key in self._keys(name, prefix):
+            self._archive(name, key)
+            deleted += 1
+        if versions:
+            shutil.rmtree(self._versions_path(name, prefix), ignore_errors=True)
+        LOG.debug("Deleted %s objects from %s/%s", deleted, name, prefix)
+        return deleted
+
+    def download_file(self, name, prefix, download_location):
+        shutil.copyfile(self._path(name, prefix), download_location)
+
+    def download_content(self, name, prefix):
+        with open(self._path(name, prefix), 'rb') as f:
+            return f.read()
+
+    def upload_file(self, name, prefix, file, metadata=None, callback=None, checksum=False):
+        with open(file, 'rb') as f:
+            self.upload_content(name, prefix, f.read(), metadata=metadata, callback=callback)
+
+    def upload_content(self, name, prefix, content, metadata=None, callback=None):
+        if not self.bucket_exists(name):
+            raise FileNotFoundError("No such bucket: {}".format(name))
+        path = self._path(name, prefix)
+        self._archive(name, prefix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+        if callback is not None:
+            callback(len(content))
+
+    def get_checksum(self, name, prefix):
+        with open(self._path(name, prefix), 'rb') as f:
+            return base64.b64encode(hashlib.sha256(f.read()).digest()).decode('utf-8')
+
+    def copy_file(self, name, source_prefix, destination_prefix, source_name=None):
+        self.upload_content(name, destination_prefix, self.download_content(source_name or name, source_prefix))
+
+    def _path(self, name, prefix=''):
+        parts = [part for part in prefix.split('/') if part]
+        if '..' in parts or name in ('', '.', '..', VERSIONS_DIRECTORY):
+            raise ValueError("Invalid location: {}/{}".format(name, prefix))
+        return os.path.join(self.root, name, *parts)
+
+    def _versions_path(self, name, prefix=''):
+        parts = [part for part in prefix.split('/') if part]
+        return os.path.join(self.root, VERSIONS_DIRECTORY, name, *parts)
+
+    def _keys(self, name, prefix):
+        folder = self._path(name, prefix)
+        keys = []
+        for directory, _, files in os.walk(folder):
+            for file_name in files:
+                relative = os.path.relpath(os.path.join(directory, file_name), self._path(name))
+                keys.append(relative.replace(os.sep, '/'))
+        return sorted(keys)
+
+    def _archive(self, name, prefix):
+        path = self._path(name, prefix)
+        if not os.path.isfile(path):
+            return
+        versions = self._versions_path(name, prefix)
+        with self._lock:
+            os.makedirs(versions, exist_ok=True)
+            version = len(os.listdir(versions)) + 1
+            shutil.move(path, os.path.join(versions, str(version)))
@@ -0,0 +1,38 @@
+"""Placeholder substitution for Cloudformation templates."""
+import re
+
+
+class TemplateRenderer(object):
+    """
+    Substitutes every placeholder in a template in a single pass.
+
+    Placeholders are matched longest first, and substituted values are never
+    scanned again, so a value which happens to contain another placeholder is
+    left exactly as it was given.
+
+    Args:
+        replacements (dict): A mapping of placeholder to substituted value.
+    """
+
+    def __init__(self, replacements):
+        self.replacements = dict((token, value) for token, value in replacements.items() if token)
+        tokens = sorted(self.replacements, key=len, reverse=True)
+        self.pattern = None
+        if tokens:
+            self.pattern = re.compile('({})'.format('|'.join(re.escape(token) for token in tokens)))
+
+    def render(self, text):
+        """
+        Render a template.
+
+        Args:
+            text (str): The template content.
+
+        Return:
+            str: The template with every placeholder substituted.
+        """
+        if self.pattern is None:
+            return text
+        parts = self.pattern.split(text)
+        parts[1::2] = [self.replacements[token] for token in parts[1::2]]
+        return ''.join(parts)
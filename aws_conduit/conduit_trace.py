@@ -0,0 +1,236 @@
+"""Tracing the AWS calls made by Conduit commands."""
+import functools
+import json
+import os
+import threading
+import time
+
+from aws_conduit.aws import events
+
+UNIQUE_ID = 'conduit-trace'
+ROW_FORMAT = "{:<14}{:<44}{:>8}{:>12}{:>12}{:>9}{:>14}"
+
+TRACES = []
+PHASES = threading.local()
+
+
+def active():
+    """Get the trace being recorded, if any."""
+    if TRACES:
+        return TRACES[-1]
+    return None
+
+
+def current_phase(default=None):
+    stack = getattr(PHASES, 'stack', None)
+    if stack:
+        return stack[-1]
+    return default
+
+
+def phase(name):
+    """
+    Attribute the AWS calls made by this thread to a Conduit operation.
+
+    A context manager; the innermost phase wins.
+
+    Args:
+        name (str): The operation, e.g. release or tidy.
+    """
+    return _Phase(name)
+
+
+def in_phase(name):
+    """Decorate a function so that it runs in a phase."""
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def inherit(function):
+    """Run a function given to a worker thread in the phases of the thread submitting it."""
+    stack = list(getattr(PHASES, 'stack', None) or [])
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        previous = getattr(PHASES, 'stack', None)
+        PHASES.stack = list(stack)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            PHASES.stack = previous
+
+    return wrapper
+
+
+class _Phase(object):
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        if not hasattr(PHASES, 'stack') or PHASES.stack is None:
+            PHASES.stack = []
+        PHASES.stack.append(self.name)
+        self.started = time.time()
+        return self
+
+    def __exit__(self, *args):
+        PHASES.stack.pop()
+        trace = active()
+        if trace is not None:
+            trace.record_phase(self.name, self.started, time.time())
+
+
+class Trace(object):
+    """
+    Records every AWS call made while it is active.
+
+    Each call is recorded with its service, operation, latency, retries, bytes
+    sent and received, and the Conduit operation it was made for. Calls made
+    by threads outside a phase, such as S3 transfer threads, are attributed to
+    the command.
+
+    Args:
+        command (str): (Optional) The command being traced.
+    """
+
+    def __init__(self, command='conduit'):
+        self.command = command
+        self.calls = []
+        self.phases = []
+        self.started = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        events.register('before-call', self.before_call, UNIQUE_ID)
+        events.register('before-send', self.before_send, UNIQUE_ID)
+        events.register('after-call', self.after_call, UNIQUE_ID)
+        events.register('after-call-error', self.after_call_error, UNIQUE_ID)
+        self.started = time.time()
+        TRACES.append(self)
+        return self
+
+    def __exit__(self, *args):
+        TRACES.remove(self)
+        for event_name in ('before-call', 'before-send', 'after-call', 'after-call-error'):
+            events.unregister(event_name, UNIQUE_ID)
+
+    def before_call(self, model, context=None, **kwargs):
+        call = dict(service=model.service_model.service_name, operation=model.name,
+                    phase=current_phase(self.command), thread=threading.current_thread().name,
+                    start=time.time(), duration=None, attempts=0, sent=0, received=0, error=None)
+        with self._lock:
+            self.calls.append(call)
+        if context is not None:
+            context['conduit_trace_call'] = call
+
+    def before_send(self, request, **kwargs):
+        call = _call(getattr(request, 'context', None))
+        if call is not None:
+            call['attempts'] += 1
+            call['sent'] += _body_size(request.body)
+
+    def after_call(self, http_response=None, parsed=None, context=None, **kwargs):
+        call = _call(context)
+        if call is None:
+            return
+        call['duration'] = time.time() - call['start']
+        if http_response is not None:
+            call['received'] = int(http_response.headers.get('content-length') or 0)
+        if parsed and 'Error' in parsed:
+            call['error'] = parsed['Error'].get('Code')
+
+    def after_call_error(self, exception=None, context=None, **kwargs):
+        call = _call(context)
+        if call is not None:
+            call['duration'] = time.time() - call['start']
+            call['error'] = type(exception).__name__
+
+    def record_phase(self, name, started, finished):
+        with self._lock:
+            self.phases.append(dict(name=name, thread=threading.current_thread().name, start=started, duration=finished - started))
+
+    def summary(self):
+        """
+        Total the calls by Conduit operation, service and API operation.
+
+        Return:
+            list: Rows of phase, call, count, total and max seconds, retries and bytes, slowest first.
+        """
+        rows = {}
+        for call in self.calls:
+            key = (call['phase'], "{}.{}".format(call['service'], call['operation']))
+            row = rows.setdefault(key, dict(phase=key[0], call=key[1], count=0, total=0.0, max=0.0, retries=0, bytes=0))
+            duration = call['duration'] or 0.0
+            row['count'] += 1
+            row['total'] += duration
+            row['max'] = max(row['max'], duration)
+            row['retries'] += max(call['attempts'] - 1, 0)
+            row['bytes'] += call['sent'] + call['received']
+        return sorted(rows.values(), key=lambda row: row['total'], reverse=True)
+
+    def report(self):
+        print(ROW_FORMAT.format("Operation", "Call", "Count", "Total (s)", "Max (s)", "Retries", "Bytes"))
+        print("----------" * 11)
+        for row in self.summary():
+            print(ROW_FORMAT.format(row['phase'], row['call'], row['count'], "{:.2f}".format(row['total']),
+                                    "{:.2f}".format(row['max']), row['retries'], row['bytes']))
+
+    def chrome_trace(self):
+        """Get the trace in the Chrome trace event format, for chrome://tracing or Perfetto."""
+        threads = {}
+        trace_events = []
+        for item in sorted(self.phases, key=lambda item: item['start']):
+            trace_events.append(dict(name=item['name'], cat='phase', ph='X', pid=os.getpid(),
+                                     tid=threads.setdefault(item['thread'], len(threads) + 1),
+                                     ts=self._microseconds(item['start']), dur=int(item['duration'] * 1000000)))
+        for call in self.calls:
+            trace_events.append(dict(name="{}.{}".format(call['service'], call['operation']), cat=call['phase'], ph='X',
+                                     pid=os.getpid(), tid=threads.setdefault(call['thread'], len(threads) + 1),
+                                     ts=self._microseconds(call['start']), dur=int((call['duration'] or 0.0) * 1000000),
+                                     args=dict(retries=max(call['attempts'] - 1, 0), sent=call['sent'],
+                                               received=call['received'], error=call['error'])))
+        for name, tid in threads.items():
+            trace_events.append(dict(name='thread_name', ph='M', pid=os.getpid(), tid=tid, args=dict(name=name)))
+        return dict(traceEvents=trace_events, displayTimeUnit='ms', otherData=dict(command=self.command))
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+        print("Trace of {} AWS calls written to {}".format(len(self.calls), path))
+
+    def _microseconds(self, timestamp):
+        return int((timestamp - self.started) * 1000000)
+
+
+def _call(context):
+    if context is None:
+        return None
+    return context.get('conduit_trace_call')
+
+
+def _body_size(body):
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    if isinstance(body, str):
+        return len(body.encode('utf-8'))
+    if hasattr(body, 'seek') and hasattr(body, 'tell'):
+        try:
+            position = body.tell()
+            body.seek(0, os.SEEK_END)
+            size = body.tell() - position
+            body.seek(position)
+            return size
+        except (OSError, ValueError):
+            return 0
+    return 0
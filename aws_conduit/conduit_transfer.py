@@ -0,0 +1,86 @@
+"""Concurrent uploads of release artifacts."""
+import os
+import threading
+import time
+from concurrent import futures
+
+from aws_conduit import conduit_log, conduit_trace
+from aws_conduit.aws import s3
+
+PROGRESS_INTERVAL = 1.0
+LOG = conduit_log.logger(__name__)
+
+
+class TransferProgress(object):
+    """Aggregate progress of a batch of uploads."""
+
+    def __init__(self, total_bytes):
+        self.total_bytes = total_bytes
+        self.transferred = 0
+        self.started = time.time()
+        self._last_report = self.started
+        self._lock = threading.Lock()
+
+    def __call__(self, bytes_amount):
+        with self._lock:
+            self.transferred += bytes_amount
+            now = time.time()
+            if now - self._last_report >= PROGRESS_INTERVAL:
+                self._last_report = now
+                LOG.info(self.report())
+
+    def rate(self):
+        elapsed = max(time.time() - self.started, 1e-6)
+        return self.transferred / elapsed
+
+    def report(self):
+        percent = 100
+        if self.total_bytes:
+            percent = int(self.transferred * 100 / self.total_bytes)
+        return "Uploaded {:.1f} MB of {:.1f} MB ({}%) at {:.1f} MB/s".format(
+            self.transferred / s3.MEGABYTE, self.total_bytes / s3.MEGABYTE, percent, self.rate() / s3.MEGABYTE)
+
+
+def upload_task(path, upload):
+    """
+    Describe a single upload for run_uploads.
+
+    Args:
+        path (str): The local file being uploaded, used to size the batch.
+        upload (function): Performs the upload, accepting a callback keyword argument.
+    """
+    return dict(path=path, upload=upload)
+
+
+def run_uploads(tasks, max_workers=None):
+    """
+    Run a batch of uploads on a bounded thread pool, stopping at the first failure.
+
+    Args:
+        tasks (list): Uploads created by upload_task.
+        max_workers (int): (Optional) The number of concurrent uploads.
+
+    Return:
+        list: The result of each upload, in the order of tasks.
+    """
+    if not tasks:
+        return []
+    if max_workers is None:
+        max_workers = s3.UPLOAD_WORKERS
+    total_bytes = sum(os.path.getsize(task['path']) for task in tasks if os.path.isfile(task['path']))
+    progress = TransferProgress(total_bytes)
+    executor = futures.ThreadPoolExecutor(max_workers=min(max_workers, len(tasks)))
+    try:
+        pending = [executor.submit(conduit_trace.inherit(task['upload']), callback=progress) for task in tasks]
+        done, not_done = futures.wait(pending, return_when=futures.FIRST_EXCEPTION)
+        for future in not_done:
+            future.cancel()
+        for future in pending:
+            if future in done and future.exception() is not None:
+                raise future.exception()
+    finally:
+        executor.shutdown(wait=True)
+    elapsed = time.time() - progress.started
+    LOG.info("Uploaded %s artifacts, %.1f MB in %.1fs (%.1f MB/s)",
+             len(tasks), progress.transferred / s3.MEGABYTE, elapsed, progress.rate() / s3.MEGABYTE)
+    return [future.result() for future in pending]
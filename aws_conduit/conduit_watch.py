@@ -0,0 +1,155 @@
+"""Watching the files of a conduitspec inventory for changes."""
+import glob
+import os
+import threading
+
+from aws_conduit import conduit_log, helper
+
+SPEC_PATH = 'conduitspec.yaml'
+POLL_INTERVAL = float(os.environ.get('CONDUIT_WATCH_INTERVAL', 0.5))
+DEBOUNCE = float(os.environ.get('CONDUIT_WATCH_DEBOUNCE', 1.0))
+LOG = conduit_log.logger(__name__)
+
+
+def watched_paths(product_spec):
+    """
+    Get the files which a product is released from.
+
+    These are its artifact, associated resources and nested stacks, plus any
+    files matching the glob patterns listed under watch, such as the sources
+    that its build steps package.
+
+    Args:
+        product_spec (dict): The product's entry in the conduitspec inventory.
+
+    Return:
+        set: The paths to watch.
+    """
+    return _release_paths(product_spec) | _source_paths(product_spec)
+
+
+def build_outputs(product_spec):
+    """
+    Get the watched files which a product's build steps may write.
+
+    These are the files a product with build steps is released from, other
+    than those its watch patterns match, which are taken to be sources.
+
+    Args:
+        product_spec (dict): The product's entry in the conduitspec inventory.
+
+    Return:
+        set: The paths its build may write.
+    """
+    if not product_spec.get('build'):
+        return set()
+    return _release_paths(product_spec) - _source_paths(product_spec)
+
+
+def snapshot(paths):
+    state = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            state[path] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            state[path] = None
+    return state
+
+
+def changed_paths(before, after):
+    return set(path for path in set(before) | set(after) if before.get(path) != after.get(path))
+
+
+def affected(product_specs, changed):
+    return [product_spec for product_spec in product_specs if watched_paths(product_spec) & changed]
+
+
+def watch(load, rebuild, interval=None, debounce=None, stop=None):
+    """
+    Rebuild products whenever the files they are released from change.
+
+    Files are polled, and a burst of changes is left to settle for the debounce
+    period before the affected products are rebuilt. A change to
+    conduitspec.yaml reloads the inventory and rebuilds every product in it.
+    Files are compared against how they were when the rebuild started, so a
+    change made while a rebuild runs is picked up by the next one, except to
+    the build outputs of the products rebuilt, which are taken as the rebuild
+    left them. A failed rebuild is reported and watching carries on.
+
+    Args:
+        load (function): Returns the product specs to watch.
+        rebuild (function): Called with the product specs to rebuild.
+        interval (float): (Optional) Seconds between polls.
+        debounce (float): (Optional) Seconds without changes before rebuilding.
+        stop (Event): (Optional) Set to stop watching.
+    """
+    interval = POLL_INTERVAL if interval is None else interval
+    debounce = DEBOUNCE if debounce is None else debounce
+    stop = stop or threading.Event()
+    product_specs = load()
+    before = _snapshot(product_specs)
+    LOG.info("Watching %s files for changes...", len(before))
+    while not stop.wait(interval):
+        after = _snapshot(product_specs)
+        if after == before:
+            continue
+        while not stop.wait(debounce):
+            settled = _snapshot(product_specs)
+            if settled == after:
+                break
+            after = settled
+        changed = changed_paths(before, after)
+        if SPEC_PATH in changed:
+            product_specs = load()
+            targets = product_specs
+        else:
+            targets = affected(product_specs, changed)
+        before = _settled(product_specs, after)
+        if targets and not stop.is_set():
+            _rebuild(rebuild, targets, changed)
+            before = _rebuilt(product_specs, before, targets)
+
+
+def _release_paths(product_spec):
+    resources = [product_spec['artifact']] + product_spec.get('associatedResources', []) + product_spec.get('nestedStacks', [])
+    return set(helper.resource_paths(resource)[0] for resource in resources)
+
+
+def _source_paths(product_spec):
+    paths = set()
+    for pattern in product_spec.get('watch', []):
+        paths.update(glob.glob(pattern, recursive=True))
+    return paths
+
+
+def _snapshot(product_specs):
+    paths = set([SPEC_PATH])
+    for product_spec in product_specs:
+        paths.update(watched_paths(product_spec))
+    return snapshot(paths)
+
+
+def _settled(product_specs, after):
+    # What is rebuilt is what had settled, even for files that have changed since.
+    # Files only watched since the inventory was reloaded start from how they are now.
+    return dict((path, after.get(path, state)) for path, state in _snapshot(product_specs).items())
+
+
+def _rebuilt(product_specs, before, targets):
+    # What the build steps wrote must not trigger another rebuild, or watching would never settle.
+    outputs = set()
+    for product_spec in targets:
+        outputs.update(build_outputs(product_spec))
+    now = _snapshot(product_specs)
+    return dict((path, now.get(path, state) if path in outputs else state) for path, state in before.items())
+
+
+def _rebuild(rebuild, targets, changed):
+    LOG.info("Changed: %s", ', '.join(sorted(changed)))
+    LOG.info("Rebuilding: %s", ', '.join(product_spec['product'] for product_spec in targets))
+    try:
+        rebuild(targets)
+    except Exception as e:
+        LOG.error("Rebuild failed: %s", e)
+    LOG.info("Watching for changes...")
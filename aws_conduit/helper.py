@@ -1,14 +1,24 @@
+import hashlib
+import json
+import os
+import threading
+
 import boto3
 
 import semver
 from aws_conduit import conduit_factory as factory
+from aws_conduit import conduit_log, conduit_plan, conduit_trace
 from aws_conduit.conduit_portfolio import ConduitPortfolio
+from aws_conduit.conduit_s3 import MANIFEST_LOCK, MANIFESTS, file_digest
+from aws_conduit.conduit_template import TemplateRenderer
 
 SESSION = boto3.session.Session()
 IAM = boto3.client('iam')
 STS = boto3.client('sts')
 
 CONFIG_PREFIX = 'conduit.yaml'
+ACCOUNT_ID_ENV = 'CONDUIT_ACCOUNT_ID'
+LOG = conduit_log.logger(__name__)
 
 RESOURCES_KEY = "__resources__"
 BUCKET_KEY = "__bucket__"
@@ -18,6 +28,15 @@ RESOURCES_KEY_OTHER = "__|resources|__"
 BUCKET_KEY_OTHER = "__|bucket|__"
 PREFIX_KEY_OTHER = "__|prefix|__"
 
+SLS_STAGE_KEY = "${STAGE}"
+SLS_DIRECTORY_KEY = ".serverless"
+
+TEMPLATE_EXTENSIONS = ('yaml', 'yml', 'json')
+
+IDENTITY = {}
+CONFIGURATION = {}
+CONFIG_LOCK = threading.RLock()
+
 
 def get_region():
     region = SESSION.region_name
@@ -25,8 +44,9 @@ def get_region():
 
 
 def get_account_id():
-    account_id = STS.get_caller_identity().get('Account')
-    return account_id
+    if 'account_id' not in IDENTITY:
+        IDENTITY['account_id'] = os.environ.get(ACCOUNT_ID_ENV) or STS.get_caller_identity().get('Account')
+    return IDENTITY['account_id']
 
 
 def get_alias():
@@ -36,9 +56,12 @@ def get_alias():
     Return:
         alias: The first known account alias.
     """
-    aliases = IAM.list_account_aliases()
-    if aliases and aliases['AccountAliases']:
-        return aliases['AccountAliases'][0]
+    if 'alias' not in IDENTITY:
+        aliases = IAM.list_account_aliases()
+        IDENTITY['alias'] = None
+        if aliases and aliases['AccountAliases']:
+            IDENTITY['alias'] = aliases['AccountAliases'][0]
+    return IDENTITY['alias']
 
 
 def get_portfolio(config, name=None, portfolio_id=None):
@@ -54,6 +77,8 @@ def get_portfolio(config, name=None, portfolio_id=None):
 
 def get_product(config, name=None, product_id=None):
     for portfolio in config['portfolios']:
+        if not isinstance(portfolio, ConduitPortfolio):
+            continue
         for product in portfolio.products:
             if product_id is not None:
                 if product.product_id == product_id:
@@ -64,23 +89,60 @@ def get_product(config, name=None, product_id=None):
     raise ValueError('Product not found: {} {}'.format(product_id, name))
 
 
-ACCOUNT_ID = get_account_id()
-
-
 def inject_config(function):
+    """
+    Pass the Conduit configuration to a function and save it afterwards.
 
-    start = factory.start()
-    bucket = start.create_s3()
-    configuration = bucket.get_config(CONFIG_PREFIX)
+    The configuration is downloaded on first use and shared by every decorated
+    function for the rest of the process. Changes made by concurrent builds
+    should hold CONFIG_LOCK. The cached configuration is dropped when the
+    function fails, or under --plan, since its changes are not saved then.
+    """
 
     def wrapper(*args, **kwargs):
-        result = function(*args, **kwargs, config=configuration)
-        bucket.put_config(configuration, CONFIG_PREFIX)
+        with conduit_trace.phase('config'):
+            bucket = factory.config_bucket()
+            with CONFIG_LOCK:
+                if 'config' not in CONFIGURATION:
+                    CONFIGURATION['config'] = bucket.get_config(CONFIG_PREFIX)
+                configuration = CONFIGURATION['config']
+        try:
+            result = function(*args, **kwargs, config=configuration)
+        except BaseException:
+            _forget_config(configuration)
+            raise
+        with conduit_trace.phase('config'), CONFIG_LOCK:
+            bucket.put_config(configuration, CONFIG_PREFIX)
+            if conduit_plan.active() is not None:
+                _forget_config(configuration)
         return result
 
     return wrapper
 
 
+def _forget_config(configuration):
+    # Unsaved changes must not outlive the command in a long lived process' cache.
+    with CONFIG_LOCK:
+        if CONFIGURATION.get('config') is configuration:
+            del CONFIGURATION['config']
+
+
+def refresh_config():
+    """
+    Forget the cached Conduit configuration if it has been changed by another process.
+
+    Long lived processes call this before each command, so that a command
+    never saves over changes it has not seen. The cached content manifests
+    are forgotten too.
+    """
+    with CONFIG_LOCK:
+        if 'config' in CONFIGURATION and factory.config_bucket().config_changed(CONFIG_PREFIX):
+            LOG.info("Configuration has changed, reloading...")
+            CONFIGURATION.clear()
+    with MANIFEST_LOCK:
+        MANIFESTS.clear()
+
+
 def find_build_product(spec, config):
     portfolio = None
     product = None
@@ -123,8 +185,22 @@ def get_all_portfolio_artifacts(portfolio_name, config):
     return templates
 
 
+def get_portfolio_release_folders(portfolio_name, config):
+    folders = {}
+    for port in config['portfolios']:
+        if isinstance(port, ConduitPortfolio):
+            if port.name == portfolio_name:
+                for product in port.products:
+                    folders[product.name] = "{}/{}/{}".format(port.name, product.name, product.version)
+        else:
+            if port['name'] == portfolio_name:
+                for product in port['products']:
+                    folders[product['name']] = "{}/{}/{}/{}".format(port['name'], product['name'], 'core', product['currentVersion'])
+    return folders
+
+
 def find_s3_build_product(spec, config):
-    print(spec)
+    LOG.debug("Finding %s", spec)
     default_product = dict(
         name=spec['product'],
         currentVersion='0.0.0'
@@ -147,17 +223,17 @@ def find_s3_build_product(spec, config):
 def next_version(release_type, current_version):
     product_version = current_version
     if release_type == 'build':
-        product_version = semver.bump_build(current_version)
+        product_version = str(semver.VersionInfo.parse(current_version).bump_build())
     if release_type == 'major':
-        product_version = semver.bump_major(current_version)
+        product_version = str(semver.VersionInfo.parse(current_version).bump_major())
     if release_type == 'minor':
-        product_version = semver.bump_minor(current_version)
+        product_version = str(semver.VersionInfo.parse(current_version).bump_minor())
     if release_type == 'patch':
-        product_version = semver.bump_patch(current_version)
+        product_version = str(semver.VersionInfo.parse(current_version).bump_patch())
     return product_version
 
 
-def put_resource(source_path, destination_path, bucket, portfolio, product, version, environment='core'):
+def put_resource(source_path, destination_path, bucket, portfolio, product, version, environment='core', callback=None):
     if environment is not None:
         if destination_path is not None:
             key = "{}/{}/{}/{}/{}".format(portfolio, product, environment, version, destination_path)
@@ -176,85 +252,95 @@ def put_resource(source_path, destination_path, bucket, portfolio, product, vers
             key = "{}/{}/{}".format(portfolio, product, version)
             prefix = "{}/{}/{}".format(portfolio, product, version)
             directory = "{}/{}/{}/{}".format(bucket.name, portfolio, product, version)
-    print("Adding resource to release: {}".format(source_path))
-    print("Key is: {}".format(key))
-    replace_resources(directory, bucket, prefix, path=source_path)
-    bucket.put_resource(source_path, key)
-    revert_resources(directory, bucket, prefix, path=source_path)
-    return "https://s3-{}.amazonaws.com/{}/{}".format(get_region(), directory, destination_path)
+    LOG.debug("Adding resource to release: %s as %s", source_path, key)
+    if is_template(source_path):
+        data = replace_resources(directory, bucket, prefix, read_template(source_path))
+        bucket.put_content(data.encode('utf-8'), key, callback=callback)
+    else:
+        bucket.put_resource(source_path, key, callback=callback)
+    return "https://s3-{}.amazonaws.com/{}/{}".format(bucket.region, directory, destination_path)
 
 
-def read_write(function):
+def resource_paths(resource):
+    """
+    Get the source and destination paths of an inventory resource.
 
-    def wrapper(*args, **kwargs):
-        if 'path' in kwargs:
-            if isinstance(kwargs['path'], str):
-                path = kwargs['path']
-            else:
-                path = kwargs['path']['source']
-            if path.endswith('yaml') or path.endswith('yml') or path.endswith('json'):
-                f = open(path, 'r', encoding='utf-8')
-                filedata = f.read()
-                f.close()
-                newdata = function(*args, **kwargs, file_data=filedata)
-                if newdata is not None:
-                    f = open(path, 'w', encoding='utf-8')
-                    f.write(newdata)
-                    f.close()
-    return wrapper
+    Args:
+        resource: Either a path, or a dict with source and destination paths.
+    """
+    if isinstance(resource, str):
+        return resource, resource
+    return resource['source'], resource['destination']
+
+
+def product_fingerprint(product_spec, digests=None):
+    """
+    Fingerprint the inputs of a product release.
+
+    Covers the product's conduitspec entry, including its build steps, and the
+    content of its artifact, associated resources and nested stacks.
+
+    Args:
+        product_spec (dict): The product's entry in the conduitspec inventory.
+        digests (dict): (Optional) Known sha256 digests of files, by path.
+    """
+    digests = digests or {}
+    digest = hashlib.sha256()
+    digest.update(json.dumps(product_spec, sort_keys=True, default=str).encode('utf-8'))
+    resources = [product_spec['artifact']] + product_spec.get('associatedResources', []) + product_spec.get('nestedStacks', [])
+    for resource in resources:
+        source_path = resource_paths(resource)[0]
+        digest.update(source_path.encode('utf-8'))
+        digest.update((digests.get(os.path.normpath(source_path)) or file_digest(source_path)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def is_template(path):
+    return path.endswith(TEMPLATE_EXTENSIONS)
+
+
+def read_template(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
 
 
-@read_write
-def replace_resources(directory, bucket, prefix, path=None, file_data=None):
-    if file_data is not None:
-        print("Replacing in {}".format(path))
-        data = file_data.replace(RESOURCES_KEY, directory)
-        data = data.replace(BUCKET_KEY, bucket.name)
-        data = data.replace(PREFIX_KEY, prefix)
-        data = data.replace(RESOURCES_KEY_OTHER, RESOURCES_KEY)
-        data = data.replace(BUCKET_KEY_OTHER, BUCKET_KEY)
-        data = data.replace(PREFIX_KEY_OTHER, PREFIX_KEY)
-        return data
-
-
-@read_write
-def revert_resources(directory, bucket, prefix, path=None, file_data=None):
-    if file_data is not None:
-        print("Replacing in {}".format(path))
-        data = file_data.replace(BUCKET_KEY, BUCKET_KEY_OTHER)
-        data = data.replace(PREFIX_KEY, PREFIX_KEY_OTHER)
-        data = data.replace(RESOURCES_KEY, RESOURCES_KEY_OTHER)
-        data = data.replace(directory, RESOURCES_KEY)
-        data = data.replace(bucket.name,BUCKET_KEY)
-        data = data.replace(prefix, PREFIX_KEY)
-        return data
-
-
-def put_sls_resource(path, bucket, portfolio, product, version, sls_package, environment='core'):
+def resource_replacements(directory, bucket, prefix):
+    return {
+        RESOURCES_KEY: directory,
+        BUCKET_KEY: bucket.name,
+        PREFIX_KEY: prefix,
+        RESOURCES_KEY_OTHER: RESOURCES_KEY,
+        BUCKET_KEY_OTHER: BUCKET_KEY,
+        PREFIX_KEY_OTHER: PREFIX_KEY
+    }
+
+
+def replace_resources(directory, bucket, prefix, file_data):
+    renderer = TemplateRenderer(resource_replacements(directory, bucket, prefix))
+    return renderer.render(file_data)
+
+
+def put_sls_resource(path, bucket, portfolio, product, version, sls_package, environment='core', callback=None, digest=None):
     new_path = path
     if '.serverless' in new_path:
         new_path = new_path.replace('.serverless/', '')
     directory = "{}/{}/{}/{}".format(portfolio, product, environment, version)
     key = "{}/{}/{}/{}/{}".format(portfolio, product, environment, version, new_path)
-    replace_resources(directory, bucket, directory, path=path)
-    replace_sls_resources(directory, bucket.name, sls_package, environment, path=path)
-    print("Adding sls resource to release: {}".format(path))
-    bucket.put_resource(path, key)
-    revert_sls_resources(directory, bucket.name, sls_package, environment, path=path)
-    return "https://s3-{}.amazonaws.com/{}/{}/{}".format(get_region(), bucket.name, directory, new_path)
-
-
-@read_write
-def replace_sls_resources(key, bucket, sls_package, environment, path=None, file_data=None):
-    if file_data is not None:
-        print("333 444 Replacing in {}".format(path))
-        print("The key is: {}".format(key))
-        return file_data.replace(sls_package['artifactDirectoryName'], key).replace(sls_package['bucket'], bucket).replace('${STAGE}', environment).replace('.serverless', key)
-
-
-@read_write
-def revert_sls_resources(key, bucket, sls_package, environment, path=None, file_data=None):
-    if file_data is not None:
-        print("Reverting in {}".format(path))
-        print("The key is: {}".format(key))
-        return file_data.replace(key, sls_package['artifactDirectoryName']).replace(bucket, sls_package['bucket']).replace(environment, '${STAGE}')
+    LOG.debug("Adding sls resource to release: %s", path)
+    if is_template(path):
+        data = replace_sls_resources(directory, bucket, sls_package, environment, read_template(path))
+        bucket.put_content(data.encode('utf-8'), key, callback=callback)
+    else:
+        bucket.put_resource(path, key, callback=callback, digest=digest)
+    return "https://s3-{}.amazonaws.com/{}/{}/{}".format(bucket.region, bucket.name, directory, new_path)
+
+
+def replace_sls_resources(directory, bucket, sls_package, environment, file_data):
+    replacements = resource_replacements(directory, bucket, directory)
+    replacements.update({
+        sls_package['artifactDirectoryName']: directory,
+        sls_package['bucket']: bucket.name,
+        SLS_STAGE_KEY: environment,
+        SLS_DIRECTORY_KEY: directory
+    })
+    return TemplateRenderer(replacements).render(file_data)
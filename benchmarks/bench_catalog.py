@@ -0,0 +1,349 @@
+"""
+Benchmark Conduit commands against synthetic catalogs, offline.
+
+Each catalog has one product per portfolio. Service Catalog, IAM and STS
+calls are answered by an in-memory catalog and artifacts are kept in local
+storage, both with a configurable latency per call. Every command starts
+cold, like a new conduit process, and is timed with its calls counted.
+sync and list run over the whole catalog; build, provision, delete and
+package run for a sample of its products. A command making more calls than
+the budget is stopped, so that quadratic behaviour shows up without taking
+hours. Results can be saved as json and compared with a baseline.
+
+    python benchmarks/bench_catalog.py [--latency MS] [--sample N] [--budget CALLS]
+                                       [--json PATH] [--baseline PATH] [size ...]
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-southeast-2')
+os.environ.setdefault('CONDUIT_ACCOUNT_ID', '123456789012')
+# Run against the checkout this script is in, whether or not aws_conduit is installed.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aws_conduit import conduit, conduit_s3, conduit_storage, helper  # noqa: E402
+from aws_conduit import conduit_factory as factory  # noqa: E402
+from aws_conduit.aws import events  # noqa: E402
+from aws_conduit.conduit_portfolio import ConduitPortfolio  # noqa: E402
+from aws_conduit.conduit_product import ConduitProduct  # noqa: E402
+from botocore.awsrequest import AWSResponse  # noqa: E402
+
+UNIQUE_ID = 'conduit-bench'
+ROW_FORMAT = "{:<8}{:<18}{:>8}{:>12}{:>12}{:>12}{:>12}"
+TEMPLATE = "AWSTemplateFormatVersion: '2010-09-09'\nResources: {}\n"
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class FakeCatalog(object):
+    """
+    Answers the Service Catalog, IAM and STS calls made by Conduit from memory.
+
+    Args:
+        size (int): The number of portfolios, each with one product.
+        latency (float): Seconds to wait on every call, including storage calls.
+        budget (int): The number of calls after which a command is stopped.
+    """
+
+    def __init__(self, size, latency=0.0, budget=None):
+        self.latency = latency
+        self.budget = budget
+        self.calls = {}
+        self._lock = threading.Lock()
+        self.portfolios = []
+        self.products = {}
+        self.provisioned = []
+        for index in range(size):
+            portfolio_id = 'port-{:06d}'.format(index)
+            product_id = 'prod-{:06d}'.format(index)
+            self.portfolios.append(dict(Id=portfolio_id, DisplayName='portfolio-{}'.format(index),
+                                        Description='Synthetic portfolio', ProviderName='bench'))
+            self.products[product_id] = dict(Name='product-{}'.format(index), portfolios=set([portfolio_id]),
+                                             versions=[dict(Id='pa-{:06d}-0'.format(index), Name='0.0.0')])
+            self.provisioned.append(dict(Id='pp-{:06d}'.format(index), Name='stack-{}'.format(index), ProductId=product_id,
+                                         ProvisioningArtifactId='pa-{:06d}-0'.format(index)))
+        self.handlers = {
+            'AssociatePrincipalWithPortfolio': lambda params: {},
+            'AssumeRole': lambda params: dict(Credentials=dict(AccessKeyId='bench', SecretAccessKey='bench', SessionToken='bench')),
+            'CreateConstraint': lambda params: {},
+            'CreateProvisioningArtifact': self.create_provisioning_artifact,
+            'DeletePortfolio': self.delete_portfolio,
+            'DeleteProvisioningArtifact': self.delete_provisioning_artifact,
+            'DescribeProductAsAdmin': lambda params: dict(ProductViewDetail=dict(ProductViewSummary=self._summary(params['Id']))),
+            'DescribeProvisioningParameters': lambda params: dict(ProvisioningArtifactParameters=[dict(ParameterKey='ConduitStackKey')]),
+            'DisassociateProductFromPortfolio': self.disassociate_product,
+            'GetCallerIdentity': lambda params: dict(Account=helper.get_account_id()),
+            'ListAccountAliases': lambda params: dict(AccountAliases=['bench']),
+            'ListConstraintsForPortfolio': lambda params: dict(ConstraintDetails=[]),
+            'ListLaunchPaths': lambda params: dict(LaunchPathSummaries=[dict(Id='lp-bench')]),
+            'ListPortfolios': lambda params: _page(self.portfolios, 'PortfolioDetails', params),
+            'ListPortfoliosForProduct': self.list_portfolios_for_product,
+            'ListProvisioningArtifacts': lambda params: dict(ProvisioningArtifactDetails=list(self.products[params['ProductId']]['versions'])),
+            'ProvisionProduct': self.provision_product,
+            'ScanProvisionedProducts': lambda params: _page(self.provisioned, 'ProvisionedProducts', params),
+            'SearchProductsAsAdmin': self.search_products,
+        }
+
+    def __enter__(self):
+        events.register('before-parameter-build', self.before_parameter_build, UNIQUE_ID)
+        events.register('before-call', self.before_call, UNIQUE_ID)
+        return self
+
+    def __exit__(self, *args):
+        events.unregister('before-parameter-build', UNIQUE_ID)
+        events.unregister('before-call', UNIQUE_ID)
+
+    def before_parameter_build(self, params, context=None, **kwargs):
+        if context is not None:
+            context['conduit_bench_params'] = dict(params)
+
+    def before_call(self, model, context=None, **kwargs):
+        self.count(model.service_model.service_name, model.name)
+        params = context.get('conduit_bench_params', {}) if context is not None else {}
+        handler = self.handlers.get(model.name, lambda params: {})
+        return AWSResponse(None, 200, {}, None), handler(params)
+
+    def count(self, service, operation):
+        with self._lock:
+            key = '{}.{}'.format(service, operation)
+            self.calls[key] = self.calls.get(key, 0) + 1
+            total = sum(self.calls.values())
+        if self.budget is not None and total > self.budget:
+            raise BudgetExceeded("More than {} calls".format(self.budget))
+        if self.latency:
+            time.sleep(self.latency)
+
+    def total(self):
+        return sum(self.calls.values())
+
+    def create_provisioning_artifact(self, params):
+        versions = self.products[params['ProductId']]['versions']
+        version = dict(Id='{}-{}'.format(params['ProductId'].replace('prod', 'pa'), len(versions)), Name=params['Parameters']['Name'])
+        versions.append(version)
+        return dict(ProvisioningArtifactDetail=version)
+
+    def delete_provisioning_artifact(self, params):
+        versions = self.products[params['ProductId']]['versions']
+        versions[:] = [version for version in versions if version['Id'] != params['ProvisioningArtifactId']]
+        return {}
+
+    def delete_portfolio(self, params):
+        self.portfolios = [portfolio for portfolio in self.portfolios if portfolio['Id'] != params['Id']]
+        return {}
+
+    def disassociate_product(self, params):
+        self.products[params['ProductId']]['portfolios'].discard(params['PortfolioId'])
+        return {}
+
+    def list_portfolios_for_product(self, params):
+        portfolios = self.products[params['ProductId']]['portfolios']
+        return _page([portfolio for portfolio in self.portfolios if portfolio['Id'] in portfolios], 'PortfolioDetails', params)
+
+    def provision_product(self, params):
+        self.provisioned.append(dict(Id='pp-{}'.format(len(self.provisioned)), Name=params['ProvisionedProductName'],
+                                     ProductId=params['ProductId'], ProvisioningArtifactId=params['ProvisioningArtifactId']))
+        return dict(RecordDetail=dict(RecordId='rec-{}'.format(len(self.provisioned))))
+
+    def search_products(self, params):
+        terms = params.get('Filters', {}).get('FullTextSearch', [])
+        product_ids = sorted(product_id for product_id, product in self.products.items()
+                             if not terms or product['Name'] in terms)
+        details = [dict(ProductViewSummary=self._summary(product_id)) for product_id in product_ids]
+        return _page(details, 'ProductViewDetails', params)
+
+    def _summary(self, product_id):
+        return dict(Id=product_id, ProductId=product_id, Name=self.products[product_id]['Name'], ShortDescription='Synthetic product')
+
+
+class CountingStorage(object):
+    """Counts the calls made to a storage backend, waiting the catalog's latency on each."""
+
+    def __init__(self, backend, catalog):
+        self.backend = backend
+        self.catalog = catalog
+
+    def __getattr__(self, name):
+        method = getattr(self.backend, name)
+
+        def call(*args, **kwargs):
+            self.catalog.count('storage', name)
+            return method(*args, **kwargs)
+
+        return call
+
+
+def seed(size, catalog, workdir):
+    """Start a command cold, with the Conduit configuration describing a synthetic catalog."""
+    for cache in (helper.CONFIGURATION, helper.IDENTITY, factory.BUCKETS, factory.PRODUCTS,
+                  conduit_s3.MANIFESTS, conduit_s3.EXISTING_BUCKETS, conduit_s3.CONFIG_CHECKSUMS):
+        cache.clear()
+    conduit_storage.BACKENDS['storage'] = CountingStorage(conduit_storage.LocalStorage(os.path.join(workdir, 'storage')), catalog)
+    with quiet():
+        bucket = factory.config_bucket()
+    portfolios = []
+    for index, portfolio in enumerate(catalog.portfolios):
+        name = 'product-{}'.format(index)
+        product = ConduitProduct(name=name, owner='bench', bucket=bucket, cfn_type='yaml', portfolio=portfolio['DisplayName'],
+                                 template='{}/{}/{}/0.0.0/{}.yaml'.format(bucket.get_url(), portfolio['DisplayName'], name, name),
+                                 product_id='prod-{:06d}'.format(index))
+        portfolios.append(ConduitPortfolio(name=portfolio['DisplayName'], provider='bench', portfolio_id=portfolio['Id'],
+                                           products=[product]))
+    with quiet():
+        bucket.put_config(dict(portfolios=portfolios), helper.CONFIG_PREFIX)
+    for cache in (helper.IDENTITY, factory.BUCKETS, conduit_s3.EXISTING_BUCKETS):
+        cache.clear()
+    catalog.calls.clear()
+
+
+def sample(size, count):
+    """Spread a sample of catalog indexes over the whole catalog."""
+    count = min(size, count)
+    return sorted(set(index * size // count for index in range(count)))
+
+
+def run_sync(indexes, workdir):
+    conduit.sync()
+
+
+def run_list(indexes, workdir):
+    conduit.list_portfolios()
+    conduit.list_products()
+
+
+def run_build(indexes, workdir):
+    inventory = []
+    for index in indexes:
+        artifact = 'product-{}.yaml'.format(index)
+        with open(os.path.join(workdir, artifact), 'w') as f:
+            f.write(TEMPLATE)
+        inventory.append(dict(portfolio='portfolio-{}'.format(index), product='product-{}'.format(index),
+                              artifact=artifact, serviceCatalog=True))
+    with open(os.path.join(workdir, 'conduitspec.yaml'), 'w') as f:
+        json.dump(dict(inventory=inventory), f)
+    conduit.build('build', None, force=True)
+
+
+def run_provision(indexes, workdir):
+    for index in indexes:
+        conduit.provision_product('prod-{:06d}'.format(index), 'bench-{}'.format(index))
+
+
+def run_delete_portfolio(indexes, workdir):
+    for index in indexes:
+        conduit.delete_portfolio('port-{:06d}'.format(index))
+
+
+def run_package(indexes, workdir):
+    for index in indexes:
+        conduit.package_portfolio('portfolio-{}'.format(index), 'core')
+
+
+COMMANDS = dict(sync=run_sync, list=run_list, build=run_build, provision=run_provision,
+                delete_portfolio=run_delete_portfolio, package=run_package)
+COMMAND_ORDER = ('sync', 'list', 'build', 'provision', 'delete_portfolio', 'package')
+CATALOG_COMMANDS = ('sync', 'list')
+
+
+def bench(size, command, latency, sample_size, budget):
+    """
+    Time a command against a new synthetic catalog.
+
+    Return:
+        dict: The size, command, items, seconds, calls, calls per item, whether
+              the command ran over budget and its calls by service and operation.
+    """
+    workdir = tempfile.mkdtemp(prefix='conduit-bench-')
+    cwd = os.getcwd()
+    catalog = FakeCatalog(size, latency=latency)
+    indexes = sample(size, sample_size)
+    items = size if command in CATALOG_COMMANDS else len(indexes)
+    over_budget = False
+    try:
+        os.chdir(workdir)
+        with catalog:
+            seed(size, catalog, workdir)
+            catalog.budget = budget
+            started = time.time()
+            try:
+                with quiet():
+                    COMMANDS[command](indexes, workdir)
+            except BudgetExceeded:
+                over_budget = True
+            seconds = time.time() - started
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    calls = catalog.total()
+    return dict(size=size, command=command, items=items, seconds=seconds, calls=calls, budget=budget,
+                calls_per_item=calls / float(items), over_budget=over_budget, by_call=dict(catalog.calls))
+
+
+def _page(items, key, params):
+    start = int(params.get('PageToken') or 0)
+    end = start + (params.get('PageSize') or 20)
+    page = {key: items[start:end]}
+    if end < len(items):
+        page['NextPageToken'] = str(end)
+    return page
+
+
+@contextlib.contextmanager
+def quiet():
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def report(rows, baseline=None):
+    previous = dict(((row['size'], row['command']), row) for row in baseline or [])
+    print(ROW_FORMAT.format("Size", "Command", "Items", "Seconds", "Calls", "Calls/item", "vs baseline"))
+    print("----------" * 8)
+    for row in rows:
+        calls, per_item = str(row['calls']), "{:.1f}".format(row['calls_per_item'])
+        if row['over_budget']:
+            calls, per_item = '>{}'.format(row['budget']), ">{:.1f}".format(row['budget'] / float(row['items']))
+        change = ''
+        before = previous.get((row['size'], row['command']))
+        if before is not None and before['calls'] and not (row['over_budget'] or before['over_budget']):
+            change = '{:+.0%}'.format(row['calls'] / float(before['calls']) - 1)
+        print(ROW_FORMAT.format(row['size'], row['command'], row['items'], "{:.3f}".format(row['seconds']),
+                                calls, per_item, change))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmark Conduit commands against synthetic catalogs.")
+    parser.add_argument('sizes', nargs='*', type=int, default=[10, 1000, 10000], help="Numbers of portfolios and products.")
+    parser.add_argument('--latency', type=float, default=0.0, help="Milliseconds to wait on every call.")
+    parser.add_argument('--sample', type=int, default=10, help="Products to build, provision, delete and package.")
+    parser.add_argument('--budget', type=int, default=100000, help="Calls after which a command is stopped.")
+    parser.add_argument('--commands', default=','.join(COMMAND_ORDER), help="Comma separated commands to run.")
+    parser.add_argument('--json', help="Write the results to a json file.")
+    parser.add_argument('--baseline', help="Compare call counts with results written by --json.")
+    args = parser.parse_args(argv)
+
+    rows = []
+    for size in args.sizes:
+        for command in args.commands.split(','):
+            if command not in COMMANDS:
+                raise ValueError("Unknown command: {}".format(command))
+            rows.append(bench(size, command, args.latency / 1000.0, args.sample, args.budget))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    report(rows, baseline)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
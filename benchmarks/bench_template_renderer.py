@@ -0,0 +1,69 @@
+"""
+Benchmark placeholder substitution on multi-megabyte Cloudformation templates.
+
+Compares the single pass TemplateRenderer against chained str.replace calls.
+
+    python benchmarks/bench_template_renderer.py [size in MB ...]
+"""
+import sys
+import timeit
+
+from aws_conduit.conduit_template import TemplateRenderer
+
+RESOURCE_BLOCK = '''  NestedStack{index}:
+    Type: 'AWS::CloudFormation::Stack'
+    Properties:
+      TemplateURL: "https://s3.amazonaws.com/__resources__/stacks/nested-{index}.yml"
+      Parameters:
+        Bucket: "__bucket__"
+        Prefix: "__prefix__/lambdas/function-{index}.zip"
+        Escaped: "__|resources|__ and __|bucket|__"
+        Stage: "${{STAGE}}"
+        Code: ".serverless/function-{index}.zip"
+'''
+
+REPLACEMENTS = {
+    '__resources__': 'conduit-config-123456789012/portfolio/product/core/1.2.3',
+    '__bucket__': 'conduit-config-123456789012',
+    '__prefix__': 'portfolio/product/core/1.2.3',
+    '__|resources|__': '__resources__',
+    '__|bucket|__': '__bucket__',
+    '__|prefix|__': '__prefix__',
+    '${STAGE}': 'core',
+    '.serverless': 'portfolio/product/core/1.2.3',
+}
+
+
+def make_template(size_mb):
+    blocks = ["AWSTemplateFormatVersion: '2010-09-09'\nResources:\n"]
+    size = len(blocks[0])
+    index = 0
+    while size < size_mb * 1024 * 1024:
+        block = RESOURCE_BLOCK.format(index=index)
+        blocks.append(block)
+        size += len(block)
+        index += 1
+    return ''.join(blocks)
+
+
+def chained(text):
+    data = text
+    for token, value in REPLACEMENTS.items():
+        data = data.replace(token, value)
+    return data
+
+
+def main(sizes):
+    renderer = TemplateRenderer(REPLACEMENTS)
+    print("{:<10}{:>16}{:>16}{:>16}".format("Size", "chained (s)", "renderer (s)", "renderer MB/s"))
+    for size_mb in sizes:
+        text = make_template(size_mb)
+        repeat = 5
+        chained_time = min(timeit.repeat(lambda: chained(text), number=1, repeat=repeat))
+        renderer_time = min(timeit.repeat(lambda: renderer.render(text), number=1, repeat=repeat))
+        print("{:<10}{:>16.4f}{:>16.4f}{:>16.1f}".format(
+            '{} MB'.format(size_mb), chained_time, renderer_time, len(text) / renderer_time / (1024 * 1024)))
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1, 4, 16])
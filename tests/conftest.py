@@ -0,0 +1,35 @@
+import os
+
+# boto3 clients are created when aws_conduit is imported, which fails without a region.
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-southeast-2')
+
+import pytest  # noqa: E402
+
+from aws_conduit import conduit_s3, conduit_storage  # noqa: E402
+from aws_conduit.conduit_storage import LocalStorage  # noqa: E402
+
+BUCKET = 'conduit-config-123456789012'
+REGION = 'ap-southeast-2'
+
+
+@pytest.fixture
+def use_storage(monkeypatch):
+    """Install a storage backend for the test, with the Conduit bucket created and no manifests cached."""
+
+    def use(storage):
+        storage.create_bucket(BUCKET, REGION)
+        monkeypatch.setitem(conduit_storage.BACKENDS, 'storage', storage)
+        monkeypatch.setattr(conduit_s3, 'MANIFESTS', {})
+        return storage
+
+    return use
+
+
+@pytest.fixture
+def storage(tmpdir, use_storage):
+    return use_storage(LocalStorage(str(tmpdir.join('storage'))))
+
+
+@pytest.fixture
+def bucket(storage):
+    return conduit_s3.ConduitS3(BUCKET, REGION)
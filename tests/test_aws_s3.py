@@ -0,0 +1,172 @@
+import threading
+import time
+
+import pytest
+from botocore.exceptions import ClientError
+
+from aws_conduit.aws import s3
+from conftest import BUCKET
+
+
+class FakePaginator(object):
+
+    def __init__(self, client, operation):
+        self.client = client
+        self.operation = operation
+
+    def paginate(self, **params):
+        self.client.listings.append((self.operation, params))
+        for page in self.client.pages[self.operation]:
+            self.client.listed += len(page.get('Contents', page.get('Versions', [])))
+            yield page
+
+
+class FakeClient(object):
+
+    def __init__(self, pages, failing=()):
+        self.pages = pages
+        self.failing = set(failing)
+        self.listings = []
+        self.deletes = []
+        self.listed = 0
+        self.listed_at_first_delete = None
+        self._lock = threading.Lock()
+
+    def get_paginator(self, operation):
+        return FakePaginator(self, operation)
+
+    def delete_objects(self, Bucket, Delete):
+        with self._lock:
+            if self.listed_at_first_delete is None:
+                self.listed_at_first_delete = self.listed
+            self.deletes.append(Delete['Objects'])
+        errors = [dict(Key=item['Key'], Code='AccessDenied', Message='Access Denied') for item in Delete['Objects']
+                  if item['Key'] in self.failing]
+        return dict(Errors=errors) if errors else {}
+
+
+def _pages(count, per_page):
+    return [dict(Contents=[dict(Key='portfolio/product/core/1.0.0/{}-{}'.format(page, index)) for index in range(per_page)])
+            for page in range(count)]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def install(pages, failing=()):
+        client = FakeClient(pages, failing)
+        monkeypatch.setattr(s3, 'S3_CLIENT', client)
+        return client
+    return install
+
+
+def test_delete_folder_in_batches(client, monkeypatch):
+    monkeypatch.setattr(s3, 'DELETE_BATCH_SIZE', 10)
+    monkeypatch.setattr(s3, 'DELETE_WINDOW', 2)
+    fake = client(dict(list_objects_v2=_pages(20, 5)))
+    assert s3.delete_folder(BUCKET, 'portfolio/product/core/1.0.0') == 100
+    assert fake.listings == [('list_objects_v2', dict(Bucket=BUCKET, Prefix='portfolio/product/core/1.0.0/'))]
+    assert sorted(len(batch) for batch in fake.deletes) == [10] * 10
+    assert fake.listed_at_first_delete <= 10 * 3
+
+
+def test_delete_folder_with_versions(client):
+    fake = client(dict(list_object_versions=[dict(
+        Versions=[dict(Key='portfolio/product/core/1.0.0/template.yaml', VersionId='v1'),
+                  dict(Key='portfolio/product/core/1.0.0/template.yaml', VersionId='v2')],
+        DeleteMarkers=[dict(Key='portfolio/product/core/1.0.0/nested.yaml', VersionId='v3')])]))
+    assert s3.delete_folder(BUCKET, 'portfolio/product/core/1.0.0/', versions=True) == 3
+    assert fake.listings[0][0] == 'list_object_versions'
+    assert [item['VersionId'] for item in fake.deletes[0]] == ['v1', 'v2', 'v3']
+
+
+def test_delete_folder_raises_failed_keys(client, monkeypatch):
+    monkeypatch.setattr(s3, 'DELETE_BATCH_SIZE', 2)
+    fake = client(dict(list_objects_v2=_pages(1, 6)), failing=['portfolio/product/core/1.0.0/0-3'])
+    with pytest.raises(ValueError) as error:
+        s3.delete_folder(BUCKET, 'portfolio/product/core/1.0.0')
+    assert 'Failed to delete 1 objects' in str(error.value)
+    assert '0-3' in str(error.value)
+    assert len(fake.deletes) == 3
+
+
+def test_get_sub_folders(client):
+    fake = client(dict(list_objects_v2=[
+        dict(CommonPrefixes=[dict(Prefix='portfolio/product/core/1.0.1/'), dict(Prefix='portfolio/product/core/1.0.0/')]),
+        dict(CommonPrefixes=[dict(Prefix='portfolio/product/core/1.0.1/'), dict(Prefix='portfolio/product/core/0.9.0/')]),
+        dict(Contents=[dict(Key='portfolio/product/core/notes.txt')])
+    ]))
+    assert s3.get_sub_folders(BUCKET, 'portfolio/product/core') == [
+        'portfolio/product/core/0.9.0', 'portfolio/product/core/1.0.0', 'portfolio/product/core/1.0.1']
+    assert fake.listings == [('list_objects_v2', dict(Bucket=BUCKET, Prefix='portfolio/product/core/', Delimiter='/'))]
+
+
+class HeadClient(object):
+
+    def __init__(self, code=None):
+        self.code = code
+
+    def _head(self, operation):
+        if self.code is not None:
+            raise ClientError(dict(Error=dict(Code=self.code, Message=self.code)), operation)
+        return {}
+
+    def head_bucket(self, Bucket):
+        return self._head('HeadBucket')
+
+    def head_object(self, Bucket, Key):
+        return self._head('HeadObject')
+
+
+@pytest.mark.parametrize('code,exists', [(None, True), ('404', False), ('NoSuchBucket', False)])
+def test_bucket_exists(monkeypatch, code, exists):
+    monkeypatch.setattr(s3, 'S3_CLIENT', HeadClient(code))
+    assert s3.bucket_exists(BUCKET) is exists
+
+
+@pytest.mark.parametrize('code,exists', [(None, True), ('404', False), ('NoSuchKey', False)])
+def test_object_exists(monkeypatch, code, exists):
+    monkeypatch.setattr(s3, 'S3_CLIENT', HeadClient(code))
+    assert s3.object_exists(BUCKET, 'conduit.yaml') is exists
+
+
+def test_head_checks_raise_on_access_denied(monkeypatch):
+    monkeypatch.setattr(s3, 'S3_CLIENT', HeadClient('403'))
+    with pytest.raises(PermissionError):
+        s3.bucket_exists(BUCKET)
+    with pytest.raises(PermissionError):
+        s3.object_exists(BUCKET, 'conduit.yaml')
+    monkeypatch.setattr(s3, 'S3_CLIENT', HeadClient('500'))
+    with pytest.raises(ClientError):
+        s3.bucket_exists(BUCKET)
+
+
+def test_transfers_share_slots_across_threads(monkeypatch):
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    class FakeObject(object):
+
+        def upload_fileobj(self, *args, **kwargs):
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.pop()
+
+    class FakeResource(object):
+
+        def Object(self, name, prefix):
+            return FakeObject()
+
+    monkeypatch.setattr(s3, 'S3_RESOURCE', FakeResource())
+    monkeypatch.setattr(s3, 'TRANSFER_SLOTS', threading.BoundedSemaphore(2))
+    threads = [threading.Thread(target=s3.upload_content, args=(BUCKET, 'lambdas-{}.zip'.format(index), b'zip'))
+               for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert len(peak) == 8
+    assert max(peak) == 2
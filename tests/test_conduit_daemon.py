@@ -0,0 +1,98 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from aws_conduit import conduit_daemon
+
+
+@pytest.fixture
+def daemon(tmpdir):
+    path = str(tmpdir.join('conduit.sock'))
+    commands = []
+
+    def run(args):
+        commands.append((args, os.getcwd(), os.environ.get('GROOVY_BUILD')))
+        print("Ran {}".format(' '.join(args)))
+        if args[0] == 'fail':
+            raise ValueError('groovy failure')
+        return 0
+
+    server = threading.Thread(target=conduit_daemon.serve, args=(run, path))
+    server.start()
+    for _ in range(100):
+        if conduit_daemon.status(path):
+            break
+        time.sleep(0.05)
+    yield path, commands
+    conduit_daemon.stop(path)
+    server.join(5)
+
+
+def test_forward_runs_command_in_daemon(daemon, tmpdir, monkeypatch, capsys):
+    path, commands = daemon
+    monkeypatch.chdir(str(tmpdir))
+    monkeypatch.setenv('GROOVY_BUILD', '42')
+    assert conduit_daemon.forward(['build', 'patch'], path=path) == 0
+    assert commands == [(['build', 'patch'], str(tmpdir), '42')]
+    assert 'Ran build patch' in capsys.readouterr().out
+    assert os.environ.get('GROOVY_BUILD') == '42'
+
+
+def test_forward_reports_failures(daemon, capsys):
+    path, _ = daemon
+    assert conduit_daemon.forward(['fail'], path=path) == 1
+    assert 'groovy failure' in capsys.readouterr().err
+
+
+def test_forward_refuses_other_credentials(daemon, monkeypatch):
+    path, commands = daemon
+    monkeypatch.setenv('AWS_PROFILE', 'someone-else')
+    assert conduit_daemon.forward(['build'], path=path) is None
+    assert commands == []
+
+
+def test_forward_only_sends_a_fingerprint_of_credentials(monkeypatch):
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'groovy-secret')
+    monkeypatch.setenv('GROOVY_BUILD', '42')
+    request = conduit_daemon.command_request(['build'])
+    assert 'groovy-secret' not in str(request)
+    assert request['environment']['GROOVY_BUILD'] == '42'
+    assert request['key'] == conduit_daemon.environment_key(os.environ)
+
+
+def test_forward_refuses_sockets_of_other_users(daemon, monkeypatch):
+    path, commands = daemon
+    other_user = os.getuid() + 1
+    monkeypatch.setattr(conduit_daemon.os, 'getuid', lambda: other_user)
+    assert conduit_daemon.forward(['build'], path=path) is None
+    assert commands == []
+
+
+def test_serve_refuses_shared_directory(tmpdir):
+    shared = tmpdir.mkdir('shared')
+    shared.chmod(0o777)
+    with pytest.raises(ValueError):
+        conduit_daemon.serve(lambda args: 0, str(shared.join('conduit.sock')))
+
+
+def test_forward_without_daemon(tmpdir):
+    assert conduit_daemon.forward(['build'], path=str(tmpdir.join('missing.sock'))) is None
+
+
+def test_daemon_and_watch_commands_run_locally(daemon):
+    path, commands = daemon
+    assert conduit_daemon.forward(['daemon', 'stop'], path=path) is None
+    assert conduit_daemon.forward(['build', '--watch'], path=path) is None
+    assert commands == []
+
+
+def test_package_exports_conduit_without_importing_boto3():
+    from aws_conduit import Conduit
+    from aws_conduit import conduit_cli
+    assert Conduit is conduit_cli.Conduit
+    code = "import sys, aws_conduit; print('boto3' in sys.modules)"
+    assert subprocess.check_output([sys.executable, '-c', code], universal_newlines=True).strip() == 'False'
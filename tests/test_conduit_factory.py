@@ -0,0 +1,51 @@
+import threading
+import time
+
+from aws_conduit import conduit_factory, conduit_s3, conduit_storage
+from aws_conduit.conduit_s3 import ConduitS3
+from aws_conduit.conduit_storage import LocalStorage
+from conftest import BUCKET, REGION
+
+
+class CreateOnceStorage(LocalStorage):
+
+    def __init__(self, root):
+        super(CreateOnceStorage, self).__init__(root)
+        self.created = []
+
+    def create_bucket(self, name, region):
+        if self.bucket_exists(name):
+            raise ValueError("Bucket already exists: {}".format(name))
+        time.sleep(0.05)
+        self.created.append(name)
+        super(CreateOnceStorage, self).create_bucket(name, region)
+
+
+def test_regional_bucket_is_created_once(tmpdir, monkeypatch):
+    storage = CreateOnceStorage(str(tmpdir))
+    LocalStorage.create_bucket(storage, BUCKET, REGION)
+    monkeypatch.setitem(conduit_storage.BACKENDS, 'storage', storage)
+    monkeypatch.setattr(conduit_factory, 'REGION', REGION)
+    monkeypatch.setattr(conduit_factory, 'BUCKETS', dict(config=ConduitS3(BUCKET, REGION)))
+    monkeypatch.setattr(conduit_s3, 'EXISTING_BUCKETS', {})
+    monkeypatch.setattr(conduit_factory, 'REPLICA_SOURCES', {})
+    start = threading.Barrier(8)
+    buckets = []
+    errors = []
+
+    def resolve():
+        start.wait()
+        try:
+            buckets.append(conduit_factory.regional_bucket('us-east-1'))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=resolve) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert errors == []
+    assert storage.created == [BUCKET + '-us-east-1']
+    assert set(bucket.name for bucket in buckets) == set([BUCKET + '-us-east-1'])
+    assert conduit_factory.REPLICA_SOURCES == {BUCKET + '-us-east-1': BUCKET}
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from aws_conduit import conduit_log
+
+LOG = conduit_log.logger('aws_conduit.groovy')
+
+
+@pytest.fixture(autouse=True)
+def reset():
+    yield
+    conduit_log.configure('info')
+
+
+def test_levels(capsys):
+    conduit_log.configure('warning')
+    LOG.info("groovy info")
+    LOG.warning("groovy warning")
+    conduit_log.configure('debug')
+    LOG.debug("groovy %s", "debug")
+    assert capsys.readouterr().out == "groovy warning\ngroovy debug\n"
+    with pytest.raises(ValueError):
+        conduit_log.configure('loud')
+
+
+def test_json_output(capsys):
+    conduit_log.configure(json_output=True)
+    LOG.info("Removed %s", "groovy-product")
+    message = json.loads(capsys.readouterr().out)
+    assert message['level'] == 'info'
+    assert message['message'] == "Removed groovy-product"
+    assert message['logger'] == 'aws_conduit.groovy'
+
+
+def test_progress_is_rate_limited(capsys):
+    conduit_log.configure(json_output=True)
+    progress = conduit_log.progress(LOG, "Associating portfolios", total=1000, interval=60)
+    for _ in range(1000):
+        progress.update()
+    progress.done()
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])['progress']['count'] == 1000
+
+
+def test_reports_honour_quiet_and_json(capsys):
+    conduit_log.configure('warning')
+    conduit_log.report('package', '{"groovy": "package"}', dict(groovy='package'))
+    assert capsys.readouterr().out == ""
+    conduit_log.configure('info')
+    conduit_log.report('package', '{"groovy": "package"}', dict(groovy='package'))
+    assert capsys.readouterr().out == '{"groovy": "package"}\n'
+    conduit_log.configure(json_output=True)
+    conduit_log.report('package', '{"groovy": "package"}', dict(groovy='package'))
+    message = json.loads(capsys.readouterr().out)
+    assert message['logger'] == 'aws_conduit.report'
+    assert message['report'] == 'package'
+    assert message['result'] == dict(groovy='package')
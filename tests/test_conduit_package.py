@@ -0,0 +1,107 @@
+import hashlib
+import io
+import json
+import zipfile
+
+import pytest
+
+from aws_conduit import conduit_package, conduit_plan, conduit_storage
+from conftest import BUCKET
+
+
+def test_build_zip_is_deterministic():
+    entries = {
+        'portfolio.json': b'[{"product": "groovy-product"}]',
+        'another.json': b'[]'
+    }
+    first = conduit_package.build_zip(entries)
+    second = conduit_package.build_zip(dict(reversed(list(entries.items()))))
+    assert first == second
+
+
+def test_build_zip_contents():
+    content = conduit_package.build_zip({'portfolio.json': b'[]'})
+    archive = zipfile.ZipFile(io.BytesIO(content))
+    assert archive.namelist() == ['portfolio.json']
+    assert archive.read('portfolio.json') == b'[]'
+    assert archive.getinfo('portfolio.json').date_time == conduit_package.ZIP_DATE_TIME
+
+
+def test_build_zip_stores_compressed_content():
+    lambdas = conduit_package.build_zip({'handler.py': b'groovy'})
+    archive = zipfile.ZipFile(io.BytesIO(conduit_package.build_zip({
+        'lambdas.zip': b'groovy',
+        'blobs/' + hashlib.sha256(lambdas).hexdigest(): lambdas,
+        'portfolio.json': b'[]'
+    })))
+    assert [info.compress_type for info in archive.infolist()] == [zipfile.ZIP_STORED, zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED]
+
+
+def test_put_package_uploads_what_was_built(bucket, monkeypatch):
+    copies = []
+    monkeypatch.setattr(conduit_storage.backend(), 'copy_file', lambda *args, **kwargs: copies.append(args))
+    uploads = []
+    upload_file = conduit_storage.backend().upload_file
+
+    def record_upload(name, prefix, file, metadata=None, callback=None, checksum=False):
+        uploads.append((prefix, checksum))
+        upload_file(name, prefix, file, metadata=metadata, callback=callback, checksum=checksum)
+
+    monkeypatch.setattr(conduit_storage.backend(), 'upload_file', record_upload)
+    entries = {'portfolio.json': b'[]'}
+    first = conduit_package.put_package(bucket, 'portfolio/portfolio-dev.zip', entries)
+    second = conduit_package.put_package(bucket, 'portfolio/portfolio-prod.zip', entries)
+    assert first == second
+    assert copies == []
+    assert uploads == [('portfolio/portfolio-dev.zip', True), ('portfolio/portfolio-prod.zip', True)]
+    assert conduit_storage.backend().download_content(BUCKET, 'portfolio/portfolio-prod.zip') == conduit_package.build_zip(entries)
+
+
+def test_put_package_checks_the_uploaded_checksum(bucket, monkeypatch):
+    monkeypatch.setattr(conduit_storage.backend(), 'get_checksum', lambda name, prefix: 'bm90IHRoZSBwYWNrYWdl')
+    with pytest.raises(ValueError):
+        conduit_package.put_package(bucket, 'portfolio/portfolio-dev.zip', {'portfolio.json': b'[]'})
+
+
+def test_put_package_is_not_verified_under_plan(bucket, monkeypatch):
+    def missing(name, prefix):
+        raise OSError("Not found: {}".format(prefix))
+
+    monkeypatch.setattr(conduit_storage.backend(), 'get_checksum', missing)
+    with pytest.raises(ValueError):
+        conduit_package.put_package(bucket, 'portfolio/portfolio-dev.zip', {'portfolio.json': b'[]'})
+    monkeypatch.setattr(conduit_plan.events, 'clients', lambda: [])
+    with conduit_plan.Plan():
+        conduit_package.put_package(bucket, 'portfolio/portfolio-dev.zip', {'portfolio.json': b'[]'})
+
+
+def test_fat_package_entries_stores_content_once(bucket):
+    storage = conduit_storage.backend()
+    storage.upload_content(BUCKET, 'portfolio/groovy/core/1.0.0/lambdas.zip', b'lambdas')
+    storage.upload_content(BUCKET, 'portfolio/groovy/core/1.0.0/template.yaml', b'groovy template')
+    storage.upload_content(BUCKET, 'portfolio/other/core/2.0.0/lambdas.zip', b'lambdas')
+    folders = {'groovy': 'portfolio/groovy/core/1.0.0', 'other': 'portfolio/other/core/2.0.0'}
+    entries = list(conduit_package.fat_package_entries(bucket, folders))
+    lambdas = hashlib.sha256(b'lambdas').hexdigest()
+    template = hashlib.sha256(b'groovy template').hexdigest()
+    assert sorted(name for name, _ in entries) == sorted(['blobs/' + lambdas, 'blobs/' + template, 'index.json'])
+    assert entries[-1][0] == 'index.json'
+    assert json.loads(entries[-1][1].decode('utf-8')) == {
+        'groovy': {'lambdas.zip': lambdas, 'template.yaml': template},
+        'other': {'lambdas.zip': lambdas}
+    }
+    archive = zipfile.ZipFile(io.BytesIO(conduit_package.build_zip(iter(entries))))
+    assert archive.read('blobs/' + lambdas) == b'lambdas'
+
+
+def test_fat_package_entries_streams_downloads(bucket, monkeypatch):
+    storage = conduit_storage.backend()
+    for index in range(10):
+        storage.upload_content(BUCKET, 'portfolio/groovy/core/1.0.0/{}.zip'.format(index), str(index).encode('utf-8'))
+    downloads = []
+    download_content = storage.download_content
+    monkeypatch.setattr(storage, 'download_content', lambda name, prefix: downloads.append(prefix) or download_content(name, prefix))
+    entries = conduit_package.fat_package_entries(bucket, {'groovy': 'portfolio/groovy/core/1.0.0'}, max_workers=2)
+    next(entries)
+    assert len(downloads) <= 3
+    assert len(list(entries)) == 10
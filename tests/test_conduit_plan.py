@@ -0,0 +1,34 @@
+import boto3
+import pytest
+
+from aws_conduit import conduit_plan, conduit_steps
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = boto3.client('s3', region_name='ap-southeast-2', aws_access_key_id='testing',
+                          aws_secret_access_key='testing')
+    monkeypatch.setattr(conduit_plan.events, 'clients', lambda: [client])
+    return client
+
+
+def test_plan_records_writes_without_making_them(client):
+    with conduit_plan.Plan() as plan:
+        client.put_object(Bucket='groovy-bucket', Key='groovy/template.yaml', Body=b'groovy')
+        client.delete_objects(Bucket='groovy-bucket', Delete={'Objects': [{'Key': 'a'}, {'Key': 'b'}]})
+    assert [(call['operation'], call['detail']) for call in plan.calls] == [
+        ('PutObject', 'Key=groovy/template.yaml'),
+        ('DeleteObjects', 'Objects=2')
+    ]
+    assert plan.counts() == {'s3': dict(reads=0, writes=2, read_time=0.0)}
+    assert conduit_plan.active() is None
+
+
+def test_plan_records_build_steps(client, capsys):
+    with conduit_plan.Plan() as plan:
+        conduit_steps.run_steps('groovy-product', ['echo hello'])
+    assert plan.steps == [dict(product='groovy-product', command='echo hello')]
+    plan.report()
+    output = capsys.readouterr().out
+    assert '[groovy-product] $ echo hello' in output
+    assert '[groovy-product] hello' not in output
@@ -0,0 +1,37 @@
+import pstats
+import threading
+
+from aws_conduit import conduit_profile
+
+
+def groovy_work():
+    return sum(range(10000))
+
+
+def groovy_thread_work():
+    return [str(index) for index in range(10000)]
+
+
+def test_profile_includes_threads(tmpdir, capsys):
+    with conduit_profile.Profile('build', top=5, memory=True) as profile:
+        groovy_work()
+        worker = threading.Thread(target=groovy_thread_work)
+        worker.start()
+        worker.join()
+    functions = [function[2] for function in profile.stats().stats]
+    assert 'groovy_work' in functions
+    assert 'groovy_thread_work' in functions
+    assert profile.peak > 0
+
+    profile.report()
+    assert 'Profile of build' in capsys.readouterr().out
+
+    path = str(tmpdir.join('build.pstats'))
+    profile.write(path)
+    assert 'groovy_thread_work' in [function[2] for function in pstats.Stats(path).stats]
+
+
+def test_from_environment():
+    assert conduit_profile.from_environment({}) is None
+    assert conduit_profile.from_environment({'CONDUIT_PROFILE': 'ci.pstats', 'CONDUIT_PROFILE_TOP': '10'}) == dict(
+        path='ci.pstats', top=10, memory=False)
@@ -0,0 +1,31 @@
+from aws_conduit import conduit_regions
+
+
+def test_regions_for():
+    spec = dict(regions=['eu-west-1', 'us-east-1'])
+    assert conduit_regions.regions_for(spec, dict(), 'ap-southeast-2') == ['eu-west-1', 'us-east-1']
+    assert conduit_regions.regions_for(spec, dict(regions=['us-east-1', 'ap-southeast-2']), 'ap-southeast-2') == ['us-east-1']
+    assert conduit_regions.regions_for(spec, dict(regions=['us-east-1']), 'ap-southeast-2', 'eu-west-2, eu-west-2') == ['eu-west-2']
+    assert conduit_regions.regions_for(dict(), dict(), 'ap-southeast-2') == []
+
+
+def test_fan_out_reports_each_region(capsys):
+    released = []
+
+    def release(region):
+        if region == 'us-east-1':
+            raise ValueError("Product groovy-product does not exist in us-east-1")
+        released.append(region)
+
+    results = conduit_regions.fan_out('example-portfolio/groovy-product', '1.0.0', ['eu-west-1', 'us-east-1'], release)
+    assert released == ['eu-west-1']
+    assert results['eu-west-1']['error'] is None
+    assert 'does not exist' in results['us-east-1']['error']
+    assert conduit_regions.fan_out('example-portfolio/groovy-product', '1.0.0', [], release) == {}
+
+    capsys.readouterr()
+    assert conduit_regions.report() == [('example-portfolio/groovy-product', 'us-east-1')]
+    lines = capsys.readouterr().out.splitlines()
+    assert 'eu-west-1' in lines[0] and 'us-east-1' in lines[0]
+    assert '1.0.0' in lines[2] and 'failed' in lines[2]
+    assert conduit_regions.report() == []
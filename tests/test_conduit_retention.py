@@ -0,0 +1,86 @@
+import pytest
+
+from aws_conduit import conduit_retention
+from conftest import BUCKET
+
+VERSIONS = ['0.0.1', '0.0.1+build1', '0.0.1+build2', '0.0.2', '0.0.2+build1', '0.0.2+build2', '0.0.2+build10',
+            '0.0.3', '0.1.0', '0.1.0+build1']
+
+
+def test_default_policy_removes_builds_below_current():
+    expired = conduit_retention.expired(VERSIONS, '0.1.0', conduit_retention.DEFAULT_POLICY)
+    assert expired == ['0.0.1+build1', '0.0.1+build2', '0.0.2+build1', '0.0.2+build2', '0.0.2+build10']
+
+
+def test_keep_builds_keeps_newest_builds():
+    policy = dict(conduit_retention.DEFAULT_POLICY, keepBuilds=2)
+    expired = conduit_retention.expired(VERSIONS, '0.1.0', policy)
+    assert expired == ['0.0.1+build1', '0.0.1+build2', '0.0.2+build1']
+
+
+def test_keep_patches_per_minor_version():
+    policy = dict(conduit_retention.DEFAULT_POLICY, keepPatches=1, keepBuilds=10)
+    expired = conduit_retention.expired(VERSIONS, '0.1.0', policy)
+    assert expired == ['0.0.1', '0.0.2']
+
+
+def test_names_which_are_not_versions_are_kept():
+    expired = conduit_retention.expired(VERSIONS + ['v1-initial', 'latest'], '0.1.0', conduit_retention.DEFAULT_POLICY)
+    assert expired == ['0.0.1+build1', '0.0.1+build2', '0.0.2+build1', '0.0.2+build2', '0.0.2+build10']
+    assert conduit_retention.expired(VERSIONS, 'v1-initial', conduit_retention.DEFAULT_POLICY) == []
+
+
+def test_keep_provisioned():
+    policy = dict(conduit_retention.DEFAULT_POLICY, keepPatches=1, keepProvisioned=True)
+    expired = conduit_retention.expired(VERSIONS, '0.1.0', policy, provisioned={'0.0.1', '0.0.2+build2'})
+    assert '0.0.1' not in expired
+    assert '0.0.2+build2' not in expired
+    policy['keepProvisioned'] = False
+    expired = conduit_retention.expired(VERSIONS, '0.1.0', policy, provisioned={'0.0.1', '0.0.2+build2'})
+    assert '0.0.1' in expired
+    assert '0.0.2+build2' in expired
+
+
+def test_policy_for_precedence():
+    spec = {
+        'retention': {
+            'default': {'keepBuilds': 2},
+            'example-portfolio': {'keepPatches': 3}
+        },
+        'inventory': [
+            {'portfolio': 'example-portfolio', 'product': 'groovy-product', 'retention': {'keepBuilds': 5}},
+            {'portfolio': 'example-portfolio', 'product': 'other-product'}
+        ]
+    }
+    assert conduit_retention.policy_for(spec, 'example-portfolio', 'groovy-product') == dict(
+        keepBuilds=5, keepPatches=3, keepProvisioned=False)
+    assert conduit_retention.policy_for(spec, 'example-portfolio', 'other-product') == dict(
+        keepBuilds=2, keepPatches=3, keepProvisioned=False)
+    assert conduit_retention.policy_for(None, 'example-portfolio', 'other-product') == conduit_retention.DEFAULT_POLICY
+
+
+def test_policy_for_rejects_unknown_settings():
+    spec = {'retention': {'default': {'keepEverything': True}}, 'inventory': []}
+    with pytest.raises(ValueError):
+        conduit_retention.policy_for(spec, 'example-portfolio', 'groovy-product')
+
+
+def test_run_attempts_every_task():
+    removed = []
+
+    def fail():
+        raise OSError('groovy failure')
+
+    tasks = [('a', lambda: removed.append('a')), ('b', fail), ('c', lambda: removed.append('c'))]
+    with pytest.raises(OSError):
+        conduit_retention.run(tasks, max_workers=2)
+    assert sorted(removed) == ['a', 'c']
+
+
+def test_s3_tasks_forget_removed_content(bucket):
+    for version in ['0.0.9+build1', '0.1.0']:
+        bucket.put_content(version.encode('utf-8'), 'portfolio/product/core/{}/template.yaml'.format(version))
+    tasks = conduit_retention.s3_tasks(BUCKET, 'portfolio', 'product', '0.1.0', conduit_retention.DEFAULT_POLICY)
+    assert [prefix for prefix, _ in tasks] == ['portfolio/product/core/0.0.9+build1']
+    assert conduit_retention.run(tasks) == 1
+    assert list(bucket.get_manifest()['artifacts'].values()) == ['portfolio/product/core/0.1.0/template.yaml']
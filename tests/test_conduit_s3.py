@@ -0,0 +1,104 @@
+import hashlib
+
+import pytest
+
+from aws_conduit import conduit_s3
+from aws_conduit.conduit_storage import LocalStorage
+from conftest import BUCKET, REGION
+
+
+def test_file_digest(tmpdir):
+    path = tmpdir.join('template.yaml')
+    path.write_binary(b'AWSTemplateFormatVersion: "2010-09-09"\n')
+    expected = hashlib.sha256(b'AWSTemplateFormatVersion: "2010-09-09"\n').hexdigest()
+    assert conduit_s3.file_digest(str(path)) == expected
+
+
+def test_file_digest_large_file(tmpdir, monkeypatch):
+    monkeypatch.setattr(conduit_s3, 'LARGE_FILE_SIZE', 16)
+    content = b'x' * 1024
+    path = tmpdir.join('lambdas.zip')
+    path.write_binary(content)
+    assert conduit_s3.file_digest(str(path)) == hashlib.sha256(content).hexdigest()
+
+
+def test_file_digest_empty_file(tmpdir):
+    path = tmpdir.join('empty.json')
+    path.write_binary(b'')
+    assert conduit_s3.file_digest(str(path)) == hashlib.sha256(b'').hexdigest()
+
+
+class CountingStorage(LocalStorage):
+
+    def __init__(self, root):
+        super(CountingStorage, self).__init__(root)
+        self.uploads = []
+        self.copies = []
+
+    def upload_content(self, name, prefix, content, metadata=None, callback=None):
+        if prefix != conduit_s3.MANIFEST_PREFIX:
+            self.uploads.append(prefix)
+        super(CountingStorage, self).upload_content(name, prefix, content, metadata=metadata, callback=callback)
+
+    def copy_file(self, name, source_prefix, destination_prefix, source_name=None):
+        self.copies.append((source_prefix, destination_prefix))
+        LocalStorage.upload_content(self, name, destination_prefix, self.download_content(source_name or name, source_prefix))
+
+
+@pytest.fixture
+def storage(tmpdir, use_storage):
+    return use_storage(CountingStorage(str(tmpdir.join('storage'))))
+
+
+def test_put_content_skips_unchanged_content(storage):
+    bucket = conduit_s3.ConduitS3(BUCKET, REGION)
+    bucket.put_content(b'template', 'portfolio/product/core/1.0.0/template.yaml')
+    bucket.put_content(b'template', 'portfolio/product/core/1.0.0/template.yaml')
+    assert storage.uploads == ['portfolio/product/core/1.0.0/template.yaml']
+
+
+def test_put_content_uploads_again_when_object_is_gone(storage):
+    bucket = conduit_s3.ConduitS3(BUCKET, REGION)
+    bucket.put_content(b'template', 'portfolio/product/core/1.0.0/template.yaml')
+    storage.delete_folder(BUCKET, 'portfolio/product/core/1.0.0')
+    bucket.put_content(b'template', 'portfolio/product/core/1.0.0/template.yaml')
+    assert storage.uploads == ['portfolio/product/core/1.0.0/template.yaml'] * 2
+    assert storage.object_exists(BUCKET, 'portfolio/product/core/1.0.0/template.yaml')
+
+
+def test_put_resource_copies_content_from_another_prefix(storage, tmpdir):
+    path = tmpdir.join('lambdas.zip')
+    path.write_binary(b'zip')
+    bucket = conduit_s3.ConduitS3(BUCKET, REGION)
+    bucket.put_resource(str(path), 'portfolio/product/core/1.0.0/lambdas.zip')
+    bucket.put_resource(str(path), 'portfolio/product/core/1.0.1/lambdas.zip')
+    assert storage.uploads == ['portfolio/product/core/1.0.0/lambdas.zip']
+    assert storage.copies == [('portfolio/product/core/1.0.0/lambdas.zip', 'portfolio/product/core/1.0.1/lambdas.zip')]
+    assert storage.download_content(BUCKET, 'portfolio/product/core/1.0.1/lambdas.zip') == b'zip'
+
+
+def test_put_content_uploads_when_copy_source_is_gone(storage):
+    bucket = conduit_s3.ConduitS3(BUCKET, REGION)
+    bucket.put_content(b'template', 'portfolio/product/core/1.0.0/template.yaml')
+    storage.delete_folder(BUCKET, 'portfolio/product/core/1.0.0')
+    bucket.put_content(b'template', 'portfolio/product/core/1.0.1/template.yaml')
+    assert storage.uploads == ['portfolio/product/core/1.0.0/template.yaml', 'portfolio/product/core/1.0.1/template.yaml']
+    assert bucket.get_manifest()['artifacts'] == {hashlib.sha256(b'template').hexdigest(): 'portfolio/product/core/1.0.1/template.yaml'}
+
+
+def test_manifest_round_trip(storage, monkeypatch):
+    bucket = conduit_s3.ConduitS3(BUCKET, REGION)
+    bucket.put_content(b'template', 'portfolio/product/core/1.0.0/template.yaml')
+    bucket.put_content(b'nested', 'portfolio/product/core/1.0.0/nested.yaml')
+    conduit_s3.save_manifests()
+    monkeypatch.setattr(conduit_s3, 'MANIFESTS', {})
+    assert sorted(bucket.get_manifest()['artifacts'].values()) == ['portfolio/product/core/1.0.0/nested.yaml',
+                                                                   'portfolio/product/core/1.0.0/template.yaml']
+    bucket.put_content(b'template', 'portfolio/product/core/1.0.0/template.yaml')
+    assert len(storage.uploads) == 2
+
+    conduit_s3.delete_folder(BUCKET, 'portfolio/product/core/1.0.0', versions=True)
+    assert bucket.get_manifest() == dict(artifacts={}, dirty=True)
+    conduit_s3.save_manifests()
+    monkeypatch.setattr(conduit_s3, 'MANIFESTS', {})
+    assert bucket.get_manifest()['artifacts'] == {}
@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+
+from aws_conduit import conduit_scheduler
+
+
+def _spec(product, depends_on=None, portfolio='example-portfolio'):
+    spec = dict(portfolio=portfolio, product=product)
+    if depends_on is not None:
+        spec['dependsOn'] = depends_on
+    return spec
+
+
+def test_inventory_graph():
+    graph = conduit_scheduler.inventory_graph([
+        _spec('network'),
+        _spec('database', ['network']),
+        _spec('service', ['database', 'example-portfolio/network', 'already-released'])
+    ])
+    assert graph == {
+        'example-portfolio/network': set(),
+        'example-portfolio/database': {'example-portfolio/network'},
+        'example-portfolio/service': {'example-portfolio/database', 'example-portfolio/network'}
+    }
+
+
+def test_inventory_graph_rejects_cycles():
+    with pytest.raises(ValueError):
+        conduit_scheduler.inventory_graph([_spec('a', ['b']), _spec('b', ['a'])])
+
+
+def test_inventory_graph_rejects_ambiguous_dependencies():
+    with pytest.raises(ValueError):
+        conduit_scheduler.inventory_graph([
+            _spec('network', portfolio='one'),
+            _spec('network', portfolio='two'),
+            _spec('service', ['network'])
+        ])
+
+
+def test_run_graph_respects_dependencies():
+    finished = []
+    lock = threading.Lock()
+
+    def work(name):
+        with lock:
+            finished.append(name)
+
+    graph = {'a': set(), 'b': {'a'}, 'c': {'a'}, 'd': {'b', 'c'}}
+    timeline = conduit_scheduler.run_graph(graph, work, max_workers=3)
+    assert finished[0] == 'a'
+    assert finished[-1] == 'd'
+    assert [entry['status'] for entry in timeline] == ['done'] * 4
+
+
+def test_run_graph_stops_after_failure():
+    def work(name):
+        if name == 'a':
+            raise RuntimeError('build failed')
+
+    with pytest.raises(RuntimeError):
+        conduit_scheduler.run_graph({'a': set(), 'b': {'a'}}, work)
@@ -0,0 +1,67 @@
+import pytest
+
+from aws_conduit import conduit_sharing
+from aws_conduit.conduit_portfolio import ConduitPortfolio
+
+ACCOUNT_ID = '111111111111'
+CONDUIT_ROLE = 'arn:aws:iam::111111111111:role/conduit/conduit-provisioner-role'
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    catalog = dict(
+        access={'port-groovy': {'222222222222'}},
+        shares={'port-groovy': {('ORGANIZATIONAL_UNIT', 'ou-ab12-groovy'): False}},
+        principals={'port-groovy': {CONDUIT_ROLE}},
+        calls=[]
+    )
+
+    def create_portfolio_share(portfolio_id, account_id=None, organization_node=None, share_principals=False):
+        catalog['calls'].append(('share', portfolio_id, account_id or organization_node[1]))
+        if account_id is not None:
+            catalog['access'].setdefault(portfolio_id, set()).add(account_id)
+        else:
+            catalog['shares'].setdefault(portfolio_id, {})[organization_node] = share_principals
+
+    def update_portfolio_share(portfolio_id, organization_node, share_principals):
+        catalog['calls'].append(('update', portfolio_id, organization_node[1]))
+        catalog['shares'][portfolio_id][organization_node] = share_principals
+
+    def associate_principal(portfolio_id, principal_arn):
+        catalog['calls'].append(('associate', portfolio_id, principal_arn))
+        catalog['principals'].setdefault(portfolio_id, set()).add(principal_arn)
+
+    def describe_portfolio_shares(portfolio_id, share_type):
+        return [dict(PrincipalId=node[1], Type=node[0], SharePrincipals=share_principals)
+                for node, share_principals in catalog['shares'].get(portfolio_id, {}).items() if node[0] == share_type]
+
+    service_catalog = conduit_sharing.service_catalog
+    monkeypatch.setattr(service_catalog, 'list_portfolio_access', lambda portfolio_id: list(catalog['access'].get(portfolio_id, [])))
+    monkeypatch.setattr(service_catalog, 'describe_portfolio_shares', describe_portfolio_shares)
+    monkeypatch.setattr(service_catalog, 'list_principals_for_portfolio', lambda portfolio_id: list(catalog['principals'].get(portfolio_id, [])))
+    monkeypatch.setattr(service_catalog, 'create_portfolio_share', create_portfolio_share)
+    monkeypatch.setattr(service_catalog, 'update_portfolio_share', update_portfolio_share)
+    monkeypatch.setattr(service_catalog, 'associate_principal', associate_principal)
+    return catalog
+
+
+def test_parse_targets():
+    assert conduit_sharing.parse_targets('222222222222, ou-ab12-groovy,o-groovy,222222222222') == (
+        ['222222222222'], [('ORGANIZATIONAL_UNIT', 'ou-ab12-groovy'), ('ORGANIZATION', 'o-groovy')])
+    with pytest.raises(ValueError):
+        conduit_sharing.parse_targets(['groovy-account'])
+
+
+def test_share_only_makes_missing_changes(catalog):
+    portfolios = [
+        ConduitPortfolio('groovy-portfolio', 'groovy', portfolio_id='port-groovy'),
+        ConduitPortfolio('other-portfolio', 'groovy', portfolio_id='port-other')
+    ]
+    targets = ['222222222222', '333333333333', 'ou-ab12-groovy']
+    assert conduit_sharing.share(portfolios, targets, ACCOUNT_ID, share_principals=True) == 8
+    assert sorted(call for call in catalog['calls'] if call[1] == 'port-groovy') == [
+        ('associate', 'port-groovy', 'arn:aws:iam:::role/conduit/conduit-provisioner-role'),
+        ('share', 'port-groovy', '333333333333'),
+        ('update', 'port-groovy', 'ou-ab12-groovy')
+    ]
+    assert conduit_sharing.share(portfolios, targets, ACCOUNT_ID, share_principals=True) == 0
@@ -0,0 +1,52 @@
+import base64
+import hashlib
+import json
+import os
+import time
+
+from aws_conduit import conduit_sls
+
+
+def write_state(tmpdir, zip_content):
+    directory = tmpdir.mkdir('.serverless')
+    directory.join('groovy.zip').write_binary(zip_content)
+    code_sha = base64.b64encode(hashlib.sha256(zip_content).digest()).decode('utf-8')
+    state = {
+        'package': {'artifactDirectoryName': 'serverless/groovy/dev/1234'},
+        'service': {
+            'provider': {
+                'deploymentBucketObject': {'name': 'groovy-deployment-bucket'},
+                'compiledCloudFormationTemplate': {
+                    'Resources': {
+                        'GroovyLambdaFunction': {
+                            'Type': 'AWS::Lambda::Function',
+                            'Properties': {'Code': {'S3Key': 'serverless/groovy/dev/1234/groovy.zip'}}
+                        },
+                        'GroovyLambdaVersionAbc': {
+                            'Type': 'AWS::Lambda::Version',
+                            'Properties': {'FunctionName': {'Ref': 'GroovyLambdaFunction'}, 'CodeSha256': code_sha}
+                        }
+                    }
+                }
+            }
+        }
+    }
+    state_path = directory.join('serverless-state.json')
+    state_path.write(json.dumps(state))
+    return str(directory), str(state_path)
+
+
+def test_state_records_zip_digests(tmpdir):
+    directory, state_path = write_state(tmpdir, b'groovy lambda')
+    state = conduit_sls.ServerlessState(state_path)
+    assert state.package['bucket'] == 'groovy-deployment-bucket'
+    assert state.digest(os.path.join(directory, 'groovy.zip')) == hashlib.sha256(b'groovy lambda').hexdigest()
+    assert state.digest(os.path.join(directory, 'other.zip')) is None
+
+
+def test_zips_newer_than_state_are_not_trusted(tmpdir):
+    directory, state_path = write_state(tmpdir, b'groovy lambda')
+    later = time.time() + 60
+    os.utime(os.path.join(directory, 'groovy.zip'), (later, later))
+    state = conduit_sls.ServerlessState(state_path)
+    assert state.digest(os.path.join(directory, 'groovy.zip')) is None
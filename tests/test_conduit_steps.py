@@ -0,0 +1,69 @@
+import json
+import subprocess
+
+import pytest
+
+from aws_conduit import conduit_steps
+
+
+def test_step_groups():
+    steps = [
+        'echo first',
+        {'run': 'echo second', 'parallel': True},
+        {'run': 'echo third', 'parallel': True},
+        'echo fourth',
+        {'run': 'echo fifth', 'parallel': True}
+    ]
+    groups = conduit_steps.step_groups(steps)
+    assert [[conduit_steps.step_command(step) for step in group] for group in groups] == [
+        ['echo first'],
+        ['echo second', 'echo third'],
+        ['echo fourth'],
+        ['echo fifth']
+    ]
+
+
+def test_run_steps_records_each_step(capsys):
+    records = conduit_steps.run_steps('groovy-product', ['echo hello', {'run': 'echo a', 'parallel': True}, {'run': 'echo b', 'parallel': True}])
+    assert [record['returncode'] for record in records] == [0, 0, 0]
+    assert '[groovy-product] hello' in capsys.readouterr().out
+
+
+def test_run_steps_stops_at_failure():
+    with pytest.raises(subprocess.CalledProcessError):
+        conduit_steps.run_steps('groovy-product', ['exit 3', 'echo never'])
+
+
+def test_write_report(tmpdir):
+    conduit_steps.run_steps('groovy-product', ['echo hello'])
+    path = tmpdir.join('report.json')
+    conduit_steps.write_report([], path=str(path))
+    report = json.loads(path.read())
+    assert report['steps'][-1]['command'] == 'echo hello'
+    assert conduit_steps.STEP_RECORDS == []
+
+
+def test_write_report_needs_a_path(tmpdir, monkeypatch):
+    monkeypatch.chdir(str(tmpdir))
+    monkeypatch.setattr(conduit_steps, 'REPORT_PATH', None)
+    conduit_steps.run_steps('groovy-product', ['echo hello'])
+    conduit_steps.write_report([])
+    assert tmpdir.listdir() == []
+    assert conduit_steps.STEP_RECORDS == []
+
+
+def test_unchanged_sources_skip_build_steps(tmpdir, monkeypatch):
+    from aws_conduit import conduit, helper
+    monkeypatch.chdir(str(tmpdir))
+    tmpdir.join('template.yaml').write('groovy')
+    tmpdir.join('lambdas.zip').write('zip')
+    ran = []
+    monkeypatch.setattr(conduit_steps, 'run_steps', lambda name, steps, env=None: ran.append(name))
+    sources = {'product': 'groovy-product', 'artifact': 'template.yaml', 'build': ['make lint'], 'watch': ['template.yaml']}
+    assert conduit._run_build('build', False, sources, helper.product_fingerprint(sources)) is None
+    assert ran == []
+    assert conduit._run_build('build', True, sources, helper.product_fingerprint(sources)) is not None
+    assert ran == ['groovy-product']
+    outputs = dict(sources, associatedResources=['lambdas.zip'])
+    assert conduit._run_build('build', False, outputs, helper.product_fingerprint(outputs)) is None
+    assert ran == ['groovy-product', 'groovy-product']
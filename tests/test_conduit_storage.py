@@ -0,0 +1,36 @@
+from aws_conduit.conduit_storage import LocalStorage
+from conftest import BUCKET
+
+
+def _storage(tmpdir):
+    storage = LocalStorage(str(tmpdir))
+    storage.create_bucket(BUCKET, 'eu-west-1')
+    return storage
+
+
+def test_local_storage_round_trip(tmpdir):
+    storage = _storage(tmpdir)
+    storage.upload_content(BUCKET, 'portfolio/product/core/1.0.0/template.yaml', b'content')
+    assert storage.object_exists(BUCKET, 'portfolio/product/core/1.0.0/template.yaml')
+    assert storage.download_content(BUCKET, 'portfolio/product/core/1.0.0/template.yaml') == b'content'
+    assert storage.get_sub_folders(BUCKET, 'portfolio/product/core') == ['portfolio/product/core/1.0.0']
+    assert [item['Key'] for item in storage.list_objects(BUCKET, 'portfolio/product')] == ['portfolio/product/core/1.0.0/template.yaml']
+
+
+def test_local_storage_keeps_versions(tmpdir):
+    storage = _storage(tmpdir)
+    storage.upload_content(BUCKET, 'portfolio/product/core/1.0.0/template.yaml', b'first')
+    storage.upload_content(BUCKET, 'portfolio/product/core/1.0.0/template.yaml', b'second')
+    assert tmpdir.join('.versions', BUCKET, 'portfolio', 'product', 'core', '1.0.0', 'template.yaml', '1').read_binary() == b'first'
+    assert storage.delete_folder(BUCKET, 'portfolio/product/core/1.0.0') == 1
+    assert not storage.object_exists(BUCKET, 'portfolio/product/core/1.0.0/template.yaml')
+    assert tmpdir.join('.versions', BUCKET, 'portfolio', 'product', 'core', '1.0.0', 'template.yaml', '2').read_binary() == b'second'
+    storage.delete_folder(BUCKET, 'portfolio/product/core/1.0.0', versions=True)
+    assert not tmpdir.join('.versions', BUCKET, 'portfolio', 'product', 'core', '1.0.0').exists()
+
+
+def test_local_storage_copy(tmpdir):
+    storage = _storage(tmpdir)
+    storage.upload_content(BUCKET, 'portfolio/product/core/1.0.0/lambdas.zip', b'zip')
+    storage.copy_file(BUCKET, 'portfolio/product/core/1.0.0/lambdas.zip', 'portfolio/product/core/1.0.1/lambdas.zip')
+    assert storage.download_content(BUCKET, 'portfolio/product/core/1.0.1/lambdas.zip') == b'zip'
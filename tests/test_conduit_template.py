@@ -0,0 +1,32 @@
+from aws_conduit.conduit_template import TemplateRenderer
+
+
+def test_render_substitutes_every_placeholder():
+    renderer = TemplateRenderer({
+        '__resources__': 'bucket/portfolio/product/core/1.0.0',
+        '__bucket__': 'bucket',
+        '__|bucket|__': '__bucket__'
+    })
+    rendered = renderer.render('https://s3.amazonaws.com/__resources__/nested.yml __bucket__ __|bucket|__')
+    assert rendered == 'https://s3.amazonaws.com/bucket/portfolio/product/core/1.0.0/nested.yml bucket __bucket__'
+
+
+def test_render_does_not_rescan_substituted_values():
+    renderer = TemplateRenderer({
+        '__resources__': '__bucket__/path',
+        '__bucket__': 'bucket'
+    })
+    assert renderer.render('__resources__') == '__bucket__/path'
+
+
+def test_render_prefers_longest_placeholder():
+    renderer = TemplateRenderer({
+        '.serverless': 'portfolio/product/core/1.0.0',
+        '.serverless/artifact-dir': 'artifacts'
+    })
+    assert renderer.render('.serverless/artifact-dir/a.zip .serverless/b.zip') == 'artifacts/a.zip portfolio/product/core/1.0.0/b.zip'
+
+
+def test_render_without_placeholders():
+    assert TemplateRenderer({}).render('unchanged') == 'unchanged'
+    assert TemplateRenderer({'__prefix__': 'prefix'}).render('') == ''
@@ -0,0 +1,56 @@
+import json
+from concurrent import futures
+
+import boto3
+import pytest
+
+from aws_conduit import conduit_cli, conduit_plan, conduit_trace
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = boto3.client('s3', region_name='ap-southeast-2', aws_access_key_id='testing',
+                          aws_secret_access_key='testing')
+    monkeypatch.setattr(conduit_trace.events, 'clients', lambda: [client])
+    return client
+
+
+def test_trace_groups_calls_by_phase(client, tmpdir, capsys):
+    with conduit_trace.Trace('build') as trace, conduit_plan.Plan():
+        client.put_object(Bucket='groovy-bucket', Key='groovy.yaml', Body=b'groovy')
+        with conduit_trace.phase('release'):
+            client.put_object(Bucket='groovy-bucket', Key='groovy.yaml', Body=b'groovy')
+            executor = futures.ThreadPoolExecutor(max_workers=1)
+            executor.submit(conduit_trace.inherit(lambda: client.put_object(Bucket='groovy-bucket', Key='a', Body=b'a'))).result()
+            executor.shutdown()
+    assert [call['phase'] for call in trace.calls] == ['build', 'release', 'release']
+    rows = dict((row['phase'], row) for row in trace.summary())
+    assert rows['release']['count'] == 2
+    assert rows['release']['call'] == 's3.PutObject'
+    trace.report()
+    assert 's3.PutObject' in capsys.readouterr().out
+
+    path = tmpdir.join('trace.json')
+    trace.write(str(path))
+    events = json.loads(path.read())['traceEvents']
+    assert [event['name'] for event in events if event['ph'] == 'X'] == ['release', 's3.PutObject', 's3.PutObject', 's3.PutObject']
+    assert conduit_trace.active() is None
+
+
+def test_in_phase():
+    @conduit_trace.in_phase('tidy')
+    def tidy():
+        return conduit_trace.current_phase()
+
+    assert tidy() == 'tidy'
+    assert conduit_trace.current_phase('build') == 'build'
+
+
+def test_cli_traces_planned_writes(client, tmpdir, monkeypatch, capsys):
+    monkeypatch.setattr(conduit_cli.conduit, 'set_default_support_config',
+                        lambda **kwargs: client.put_object(Bucket='groovy-bucket', Key='support.yaml', Body=b'groovy'))
+    path = tmpdir.join('trace.json')
+    conduit_cli.Conduit().main(['conduit', '--plan', '--trace', str(path), 'support', '-e', 'noone@home.com'])
+    events = json.loads(path.read())['traceEvents']
+    assert [event['name'] for event in events if event['ph'] == 'X'] == ['s3.PutObject']
+    assert 's3 PutObject Key=support.yaml' in capsys.readouterr().out
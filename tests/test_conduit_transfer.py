@@ -0,0 +1,31 @@
+import pytest
+
+from aws_conduit import conduit_transfer
+
+
+def _upload(path, size, callback=None):
+    callback(size)
+    return path
+
+
+def test_run_uploads_keeps_task_order(tmpdir):
+    tasks = []
+    for index in range(5):
+        path = tmpdir.join('resource-{}.yaml'.format(index))
+        path.write('x' * index)
+        tasks.append(conduit_transfer.upload_task(str(path), lambda callback, p=str(path), i=index: _upload(p, i, callback=callback)))
+    results = conduit_transfer.run_uploads(tasks, max_workers=3)
+    assert results == [task['path'] for task in tasks]
+
+
+def test_run_uploads_raises_first_failure(tmpdir):
+    def failing(callback=None):
+        raise ValueError('upload failed')
+
+    tasks = [conduit_transfer.upload_task(str(tmpdir.join('missing.yaml')), failing)]
+    with pytest.raises(ValueError):
+        conduit_transfer.run_uploads(tasks)
+
+
+def test_run_uploads_without_tasks():
+    assert conduit_transfer.run_uploads([]) == []
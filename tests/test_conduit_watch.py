@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+
+from aws_conduit import conduit_watch
+
+
+def test_watched_paths(tmpdir, monkeypatch):
+    tmpdir.mkdir('src').join('handler.py').write('groovy')
+    monkeypatch.chdir(str(tmpdir))
+    product_spec = {
+        'artifact': 'template.yaml',
+        'associatedResources': [{'source': 'build/lambdas.zip', 'destination': 'lambdas.zip'}],
+        'nestedStacks': ['nested.yaml'],
+        'watch': ['src/**/*.py']
+    }
+    assert conduit_watch.watched_paths(product_spec) == set(
+        ['template.yaml', 'build/lambdas.zip', 'nested.yaml', os.path.join('src', 'handler.py')])
+
+
+def test_changed_paths():
+    before = {'a': (1, 1), 'b': (1, 1), 'c': None}
+    after = {'a': (1, 1), 'b': (2, 1), 'c': (1, 1)}
+    assert conduit_watch.changed_paths(before, after) == set(['b', 'c'])
+
+
+def test_watch_rebuilds_affected_products(tmpdir, monkeypatch):
+    monkeypatch.chdir(str(tmpdir))
+    tmpdir.join('first.yaml').write('first')
+    tmpdir.join('second.yaml').write('second')
+    product_specs = [
+        {'portfolio': 'groovy', 'product': 'first', 'artifact': 'first.yaml'},
+        {'portfolio': 'groovy', 'product': 'second', 'artifact': 'second.yaml'}
+    ]
+    rebuilt = []
+    stop = threading.Event()
+
+    def rebuild(targets):
+        rebuilt.append([product_spec['product'] for product_spec in targets])
+        stop.set()
+
+    watcher = threading.Thread(target=conduit_watch.watch, args=(lambda: product_specs, rebuild),
+                               kwargs=dict(interval=0.01, debounce=0.05, stop=stop))
+    watcher.start()
+    time.sleep(0.1)
+    tmpdir.join('second.yaml').write('second, changed')
+    watcher.join(5)
+    assert rebuilt == [['second']]
+
+
+def test_watch_rebuilds_changes_made_during_a_rebuild(tmpdir, monkeypatch):
+    monkeypatch.chdir(str(tmpdir))
+    tmpdir.join('first.yaml').write('first')
+    product_specs = [{'portfolio': 'groovy', 'product': 'first', 'artifact': 'first.yaml'}]
+    rebuilt = []
+    stop = threading.Event()
+
+    def rebuild(targets):
+        rebuilt.append([product_spec['product'] for product_spec in targets])
+        if len(rebuilt) == 1:
+            tmpdir.join('first.yaml').write('first, changed while rebuilding')
+        else:
+            stop.set()
+
+    watcher = threading.Thread(target=conduit_watch.watch, args=(lambda: product_specs, rebuild),
+                               kwargs=dict(interval=0.01, debounce=0.05, stop=stop))
+    watcher.start()
+    time.sleep(0.1)
+    tmpdir.join('first.yaml').write('first, changed')
+    watcher.join(5)
+    stop.set()
+    assert rebuilt == [['first'], ['first']]
+
+
+def test_conduit_watch_survives_a_failed_first_build(monkeypatch):
+    from aws_conduit import conduit
+
+    def build(action, product, force=False):
+        raise ValueError("Releasing failed in: groovy-product (us-east-1)")
+
+    watched = []
+    monkeypatch.setattr(conduit, 'build', build)
+    monkeypatch.setattr(conduit_watch, 'watch', lambda load, rebuild: watched.append(load))
+    conduit.watch('groovy-product')
+    assert len(watched) == 1
+
+
+def test_build_outputs(tmpdir, monkeypatch):
+    monkeypatch.chdir(str(tmpdir))
+    tmpdir.join('template.yaml').write('template')
+    product_spec = {
+        'artifact': 'template.yaml',
+        'associatedResources': [{'source': 'build/lambdas.zip', 'destination': 'lambdas.zip'}],
+        'build': ['zip -r build/lambdas.zip src'],
+        'watch': ['template.yaml']
+    }
+    assert conduit_watch.build_outputs(product_spec) == set(['build/lambdas.zip'])
+    assert conduit_watch.build_outputs(dict(product_spec, watch=[])) == set(['template.yaml', 'build/lambdas.zip'])
+    assert conduit_watch.build_outputs(dict(product_spec, build=[])) == set()
+
+
+def test_watch_ignores_what_rebuilds_write(tmpdir, monkeypatch):
+    monkeypatch.chdir(str(tmpdir))
+    tmpdir.join('template.yaml').write('template')
+    tmpdir.mkdir('src').join('handler.py').write('handler')
+    tmpdir.mkdir('build').join('lambdas.zip').write('zip')
+    product_specs = [{'portfolio': 'groovy', 'product': 'first', 'artifact': 'template.yaml', 'build': ['zip'],
+                      'associatedResources': [{'source': 'build/lambdas.zip', 'destination': 'lambdas.zip'}],
+                      'watch': ['src/**/*.py']}]
+    rebuilt = []
+    stop = threading.Event()
+
+    def rebuild(targets):
+        rebuilt.append(len(rebuilt))
+        tmpdir.join('build', 'lambdas.zip').write('zip {}'.format(len(rebuilt)))
+
+    watcher = threading.Thread(target=conduit_watch.watch, args=(lambda: product_specs, rebuild),
+                               kwargs=dict(interval=0.01, debounce=0.05, stop=stop))
+    watcher.start()
+    time.sleep(0.1)
+    tmpdir.join('src', 'handler.py').write('handler, changed')
+    time.sleep(0.5)
+    stop.set()
+    watcher.join(5)
+    assert rebuilt == [0]
@@ -0,0 +1,58 @@
+import pytest
+
+from aws_conduit import conduit_plan, conduit_s3, conduit_storage, helper
+from conftest import BUCKET
+
+TEMPLATE = 'Resources:\n  Nested:\n    TemplateURL: https://s3.amazonaws.com/__resources__/nested.yml\n    Bucket: __bucket__\n'
+
+
+def test_put_resource_renders_templates_in_memory(bucket, tmpdir):
+    template = tmpdir.join('template.yaml')
+    template.write(TEMPLATE)
+    url = helper.put_resource(str(template), 'template.yaml', bucket, 'portfolio', 'product', '1.0.0')
+    assert url == 'https://s3-ap-southeast-2.amazonaws.com/{}/portfolio/product/core/1.0.0/template.yaml'.format(BUCKET)
+    rendered = conduit_storage.backend().download_content(BUCKET, 'portfolio/product/core/1.0.0/template.yaml').decode('utf-8')
+    assert 'https://s3.amazonaws.com/{}/portfolio/product/core/1.0.0/nested.yml'.format(BUCKET) in rendered
+    assert 'Bucket: {}'.format(BUCKET) in rendered
+    assert template.read() == TEMPLATE
+
+
+def test_put_resource_uploads_other_files_unchanged(bucket, tmpdir):
+    archive = tmpdir.join('lambdas.zip')
+    archive.write_binary(b'__resources__')
+    helper.put_resource(str(archive), 'lambdas.zip', bucket, 'portfolio', 'product', '1.0.0')
+    assert conduit_storage.backend().download_content(BUCKET, 'portfolio/product/core/1.0.0/lambdas.zip') == b'__resources__'
+
+
+def test_failed_command_does_not_leave_changes_cached(bucket, monkeypatch):
+    bucket.put_config(dict(portfolios=[], currentVersion='1.0.0'), helper.CONFIG_PREFIX)
+    monkeypatch.setattr(helper.factory, 'BUCKETS', dict(config=bucket))
+    monkeypatch.setattr(conduit_s3, 'EXISTING_BUCKETS', {})
+    monkeypatch.setattr(helper, 'CONFIGURATION', {})
+
+    @helper.inject_config
+    def failed_build(config):
+        config['currentVersion'] = '1.0.1'
+        raise ValueError("Upload failed")
+
+    @helper.inject_config
+    def list_products(config):
+        return config['currentVersion']
+
+    with pytest.raises(ValueError):
+        failed_build()
+    helper.refresh_config()
+    assert list_products() == '1.0.0'
+    assert bucket.get_config(helper.CONFIG_PREFIX)['currentVersion'] == '1.0.0'
+    monkeypatch.setattr(conduit_plan.events, 'clients', lambda: [])
+    with conduit_plan.Plan():
+        list_products()
+    assert 'config' not in helper.CONFIGURATION
+
+
+def test_next_version():
+    assert helper.next_version('build', '1.2.3') == '1.2.3+build.1'
+    assert helper.next_version('build', '1.2.3+build.1') == '1.2.3+build.2'
+    assert helper.next_version('major', '1.2.3') == '2.0.0'
+    assert helper.next_version('minor', '1.2.3') == '1.3.0'
+    assert helper.next_version('patch', '1.2.3+build.4') == '1.2.4'